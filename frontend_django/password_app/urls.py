@@ -12,6 +12,7 @@ urlpatterns = [
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('add-password/', views.add_password_view, name='add_password'),
     path('edit-password/<int:password_id>/', views.edit_password_view, name='edit_password'),
+    path('reveal-passwords/', views.reveal_passwords_view, name='reveal_passwords'),
     path('delete-password/<int:password_id>/', views.delete_password_view, name='delete_password'),
 ]
 
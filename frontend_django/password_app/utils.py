@@ -1,9 +1,33 @@
 """
 Utilitários para comunicação com os serviços backend
 """
+import hashlib
+import sys
+import time
+from pathlib import Path
 import requests
 from django.conf import settings
-from typing import Optional, Dict, Any
+from django.core.cache import cache
+from typing import Optional, Dict, Any, Iterator, List
+
+# Diretório services/ para os componentes compartilhados
+services_dir = Path(__file__).resolve().parent.parent.parent / 'services'
+if str(services_dir) not in sys.path:
+    sys.path.append(str(services_dir))
+
+from shared.http_transport import HTTPTransport, get_transport
+from shared.ttl_cache import TTLCache
+
+
+def get_frontend_transport() -> HTTPTransport:
+    """Obtém o transporte HTTP keep-alive configurado para o frontend"""
+    return get_transport(
+        'frontend_django',
+        pool_size=settings.HTTP_POOL_SIZE,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.HTTP_READ_TIMEOUT,
+        max_idle_seconds=settings.HTTP_MAX_IDLE_SECONDS
+    )
 
 
 class AuthServiceClient:
@@ -11,14 +35,14 @@ class AuthServiceClient:
     
     def __init__(self):
         self.base_url = settings.AUTH_SERVICE_URL
+        self.transport = get_frontend_transport()
     
     def register(self, username: str, email: str, password: str) -> Optional[Dict[str, Any]]:
         """Registra um novo usuário"""
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/register',
-                json={'username': username, 'email': email, 'password': password},
-                timeout=5
+                json={'username': username, 'email': email, 'password': password}
             )
             if response.status_code == 201:
                 return response.json()
@@ -29,10 +53,9 @@ class AuthServiceClient:
     def login(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """Faz login e retorna token"""
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/login',
-                json={'username': username, 'password': password},
-                timeout=5
+                json={'username': username, 'password': password}
             )
             if response.status_code == 200:
                 return response.json()
@@ -43,16 +66,70 @@ class AuthServiceClient:
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verifica um token JWT"""
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/verify',
-                json={'token': token},
-                timeout=5
+                json={'token': token}
             )
             if response.status_code == 200:
                 return response.json()
             return None
         except requests.exceptions.RequestException:
             return None
+    
+    def refresh(self, refresh_token: str) -> Optional[Dict[str, Any]]:
+        """
+        Troca o refresh token por um novo par de tokens
+        
+        O Auth Service aceita cada refresh token uma única vez. Requisições
+        simultâneas da mesma sessão (abas, chamadas em paralelo) que
+        encontram o token de acesso expirado recebem o mesmo novo par: a
+        primeira renova e guarda o resultado no cache do Django por
+        REFRESH_GRACE_SECONDS; as demais esperam por ele em vez de usar o
+        token já rotacionado e perder a sessão. Com um backend de cache
+        compartilhado (CACHES) isso vale também entre workers.
+        """
+        key = 'auth-refresh:' + hashlib.sha256(refresh_token.encode()).hexdigest()
+        result = cache.get(key)
+        if result is not None:
+            return result
+        
+        # Só quem obtém a trava chama o Auth Service
+        lock_timeout = settings.HTTP_CONNECT_TIMEOUT + settings.HTTP_READ_TIMEOUT
+        if not cache.add(f'{key}:lock', True, timeout=lock_timeout):
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                result = cache.get(key)
+                # Trava liberada sem resultado: a renovação falhou
+                if result is not None or cache.get(f'{key}:lock') is None:
+                    return result
+            return None
+        
+        try:
+            response = self.transport.post(
+                f'{self.base_url}/refresh',
+                json={'refresh_token': refresh_token}
+            )
+            if response.status_code == 200:
+                result = response.json()
+                cache.set(key, result, timeout=settings.REFRESH_GRACE_SECONDS)
+                return result
+            return None
+        except requests.exceptions.RequestException:
+            return None
+        finally:
+            cache.delete(f'{key}:lock')
+    
+    def logout(self, token: Optional[str], refresh_token: Optional[str]) -> bool:
+        """Revoga o token de acesso e o refresh token da sessão"""
+        try:
+            response = self.transport.post(
+                f'{self.base_url}/logout',
+                json={'token': token, 'refresh_token': refresh_token}
+            )
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
 
 
 class PasswordManagerServiceClient:
@@ -60,18 +137,66 @@ class PasswordManagerServiceClient:
     
     def __init__(self):
         self.base_url = settings.PASSWORD_MANAGER_SERVICE_URL
+        self.transport = get_frontend_transport()
+        # Páginas já baixadas, por (token, parâmetros): (etag, dados)
+        self.list_cache = TTLCache(max_size=settings.LIST_CACHE_MAX_ENTRIES,
+                                   default_ttl=settings.LIST_CACHE_TTL_SECONDS)
     
     def _get_headers(self, token: str) -> Dict[str, str]:
         """Retorna headers com token de autorização"""
         return {'Authorization': f'Bearer {token}'}
     
-    def list_passwords(self, token: str) -> Optional[Dict[str, Any]]:
-        """Lista todas as senhas do usuário"""
+    def list_passwords(self, token: str, cursor: Optional[str] = None,
+                       limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lista uma página de senhas do usuário
+        
+        A última resposta de cada página fica em cache com o seu ETag; o
+        serviço responde 304 enquanto o cofre não mudar e a página é reutilizada.
+        
+        Returns:
+            Dicionário com ``passwords`` e ``next_cursor`` (None na última página)
+        """
+        params = {}
+        if cursor:
+            params['cursor'] = cursor
+        if limit:
+            params['limit'] = limit
+        cache_key = (hashlib.sha256(token.encode()).digest(), cursor, limit)
+        cached = self.list_cache.get(cache_key)
+        headers = self._get_headers(token)
+        if cached:
+            headers['If-None-Match'] = cached[0]
         try:
-            response = requests.get(
+            response = self.transport.get(
                 f'{self.base_url}/passwords',
-                headers=self._get_headers(token),
-                timeout=5
+                params=params,
+                headers=headers
+            )
+            if response.status_code == 304 and cached:
+                return cached[1]
+            if response.status_code == 200:
+                data = response.json()
+                if response.headers.get('ETag'):
+                    self.list_cache.set(cache_key, (response.headers['ETag'], data))
+                return data
+            return None
+        except requests.exceptions.RequestException:
+            return None
+    
+    def search_passwords(self, query: str, token: str, cursor: Optional[str] = None,
+                         limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Busca senhas por trecho do site ou do username (uma página)"""
+        params = {'q': query}
+        if cursor:
+            params['cursor'] = cursor
+        if limit:
+            params['limit'] = limit
+        try:
+            response = self.transport.get(
+                f'{self.base_url}/passwords/search',
+                params=params,
+                headers=self._get_headers(token)
             )
             if response.status_code == 200:
                 return response.json()
@@ -79,13 +204,38 @@ class PasswordManagerServiceClient:
         except requests.exceptions.RequestException:
             return None
     
+    def iter_passwords(self, token: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Percorre todas as senhas do usuário, uma página por requisição"""
+        cursor = None
+        while True:
+            page = self.list_passwords(token, cursor=cursor, limit=limit)
+            if not page:
+                return
+            yield from page.get('passwords', [])
+            cursor = page.get('next_cursor')
+            if not cursor:
+                return
+    
     def get_password(self, password_id: int, token: str) -> Optional[Dict[str, Any]]:
         """Obtém uma senha específica"""
         try:
-            response = requests.get(
+            response = self.transport.get(
                 f'{self.base_url}/passwords/{password_id}',
-                headers=self._get_headers(token),
-                timeout=5
+                headers=self._get_headers(token)
+            )
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except requests.exceptions.RequestException:
+            return None
+    
+    def reveal_passwords(self, password_ids: List[int], token: str) -> Optional[Dict[str, Any]]:
+        """Descriptografa várias senhas em uma única requisição"""
+        try:
+            response = self.transport.post(
+                f'{self.base_url}/passwords/reveal',
+                json={'ids': password_ids},
+                headers=self._get_headers(token)
             )
             if response.status_code == 200:
                 return response.json()
@@ -96,11 +246,10 @@ class PasswordManagerServiceClient:
     def create_password(self, site: str, username: str, password: str, token: str) -> Optional[Dict[str, Any]]:
         """Cria uma nova senha"""
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/passwords',
                 json={'site': site, 'username': username, 'password': password},
-                headers=self._get_headers(token),
-                timeout=5
+                headers=self._get_headers(token)
             )
             if response.status_code == 201:
                 return response.json()
@@ -112,11 +261,10 @@ class PasswordManagerServiceClient:
                        password: str, token: str) -> Optional[Dict[str, Any]]:
         """Atualiza uma senha"""
         try:
-            response = requests.put(
+            response = self.transport.put(
                 f'{self.base_url}/passwords/{password_id}',
                 json={'site': site, 'username': username, 'password': password},
-                headers=self._get_headers(token),
-                timeout=5
+                headers=self._get_headers(token)
             )
             if response.status_code == 200:
                 return response.json()
@@ -127,12 +275,21 @@ class PasswordManagerServiceClient:
     def delete_password(self, password_id: int, token: str) -> bool:
         """Deleta uma senha"""
         try:
-            response = requests.delete(
+            response = self.transport.delete(
                 f'{self.base_url}/passwords/{password_id}',
-                headers=self._get_headers(token),
-                timeout=5
+                headers=self._get_headers(token)
+            )
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+    
+    def invalidate_token(self, token: str) -> bool:
+        """Remove o token do cache de verificação do serviço (logout)"""
+        try:
+            response = self.transport.post(
+                f'{self.base_url}/tokens/invalidate',
+                headers=self._get_headers(token)
             )
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
-
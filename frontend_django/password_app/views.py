@@ -1,6 +1,9 @@
 """
 Views do Django para o gerenciador de senhas
 """
+import json
+
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -17,9 +20,11 @@ def get_token_from_session(request):
     return request.session.get('token')
 
 
-def set_token_in_session(request, token):
-    """Armazena token na sessão"""
+def set_token_in_session(request, token, refresh_token=None):
+    """Armazena token (e o refresh token, se houver) na sessão"""
     request.session['token'] = token
+    if refresh_token:
+        request.session['refresh_token'] = refresh_token
 
 
 def clear_session(request):
@@ -36,6 +41,13 @@ def require_auth(view_func):
         
         # Verifica se o token ainda é válido
         user_data = auth_client.verify_token(token)
+        if not user_data:
+            # Token de acesso expirado: renova com o refresh token da sessão
+            refresh_token = request.session.get('refresh_token')
+            refreshed = auth_client.refresh(refresh_token) if refresh_token else None
+            if refreshed:
+                set_token_in_session(request, refreshed['token'], refreshed['refresh_token'])
+                user_data = auth_client.verify_token(refreshed['token'])
         if not user_data:
             clear_session(request)
             return redirect('login')
@@ -60,7 +72,7 @@ def login_view(request):
         result = auth_client.login(username, password)
         
         if result:
-            set_token_in_session(request, result['token'])
+            set_token_in_session(request, result['token'], result.get('refresh_token'))
             request.session['user_id'] = result['user_id']
             request.session['username'] = result['username']
             request.session['email'] = result['email']
@@ -95,7 +107,7 @@ def register_view(request):
         result = auth_client.register(username, email, password)
         
         if result:
-            set_token_in_session(request, result['token'])
+            set_token_in_session(request, result['token'], result.get('refresh_token'))
             request.session['user_id'] = result['user_id']
             return redirect('dashboard')
         else:
@@ -109,6 +121,13 @@ def register_view(request):
 @require_http_methods(["GET"])
 def logout_view(request):
     """View de logout"""
+    token = get_token_from_session(request)
+    refresh_token = request.session.get('refresh_token')
+    if token or refresh_token:
+        # Revoga no Auth Service e descarta a verificação em cache no Password Manager
+        auth_client.logout(token, refresh_token)
+        if token:
+            pm_client.invalidate_token(token)
     clear_session(request)
     return redirect('login')
 
@@ -118,12 +137,22 @@ def logout_view(request):
 def dashboard_view(request):
     """View do dashboard"""
     token = get_token_from_session(request)
-    passwords_data = pm_client.list_passwords(token)
+    cursor = request.GET.get('cursor')
+    query = request.GET.get('q', '').strip()
+    if query:
+        passwords_data = pm_client.search_passwords(query, token, cursor=cursor,
+                                                    limit=settings.DASHBOARD_PAGE_SIZE)
+    else:
+        passwords_data = pm_client.list_passwords(token, cursor=cursor,
+                                                  limit=settings.DASHBOARD_PAGE_SIZE)
     
     passwords = passwords_data.get('passwords', []) if passwords_data else []
     
     return render(request, 'dashboard.html', {
         'passwords': passwords,
+        'next_cursor': passwords_data.get('next_cursor') if passwords_data else None,
+        'is_first_page': not cursor,
+        'query': query,
         'username': request.session.get('username', '')
     })
 
@@ -194,6 +223,25 @@ def edit_password_view(request, password_id):
     })
 
 
+@require_http_methods(["POST"])
+@require_auth
+def reveal_passwords_view(request):
+    """View que revela várias senhas do dashboard de uma vez (JSON)"""
+    try:
+        ids = [int(i) for i in json.loads(request.body).get('ids', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'IDs inválidos'}, status=400)
+    
+    token = get_token_from_session(request)
+    result = pm_client.reveal_passwords(ids, token)
+    if result is None:
+        return JsonResponse({'error': 'Erro ao carregar senhas'}, status=502)
+    
+    response = JsonResponse(result)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
 @require_http_methods(["POST"])
 @require_auth
 def delete_password_view(request, password_id):
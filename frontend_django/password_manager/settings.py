@@ -11,7 +11,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-dev-key-change-in-production'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
@@ -99,3 +99,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', 'http://localhost:5000')
 PASSWORD_MANAGER_SERVICE_URL = os.getenv('PASSWORD_MANAGER_SERVICE_URL', 'http://localhost:5001')
 
+# Pool de conexões HTTP keep-alive para os serviços backend
+HTTP_POOL_SIZE = int(os.getenv('FRONTEND_HTTP_POOL_SIZE', 20))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('FRONTEND_HTTP_CONNECT_TIMEOUT', 2))
+HTTP_READ_TIMEOUT = float(os.getenv('FRONTEND_HTTP_READ_TIMEOUT', 5))
+HTTP_MAX_IDLE_SECONDS = float(os.getenv('FRONTEND_HTTP_MAX_IDLE_SECONDS', 30))
+
+# Segundos em que o resultado de uma renovação de token é reaproveitado por
+# requisições simultâneas da mesma sessão (o refresh token só vale uma vez)
+REFRESH_GRACE_SECONDS = float(os.getenv('FRONTEND_REFRESH_GRACE_SECONDS', 30))
+
+# Senhas por página no dashboard (o serviço aplica o próprio máximo)
+DASHBOARD_PAGE_SIZE = int(os.getenv('DASHBOARD_PAGE_SIZE', 50))
+
+# Páginas da listagem revalidadas por ETag (If-None-Match) junto ao serviço
+LIST_CACHE_MAX_ENTRIES = int(os.getenv('FRONTEND_LIST_CACHE_MAX_ENTRIES', 1000))
+LIST_CACHE_TTL_SECONDS = float(os.getenv('FRONTEND_LIST_CACHE_TTL_SECONDS', 300))
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Launcher de produção dos serviços
+
+Uso:
+    python3 launcher.py supervise [--services auth,encryption,password_manager,frontend]
+    python3 launcher.py supervise --services monolith,frontend
+    python3 launcher.py serve <serviço>
+
+``serve`` executa um serviço em um servidor WSGI pre-fork (gunicorn): um
+processo mestre que abre o socket e N workers com T threads cada. O mestre
+recicla cada worker após WSGI_MAX_REQUESTS requisições e recarrega o código
+sem derrubar conexões ao receber SIGHUP.
+
+``supervise`` inicia os serviços em ordem de dependência, consulta a rota de
+health de cada um periodicamente e reinicia o processo que sair ou deixar de
+responder. SIGHUP é repassado aos serviços (reload gracioso); SIGTERM/SIGINT
+encerram todos graciosamente.
+
+Configuração (variáveis globais; cada uma aceita um prefixo por serviço, que
+tem precedência, ex.: PM_WSGI_WORKERS, AUTH_WSGI_THREADS):
+    WSGI_WORKERS               processos worker (padrão: 2 x CPUs + 1)
+    WSGI_THREADS               threads por worker (padrão por serviço)
+    WSGI_MAX_REQUESTS          reciclagem do worker após N requisições (0 desativa)
+    WSGI_MAX_REQUESTS_JITTER   variação aleatória do limite, para não reciclar todos juntos
+    WSGI_TIMEOUT               segundos até um worker travado ser substituído
+    WSGI_GRACEFUL_TIMEOUT      segundos para concluir requisições em andamento
+    WSGI_KEEP_ALIVE            segundos de keep-alive das conexões
+    WSGI_REUSE_PORT            SO_REUSEPORT no socket de escuta (true/false)
+    PM_SERVER_MODE             'wsgi' (padrão) ou 'asgi' (async_app.py via hypercorn)
+    PASSWORD_HASH_WORKERS      processos de hashing por worker do auth/monolito
+                               (padrão: CPUs // WSGI_WORKERS, mínimo 1)
+
+DEBUG é False nos serviços iniciados pelo launcher, a não ser que definido.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent
+
+
+class ServiceSpec(NamedTuple):
+    """Como executar e verificar um serviço"""
+    name: str
+    directory: Path
+    wsgi_app: str
+    env_prefix: str
+    host_env: str
+    port_env: str
+    default_port: int
+    health_path: str
+    default_threads: int = 1
+    # Comando executado uma vez antes de iniciar os workers (banco, migrações)
+    init_command: Optional[List[str]] = None
+    asgi_app: Optional[str] = None
+    # Calcula hashes de senha em um pool de processos por worker
+    password_hashing: bool = False
+
+
+SERVICES: Dict[str, ServiceSpec] = {
+    'auth': ServiceSpec(
+        'auth', ROOT_DIR / 'services' / 'auth_service', 'app:app', 'AUTH',
+        'AUTH_HOST', 'AUTH_PORT', 5000, '/health',
+        # Hash de senhas roda no pool de processos do serviço: as threads só esperam
+        default_threads=4,
+        # Chave de assinatura criada antes dos workers: todos usam a mesma
+        init_command=[sys.executable, '-c', 'from app import init_db, init_keys; init_db(); init_keys()'],
+        password_hashing=True
+    ),
+    'encryption': ServiceSpec(
+        'encryption', ROOT_DIR / 'services' / 'encryption_service', 'app:app', 'ENCRYPTION',
+        'ENCRYPTION_HOST', 'ENCRYPTION_PORT', 5002, '/health',
+        default_threads=1,
+        init_command=[sys.executable, '-c', 'from app import init_keys; init_keys()']
+    ),
+    'password_manager': ServiceSpec(
+        'password_manager', ROOT_DIR / 'services' / 'password_manager_service', 'app:app', 'PM',
+        'PM_HOST', 'PM_PORT', 5001, '/health',
+        # Espera principalmente os outros serviços: várias threads por worker
+        default_threads=4,
+        init_command=[sys.executable, '-c', 'from app import init_db; init_db()'],
+        asgi_app='async_app:app'
+    ),
+    # Auth + Encryption + Password Manager em um processo (services/monolith_app.py)
+    'monolith': ServiceSpec(
+        'monolith', ROOT_DIR / 'services', 'monolith_app:app', 'MONOLITH',
+        'MONOLITH_HOST', 'MONOLITH_PORT', 5000, '/health',
+        default_threads=4,
+        init_command=[sys.executable, '-c', 'from monolith_app import init_db; init_db()'],
+        password_hashing=True
+    ),
+    'frontend': ServiceSpec(
+        'frontend', ROOT_DIR / 'frontend_django', 'password_manager.wsgi:application', 'FRONTEND',
+        'DJANGO_HOST', 'DJANGO_PORT', 8000, '/login/',
+        default_threads=4,
+        init_command=[sys.executable, 'manage.py', 'migrate', '--noinput']
+    ),
+}
+
+# Implantação distribuída padrão de ``supervise``
+DEFAULT_SERVICES = ('auth', 'encryption', 'password_manager', 'frontend')
+
+
+def service_setting(spec: ServiceSpec, name: str, default, cast: Callable = int):
+    """Lê <PREFIXO>_WSGI_<NOME> ou WSGI_<NOME> do ambiente"""
+    value = os.getenv(f'{spec.env_prefix}_WSGI_{name}') or os.getenv(f'WSGI_{name}')
+    if value is None or value == '':
+        return default
+    if cast is bool:
+        return value.lower() == 'true'
+    return cast(value)
+
+
+def service_address(spec: ServiceSpec):
+    """Host e porta de escuta do serviço"""
+    return os.getenv(spec.host_env, '0.0.0.0'), int(os.getenv(spec.port_env, spec.default_port))
+
+
+def server_workers(spec: ServiceSpec) -> int:
+    """Processos worker do servidor do serviço"""
+    return service_setting(spec, 'WORKERS', (os.cpu_count() or 1) * 2 + 1)
+
+
+def uses_asgi(spec: ServiceSpec) -> bool:
+    """Indica se o serviço deve rodar no modo assíncrono"""
+    return spec.asgi_app is not None and os.getenv(f'{spec.env_prefix}_SERVER_MODE', 'wsgi') == 'asgi'
+
+
+def build_server_command(spec: ServiceSpec) -> List[str]:
+    """
+    Monta a linha de comando do servidor do serviço
+
+    Args:
+        spec: Serviço
+
+    Returns:
+        Argumentos para gunicorn (WSGI) ou hypercorn (ASGI)
+    """
+    host, port = service_address(spec)
+    workers = server_workers(spec)
+    max_requests = service_setting(spec, 'MAX_REQUESTS', 1000)
+    jitter = service_setting(spec, 'MAX_REQUESTS_JITTER', 100)
+    graceful_timeout = service_setting(spec, 'GRACEFUL_TIMEOUT', 30)
+
+    if uses_asgi(spec):
+        # Um event loop por worker; threads e SO_REUSEPORT não se aplicam
+        return [
+            sys.executable, '-m', 'hypercorn', spec.asgi_app,
+            '--bind', f'{host}:{port}',
+            '--workers', str(workers),
+            '--max-requests', str(max_requests),
+            '--max-requests-jitter', str(jitter),
+            '--graceful-timeout', str(graceful_timeout),
+            '--access-logfile', '-',
+        ]
+
+    threads = service_setting(spec, 'THREADS', spec.default_threads)
+    command = [
+        sys.executable, '-m', 'gunicorn', spec.wsgi_app,
+        '--bind', f'{host}:{port}',
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--worker-class', 'gthread' if threads > 1 else 'sync',
+        '--max-requests', str(max_requests),
+        '--max-requests-jitter', str(jitter),
+        '--timeout', str(service_setting(spec, 'TIMEOUT', 30)),
+        '--graceful-timeout', str(graceful_timeout),
+        '--keep-alive', str(service_setting(spec, 'KEEP_ALIVE', 5)),
+        '--access-logfile', '-',
+    ]
+    if service_setting(spec, 'REUSE_PORT', True, cast=bool):
+        command.append('--reuse-port')
+    return command
+
+
+def service_environment(spec: Optional[ServiceSpec] = None) -> Dict[str, str]:
+    """
+    Ambiente dos serviços: modo de depuração desligado por padrão
+
+    Cada worker de um serviço que calcula hashes de senha cria o próprio pool
+    de processos; sem PASSWORD_HASH_WORKERS definido, as CPUs são divididas
+    entre os workers em vez de cada um abrir um processo por CPU.
+    """
+    env = dict(os.environ)
+    env.setdefault('DEBUG', 'False')
+    if spec is not None and spec.password_hashing:
+        env.setdefault('PASSWORD_HASH_WORKERS',
+                       str(max(1, (os.cpu_count() or 1) // server_workers(spec))))
+    return env
+
+
+def serve(name: str):
+    """Prepara e executa um serviço (substitui este processo pelo servidor)"""
+    spec = SERVICES[name]
+    env = service_environment(spec)
+    os.chdir(spec.directory)
+    if spec.init_command:
+        subprocess.run(spec.init_command, env=env, check=True)
+    command = build_server_command(spec)
+    print(f"🚀 {spec.name}: {' '.join(command[2:])}", flush=True)
+    os.execve(sys.executable, command, env)
+
+
+class ManagedService:
+    """Processo de um serviço acompanhado pelo supervisor"""
+
+    def __init__(self, spec: ServiceSpec, health_timeout: float = 2.0):
+        self.spec = spec
+        self.health_timeout = health_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restarts = 0
+        self.crash_streak = 0
+        self.next_start_at = 0.0
+
+    @property
+    def health_url(self) -> str:
+        host, port = service_address(self.spec)
+        host = '127.0.0.1' if host in ('0.0.0.0', '') else host
+        return f'http://{host}:{port}{self.spec.health_path}'
+
+    def start(self):
+        """Inicia o processo em uma nova sessão (sinais só via supervisor)"""
+        self.process = subprocess.Popen(
+            [sys.executable, str(ROOT_DIR / 'launcher.py'), 'serve', self.spec.name],
+            env=service_environment(), start_new_session=True
+        )
+        self.started_at = time.monotonic()
+        self.failures = 0
+
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def healthy(self) -> bool:
+        """Consulta a rota de health"""
+        try:
+            with urllib.request.urlopen(self.health_url, timeout=self.health_timeout) as response:
+                return response.status == 200
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def signal(self, signum: int):
+        if self.running():
+            self.process.send_signal(signum)
+
+    def stop(self, timeout: float):
+        """Encerra graciosamente (SIGTERM) e força após ``timeout`` segundos"""
+        if not self.running():
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def reload(self, timeout: float):
+        """Recarrega o código: SIGHUP no gunicorn, reinício no modo ASGI"""
+        if uses_asgi(self.spec):
+            self.stop(timeout)
+            self.start()
+        else:
+            self.signal(signal.SIGHUP)
+
+
+class Supervisor:
+    """
+    Mantém os serviços no ar
+
+    Um serviço é reiniciado quando o processo sai ou quando a rota de health
+    falha ``failure_threshold`` vezes seguidas fora do período de partida.
+    Saídas seguidas aumentam o intervalo até o próximo início (até
+    ``max_backoff`` segundos), para um serviço quebrado não reiniciar em laço.
+    """
+
+    def __init__(self, specs: List[ServiceSpec], check_interval: float = 5.0,
+                 failure_threshold: int = 3, startup_timeout: float = 30.0,
+                 stop_timeout: float = 35.0, max_backoff: float = 30.0):
+        self.services = [ManagedService(spec) for spec in specs]
+        self.check_interval = check_interval
+        self.failure_threshold = failure_threshold
+        self.startup_timeout = startup_timeout
+        self.stop_timeout = stop_timeout
+        self.max_backoff = max_backoff
+        self._wake = threading.Event()
+        self._stopping = False
+        self._reload_requested = False
+
+    def _log(self, service: ManagedService, message: str):
+        print(f"[supervisor] {service.spec.name}: {message}", flush=True)
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+        self._wake.set()
+
+    def _handle_reload(self, signum, frame):
+        self._reload_requested = True
+        self._wake.set()
+
+    def wait_until_healthy(self, service: ManagedService) -> bool:
+        """Aguarda o serviço responder, até startup_timeout segundos"""
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline and not self._stopping:
+            if not service.running():
+                return False
+            if service.healthy():
+                return True
+            self._wake.wait(0.5)
+        return False
+
+    def restart(self, service: ManagedService, reason: str):
+        """Agenda o reinício com espera crescente para saídas seguidas"""
+        service.stop(self.stop_timeout)
+        delay = min(self.max_backoff, 2 ** service.crash_streak - 1)
+        service.crash_streak += 1
+        service.restarts += 1
+        service.next_start_at = time.monotonic() + delay
+        self._log(service, f'{reason}; reiniciando em {delay:.0f}s (reinício #{service.restarts})')
+        service.process = None
+
+    def check(self, service: ManagedService):
+        """Uma rodada de verificação de um serviço"""
+        if service.process is None:
+            if time.monotonic() >= service.next_start_at:
+                service.start()
+            return
+
+        code = service.process.poll()
+        if code is not None:
+            self.restart(service, f'processo saiu com código {code}')
+            return
+
+        if time.monotonic() - service.started_at < self.startup_timeout and service.failures == 0:
+            # Ainda subindo: só conta falhas depois da primeira resposta boa
+            if service.healthy():
+                service.crash_streak = 0
+                service.started_at = 0.0
+            return
+
+        if service.healthy():
+            service.failures = 0
+            service.crash_streak = 0
+            return
+        service.failures += 1
+        self._log(service, f'health check falhou ({service.failures}/{self.failure_threshold})')
+        if service.failures >= self.failure_threshold:
+            self.restart(service, 'sem resposta')
+
+    def run(self):
+        """Inicia os serviços e os supervisiona até SIGTERM/SIGINT"""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        # Em ordem: cada serviço sobe depois que os anteriores respondem
+        for service in self.services:
+            if self._stopping:
+                break
+            service.start()
+            if self.wait_until_healthy(service):
+                service.started_at = 0.0
+                self._log(service, f'no ar em {service.health_url}')
+            else:
+                self._log(service, 'não respondeu a tempo; seguirá sob supervisão')
+
+        while not self._stopping:
+            if self._reload_requested:
+                self._reload_requested = False
+                for service in self.services:
+                    self._log(service, 'recarregando')
+                    service.reload(self.stop_timeout)
+            for service in self.services:
+                if self._stopping:
+                    break
+                self.check(service)
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+
+        # Encerra na ordem inversa da partida
+        for service in reversed(self.services):
+            self._log(service, 'encerrando')
+            service.stop(self.stop_timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Launcher de produção dos serviços')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='Executa um serviço no servidor pre-fork')
+    serve_parser.add_argument('service', choices=list(SERVICES))
+
+    supervise_parser = commands.add_parser('supervise', help='Inicia e supervisiona os serviços')
+    supervise_parser.add_argument('--services', default=','.join(DEFAULT_SERVICES),
+                                  help='Serviços, separados por vírgula, na ordem de partida')
+    supervise_parser.add_argument('--check-interval', type=float,
+                                  default=float(os.getenv('SUPERVISOR_CHECK_INTERVAL', 5)))
+    supervise_parser.add_argument('--failure-threshold', type=int,
+                                  default=int(os.getenv('SUPERVISOR_FAILURE_THRESHOLD', 3)))
+    supervise_parser.add_argument('--startup-timeout', type=float,
+                                  default=float(os.getenv('SUPERVISOR_STARTUP_TIMEOUT', 30)))
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.service)
+        return
+
+    names = [name.strip() for name in args.services.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SERVICES]
+    if unknown:
+        parser.error(f"serviços desconhecidos: {', '.join(unknown)}")
+    Supervisor([SERVICES[name] for name in names],
+               check_interval=args.check_interval,
+               failure_threshold=args.failure_threshold,
+               startup_timeout=args.startup_timeout).run()
+
+
+if __name__ == '__main__':
+    main()
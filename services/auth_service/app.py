@@ -10,10 +10,17 @@ current_dir = Path(__file__).parent
 if str(current_dir) not in sys.path:
     sys.path.insert(0, str(current_dir))
 
+# Diretório services/ para os componentes compartilhados
+services_dir = current_dir.parent
+if str(services_dir) not in sys.path:
+    sys.path.append(str(services_dir))
+
 from flask import Flask
 from config import Config
 from models.user import UserRepository
+from models.revoked_token import RevokedTokenRepository
 from routes.auth_routes import auth_bp
+from utils.jwt_token import get_key_store
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = Config.SECRET_KEY
@@ -23,15 +30,24 @@ app.register_blueprint(auth_bp)
 
 # Inicializa banco de dados
 user_repo = UserRepository(Config.DATABASE)
+revoked_token_repo = RevokedTokenRepository(Config.DATABASE)
 
 
 def init_db(reset: bool = False):
     """Inicializa o banco de dados"""
     user_repo.init_database(reset=reset)
+    revoked_token_repo.init_database()
+
+
+def init_keys():
+    """Cria a chave de assinatura EdDSA, se configurada, antes de iniciar os workers"""
+    if Config.JWT_ALGORITHM == 'EdDSA':
+        get_key_store()
 
 
 if __name__ == '__main__':
     init_db(reset=False)
+    init_keys()
     print(f"🚀 Serviço de Autenticação iniciado na porta {Config.PORT}")
     print(f"📍 Acesse: http://{Config.HOST}:{Config.PORT}")
     app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
@@ -10,5 +10,63 @@ class Config:
     PORT = int(os.getenv('AUTH_PORT', 5000))
     HOST = os.getenv('AUTH_HOST', '0.0.0.0')
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
-    JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', 24))
+    # Tokens de acesso curtos; o refresh token (rotacionado a cada uso em
+    # /refresh) mantém a sessão
+    ACCESS_TOKEN_EXPIRATION_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRATION_MINUTES', 15))
+    REFRESH_TOKEN_EXPIRATION_HOURS = int(os.getenv('REFRESH_TOKEN_EXPIRATION_HOURS', 24 * 14))
+    # Intervalo em que cada processo incorpora as revogações dos demais
+    REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS', 1))
+    REVOCATION_PRUNE_SECONDS = float(os.getenv('REVOCATION_PRUNE_SECONDS', 60))
 
+    # Username, email e versão do usuário ('uv') nos tokens: o /verify responde
+    # pelos claims e por um cache de versões, sem ler a tabela de usuários.
+    # Alterações de versão feitas por outro processo valem após o TTL do cache
+    JWT_USER_CLAIMS = os.getenv('JWT_USER_CLAIMS', 'True').lower() == 'true'
+    USER_VERSION_CACHE_SIZE = int(os.getenv('USER_VERSION_CACHE_SIZE', 10000))
+    USER_VERSION_CACHE_TTL_SECONDS = float(os.getenv('USER_VERSION_CACHE_TTL_SECONDS', 30))
+
+    # Assinatura dos tokens: HS256 (padrão) ou EdDSA (chave assimétrica com kid,
+    # permite que outros serviços verifiquem tokens localmente via JWKS)
+    JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
+    JWT_PRIVATE_KEY_PATH = os.getenv('JWT_PRIVATE_KEY_PATH', 'jwt_signing_key.pem')
+    JWT_EXTRA_PUBLIC_KEY_PATHS = [p for p in os.getenv('JWT_EXTRA_PUBLIC_KEY_PATHS', '').split(',') if p]
+
+    # Pool de conexões SQLite
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 64 * 1024 * 1024))
+    SQLITE_CACHED_STATEMENTS = int(os.getenv('SQLITE_CACHED_STATEMENTS', 128))
+    # Conexões abertas por banco (em uso + ociosas reaproveitadas entre threads)
+    SQLITE_MAX_CONNECTIONS = int(os.getenv('SQLITE_MAX_CONNECTIONS', 64))
+
+    # Hash de senhas (scrypt): custo ajustável por implantação; hashes antigos
+    # guardam os próprios parâmetros e são regerados no próximo login
+    PASSWORD_HASH_N = int(os.getenv('PASSWORD_HASH_N', 2 ** 14))
+    PASSWORD_HASH_R = int(os.getenv('PASSWORD_HASH_R', 8))
+    PASSWORD_HASH_P = int(os.getenv('PASSWORD_HASH_P', 1))
+    PASSWORD_HASH_SALT_BYTES = int(os.getenv('PASSWORD_HASH_SALT_BYTES', 16))
+    # Processos do pool de hashing (0 calcula na thread da requisição). Cada
+    # worker do servidor tem o próprio pool: no total são WSGI_WORKERS x este
+    # valor processos. O launcher define CPUs // WSGI_WORKERS (mínimo 1) se a
+    # variável não estiver definida; o padrão abaixo vale para um único processo
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    # Cálculos em andamento + na fila (0 = 4 por processo) e espera por uma vaga
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+
+    # Limite de taxa (token bucket). Backend 'memory' vale por processo;
+    # 'sqlite' compartilha os buckets entre as réplicas que usam o mesmo arquivo
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', 'rate_limits.db')
+    # Por endpoint: [(chave, '<requisições>/<segundos>')]; valor vazio desativa.
+    # O limite por conta vale por (username, IP): tentativas de outro endereço
+    # não bloqueiam o login do dono da conta
+    RATE_LIMITS = {
+        'auth.login': [
+            ('ip', os.getenv('RATE_LIMIT_LOGIN_IP', '30/60')),
+            ('username_ip', os.getenv('RATE_LIMIT_LOGIN_USERNAME', '10/60')),
+        ],
+        'auth.register': [('ip', os.getenv('RATE_LIMIT_REGISTER_IP', '10/60'))],
+        'auth.verify': [('token', os.getenv('RATE_LIMIT_VERIFY_TOKEN', '600/60'))],
+        'auth.refresh': [('ip', os.getenv('RATE_LIMIT_REFRESH_IP', '60/60'))],
+    }
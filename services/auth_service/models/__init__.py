@@ -2,6 +2,7 @@
 Models do Auth Service
 """
 from .user import User, UserRepository
+from .revoked_token import RevokedTokenRepository
 
-__all__ = ['User', 'UserRepository']
+__all__ = ['User', 'UserRepository', 'RevokedTokenRepository']
 
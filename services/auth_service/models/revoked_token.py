@@ -0,0 +1,82 @@
+"""
+Modelo de tokens revogados
+"""
+import sqlite3
+from typing import List, Optional, Tuple
+from config import Config
+from shared.sqlite_pool import SQLiteConnectionPool, get_pool
+
+
+class RevokedTokenRepository:
+    """Repositório dos identificadores (jti) de tokens revogados antes de expirar"""
+
+    def __init__(self, database_path: str, pool: Optional[SQLiteConnectionPool] = None):
+        self.database_path = database_path
+        self.pool = pool or get_pool(
+            database_path,
+            busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+            mmap_size=Config.SQLITE_MMAP_SIZE,
+            cached_statements=Config.SQLITE_CACHED_STATEMENTS,
+            max_connections=Config.SQLITE_MAX_CONNECTIONS
+        )
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Obtém a conexão da thread atual a partir do pool"""
+        return self.pool.get_connection()
+
+    def revoke(self, jti: str, expires_at: float) -> int:
+        """
+        Registra a revogação (idempotente)
+
+        Returns:
+            1 se esta chamada revogou o token, 0 se ele já estava revogado
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                (jti, expires_at)
+            )
+            conn.commit()
+            return cursor.rowcount
+        except Exception:
+            conn.rollback()
+            raise
+
+    def list_since(self, last_id: int, now: float) -> List[Tuple[int, str, float]]:
+        """Revogações ainda válidas registradas depois de ``last_id``"""
+        conn = self._get_connection()
+        return conn.execute(
+            'SELECT id, jti, expires_at FROM revoked_tokens WHERE id > ? AND expires_at > ? ORDER BY id',
+            (last_id, now)
+        ).fetchall()
+
+    def delete_expired(self, now: float) -> int:
+        """Remove revogações de tokens que já expiraram"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', (now,))
+            conn.commit()
+            return cursor.rowcount
+        except Exception:
+            conn.rollback()
+            raise
+
+    def init_database(self):
+        """Cria a tabela de revogações"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS revoked_tokens (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    jti TEXT UNIQUE NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens (expires_at)'
+            )
+            conn.commit()
+        finally:
+            cursor.close()
@@ -4,18 +4,23 @@ Modelo de Usuário
 from datetime import datetime
 import sqlite3
 from typing import Optional, Dict, Any
+from config import Config
+from shared.sqlite_pool import SQLiteConnectionPool, get_pool
 
 
 class User:
     """Classe para representar um usuário"""
     
     def __init__(self, user_id: int, username: str, email: str, 
-                 password_hash: str, created_at: Optional[datetime] = None):
+                 password_hash: str, created_at: Optional[datetime] = None,
+                 version: int = 1):
         self.id = user_id
         self.username = username
         self.email = email
         self.password_hash = password_hash
         self.created_at = created_at or datetime.now()
+        # Incrementada a cada alteração que deve invalidar os tokens emitidos
+        self.version = version
     
     def to_dict(self) -> Dict[str, Any]:
         """Converte o usuário para dicionário"""
@@ -29,25 +34,33 @@ class User:
     @classmethod
     def from_db_row(cls, row: tuple) -> 'User':
         """Cria um objeto User a partir de uma linha do banco de dados"""
-        user_id, username, email, password_hash, created_at = row
+        user_id, username, email, password_hash, created_at, version = row
         return cls(
             user_id=user_id,
             username=username,
             email=email,
             password_hash=password_hash,
-            created_at=datetime.fromisoformat(created_at) if created_at else None
+            created_at=datetime.fromisoformat(created_at) if created_at else None,
+            version=version
         )
 
 
 class UserRepository:
     """Repositório para operações de banco de dados de usuários"""
     
-    def __init__(self, database_path: str):
+    def __init__(self, database_path: str, pool: Optional[SQLiteConnectionPool] = None):
         self.database_path = database_path
+        self.pool = pool or get_pool(
+            database_path,
+            busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+            mmap_size=Config.SQLITE_MMAP_SIZE,
+            cached_statements=Config.SQLITE_CACHED_STATEMENTS,
+            max_connections=Config.SQLITE_MAX_CONNECTIONS
+        )
     
     def _get_connection(self) -> sqlite3.Connection:
-        """Obtém conexão com o banco de dados"""
-        return sqlite3.connect(self.database_path)
+        """Obtém a conexão da thread atual a partir do pool"""
+        return self.pool.get_connection()
     
     def create_user(self, username: str, email: str, password_hash: str) -> int:
         """Cria um novo usuário e retorna o ID"""
@@ -61,8 +74,11 @@ class UserRepository:
             user_id = cursor.lastrowid
             conn.commit()
             return user_id
+        except Exception:
+            conn.rollback()
+            raise
         finally:
-            conn.close()
+            cursor.close()
     
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Busca usuário por username"""
@@ -70,7 +86,7 @@ class UserRepository:
         cursor = conn.cursor()
         try:
             cursor.execute(
-                'SELECT id, username, email, password_hash, created_at FROM users WHERE username = ?',
+                'SELECT id, username, email, password_hash, created_at, version FROM users WHERE username = ?',
                 (username,)
             )
             row = cursor.fetchone()
@@ -78,7 +94,7 @@ class UserRepository:
                 return User.from_db_row(row)
             return None
         finally:
-            conn.close()
+            cursor.close()
     
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Busca usuário por ID"""
@@ -86,7 +102,7 @@ class UserRepository:
         cursor = conn.cursor()
         try:
             cursor.execute(
-                'SELECT id, username, email, password_hash, created_at FROM users WHERE id = ?',
+                'SELECT id, username, email, password_hash, created_at, version FROM users WHERE id = ?',
                 (user_id,)
             )
             row = cursor.fetchone()
@@ -94,16 +110,53 @@ class UserRepository:
                 return User.from_db_row(row)
             return None
         finally:
-            conn.close()
+            cursor.close()
+    
+    def update_password_hash(self, user_id: int, password_hash: str) -> bool:
+        """Substitui o hash de senha do usuário (rehash no login)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'UPDATE users SET password_hash = ? WHERE id = ?',
+                (password_hash, user_id)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    def get_user_version(self, user_id: int) -> Optional[int]:
+        """Busca apenas a versão do usuário (None se ele não existir)"""
+        conn = self._get_connection()
+        row = conn.execute('SELECT version FROM users WHERE id = ?', (user_id,)).fetchone()
+        return row[0] if row else None
+    
+    def bump_user_version(self, user_id: int) -> Optional[int]:
+        """Incrementa a versão do usuário, invalidando os tokens já emitidos"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('UPDATE users SET version = version + 1 WHERE id = ?', (user_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        return self.get_user_version(user_id)
+    
+    def pool_stats(self) -> Dict[str, int]:
+        """Retorna estatísticas do pool de conexões (hits/misses)"""
+        return self.pool.stats()
     
     def init_database(self, reset: bool = False):
         """Inicializa o banco de dados"""
-        import os
-        if reset and os.path.exists(self.database_path):
-            try:
-                os.remove(self.database_path)
-            except Exception:
-                pass
+        if reset:
+            self.pool.remove_database()
         
         conn = self._get_connection()
         cursor = conn.cursor()
@@ -114,10 +167,14 @@ class UserRepository:
                     username TEXT UNIQUE NOT NULL,
                     email TEXT UNIQUE NOT NULL,
                     password_hash TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    version INTEGER NOT NULL DEFAULT 1
                 )
             ''')
+            # Bancos criados antes da coluna de versão
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(users)')}
+            if 'version' not in columns:
+                cursor.execute('ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
             conn.commit()
         finally:
-            conn.close()
-
+            cursor.close()
@@ -1,15 +1,51 @@
 """
 Rotas de autenticação
 """
+from typing import Any, Dict, Optional, Tuple
 from flask import Blueprint, request, jsonify
 from models.user import UserRepository
-from utils.password import hash_password, verify_password, validate_password
-from utils.jwt_token import generate_token, verify_token
+from models.revoked_token import RevokedTokenRepository
+from utils.password import (hash_password, verify_password, validate_password, needs_rehash,
+                            get_password_hasher, PasswordHasherBusy)
+from utils.jwt_token import generate_token, generate_refresh_token, decode_token, get_key_store
+from utils.revocation import RevocationIndex
 from config import Config
+from shared.rate_limit import RateLimiter, build_policies, get_bucket_store
+from shared.ttl_cache import TTLCache
 import sqlite3
 
 auth_bp = Blueprint('auth', __name__)
 user_repo = UserRepository(Config.DATABASE)
+rate_limiter = RateLimiter(
+    build_policies(Config.RATE_LIMITS),
+    store=get_bucket_store(Config.RATE_LIMIT_BACKEND, Config.RATE_LIMIT_DB_PATH),
+    enabled=Config.RATE_LIMIT_ENABLED
+)
+rate_limiter.init_blueprint(auth_bp)
+
+# Versão atual de cada usuário, para validar o claim 'uv' sem ler o banco
+user_versions = TTLCache(Config.USER_VERSION_CACHE_SIZE, Config.USER_VERSION_CACHE_TTL_SECONDS)
+revocation_index = RevocationIndex(
+    RevokedTokenRepository(Config.DATABASE),
+    sync_interval=Config.REVOCATION_SYNC_SECONDS,
+    prune_interval=Config.REVOCATION_PRUNE_SECONDS
+)
+
+
+def issue_tokens(user_id: int, username: str, email: str, user_version: int) -> Dict[str, Any]:
+    """Gera o par token de acesso + refresh token da sessão"""
+    return {
+        'token': generate_token(user_id, username, email, user_version=user_version),
+        'refresh_token': generate_refresh_token(user_id, user_version),
+        'expires_in': Config.ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+    }
+
+
+def _hasher_busy_response():
+    """Fila de hashing cheia: o cliente deve tentar novamente"""
+    response = jsonify({'error': 'Serviço sobrecarregado, tente novamente'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -51,18 +87,20 @@ def register():
             # Cria usuário
             user_id = user_repo.create_user(username, email, password_hash)
             
-            # Gera token
-            token = generate_token(user_id)
+            # Gera tokens
+            tokens = issue_tokens(user_id, username, email, user_version=1)
             
             return jsonify({
                 'message': 'Usuário cadastrado com sucesso',
-                'token': token,
+                **tokens,
                 'user_id': user_id
             }), 201
             
         except sqlite3.IntegrityError:
             return jsonify({'error': 'Usuário ou email já existem'}), 400
             
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -95,21 +133,100 @@ def login():
         if not verify_password(password, user.password_hash):
             return jsonify({'error': 'Senha incorreta'}), 401
         
-        # Gera token
-        token = generate_token(user.id)
+        # Hash legado ou com custo desatualizado: regera com a senha recebida
+        if needs_rehash(user.password_hash):
+            try:
+                user_repo.update_password_hash(user.id, hash_password(password))
+            except PasswordHasherBusy:
+                pass  # Fica para o próximo login
+        
+        # Gera tokens
+        tokens = issue_tokens(user.id, user.username, user.email, user.version)
         
         return jsonify({
             'message': 'Login realizado com sucesso',
-            'token': token,
+            **tokens,
             'user_id': user.id,
             'username': user.username,
             'email': user.email
         }), 200
         
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 
+def get_user_version(user_id: int) -> Optional[int]:
+    """Versão atual do usuário, pelo cache (None se o usuário não existir)"""
+    version = user_versions.get(user_id)
+    if version is None:
+        version = user_repo.get_user_version(user_id)
+        if version is not None:
+            user_versions.set(user_id, version)
+    return version
+
+
+def bump_user_version(user_id: int) -> Optional[int]:
+    """Invalida todos os tokens já emitidos para o usuário"""
+    version = user_repo.bump_user_version(user_id)
+    user_versions.invalidate(user_id)
+    return version
+
+
+def verify_user_token(token: str) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    Valida o token e busca o usuário (o mesmo que POST /verify)
+    
+    Tokens com os claims de usuário são respondidos pelos próprios claims,
+    conferindo apenas a versão do usuário; tokens antigos consultam o banco.
+    
+    Args:
+        token: Token JWT
+        
+    Returns:
+        Tupla (dados do usuário, status HTTP): 401 para token inválido ou
+        substituído e 404 para usuário inexistente, com dados None
+    """
+    payload = decode_token(token)
+    if not payload or payload.get('typ', 'access') != 'access':
+        return None, 401
+    
+    jti = payload.get('jti')
+    if jti is not None and revocation_index.is_revoked(jti):
+        return None, 401
+    
+    user_id = payload.get('user_id')
+    if not user_id:
+        return None, 401
+    
+    if 'uv' in payload:
+        version = get_user_version(user_id)
+        if version is None:
+            return None, 404
+        if version != payload['uv']:
+            return None, 401
+        return {
+            'valid': True,
+            'user_id': user_id,
+            'username': payload.get('username'),
+            'email': payload.get('email')
+        }, 200
+    
+    # Busca dados do usuário
+    user = user_repo.get_user_by_id(user_id)
+    
+    if not user:
+        return None, 404
+    
+    return {
+        'valid': True,
+        'user_id': user.id,
+        'username': user.username,
+        'email': user.email
+    }, 200
+
+
 @auth_bp.route('/verify', methods=['POST'])
 def verify():
     """Endpoint para verificar token"""
@@ -119,35 +236,129 @@ def verify():
         if not data or 'token' not in data:
             return jsonify({'error': 'Token é obrigatório'}), 400
         
-        token = data['token']
-        user_id = verify_token(token)
+        user_data, status = verify_user_token(data['token'])
+        if not user_data:
+            message = 'Usuário não encontrado' if status == 404 else 'Token inválido ou expirado'
+            return jsonify({'error': message}), status
         
-        if not user_id:
-            return jsonify({'error': 'Token inválido ou expirado'}), 401
+        return jsonify(user_data), 200
         
-        # Busca dados do usuário
-        user = user_repo.get_user_by_id(user_id)
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    """Endpoint que troca um refresh token por um novo par de tokens"""
+    try:
+        data = request.get_json(silent=True)
+        
+        if not data or not data.get('refresh_token'):
+            return jsonify({'error': 'Refresh token é obrigatório'}), 400
+        
+        payload = decode_token(data['refresh_token'])
+        if (not payload or payload.get('typ') != 'refresh'
+                or revocation_index.is_revoked(payload.get('jti', ''))):
+            return jsonify({'error': 'Refresh token inválido ou expirado'}), 401
         
+        user = user_repo.get_user_by_id(payload.get('user_id'))
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
+        if user.version != payload.get('uv'):
+            return jsonify({'error': 'Refresh token inválido ou expirado'}), 401
+        
+        # Rotação: o refresh token usado deixa de valer. A revogação é o
+        # "claim" do token: entre requisições concorrentes só uma o renova
+        if not revocation_index.revoke(payload['jti'], payload['exp']):
+            return jsonify({'error': 'Refresh token inválido ou expirado'}), 401
         
         return jsonify({
-            'valid': True,
-            'user_id': user.id,
-            'username': user.username,
-            'email': user.email
+            'message': 'Token renovado com sucesso',
+            **issue_tokens(user.id, user.username, user.email, user.version),
+            'user_id': user.id
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    """Endpoint que revoga o token de acesso e o refresh token da sessão"""
+    try:
+        data = request.get_json(silent=True) or {}
+        tokens = [data.get('token'), data.get('refresh_token')]
+        auth_header = request.headers.get('Authorization', '').split(' ')
+        if len(auth_header) == 2 and auth_header[0] == 'Bearer':
+            tokens.append(auth_header[1])
+        tokens = [token for token in tokens if isinstance(token, str) and token]
+        
+        if not tokens:
+            return jsonify({'error': 'Token é obrigatório'}), 400
+        
+        revoked = 0
+        for token in tokens:
+            payload = decode_token(token)
+            # Tokens inválidos ou sem jti já não são aceitos / não podem ser revogados
+            if payload and payload.get('jti'):
+                revocation_index.revoke(payload['jti'], payload['exp'])
+                revoked += 1
+        
+        return jsonify({'message': 'Logout realizado com sucesso', 'revoked': revoked}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+@auth_bp.route('/logout/all', methods=['POST'])
+def logout_all():
+    """
+    Endpoint que encerra todas as sessões do usuário do token
+    
+    Incrementa a versão do usuário: todos os tokens de acesso e refresh
+    tokens já emitidos deixam de valer. Outros workers do Auth Service
+    percebem a mudança quando a versão sai do cache
+    (USER_VERSION_CACHE_TTL_SECONDS).
+    """
+    try:
+        auth_header = request.headers.get('Authorization', '').split(' ')
+        if len(auth_header) != 2 or auth_header[0] != 'Bearer':
+            return jsonify({'error': 'Token de autorização não fornecido'}), 401
+        
+        user_data, status = verify_user_token(auth_header[1])
+        if not user_data:
+            message = 'Usuário não encontrado' if status == 404 else 'Token inválido ou expirado'
+            return jsonify({'error': message}), status
+        
+        bump_user_version(user_data['user_id'])
+        return jsonify({'message': 'Todas as sessões foram encerradas'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+@auth_bp.route('/.well-known/jwks.json', methods=['GET'])
+def jwks():
+    """Endpoint que publica as chaves públicas de verificação de tokens"""
+    if Config.JWT_ALGORITHM != 'EdDSA':
+        return jsonify({'keys': []}), 200
+    
+    response = jsonify(get_key_store().jwks())
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response, 200
+
+
 @auth_bp.route('/health', methods=['GET'])
 def health():
     """Endpoint de health check"""
     return jsonify({
         'status': 'OK',
         'service': 'auth_service',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'db_pool': user_repo.pool_stats(),
+        'password_hasher': get_password_hasher().stats(),
+        'user_version_cache': user_versions.stats(),
+        'revocation': revocation_index.stats(),
+        'rate_limit': rate_limiter.stats()
     }), 200
 
@@ -6,13 +6,19 @@ import json
 import os
 import sys
 import tempfile
+import threading
 
 # Adiciona o diretório pai ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app, init_db
-from utils.password import hash_password, verify_password
-from utils.jwt_token import generate_token, verify_token
+from utils.password import hash_password, verify_password, needs_rehash, PasswordHasher
+from utils.jwt_token import generate_token, verify_token, decode_token
+from models.user import UserRepository
+from config import Config
+from utils import jwt_keys
+from utils.jwt_keys import SigningKeyStore
+from shared.sqlite_pool import SQLiteConnectionPool
 
 @pytest.fixture
 def client():
@@ -29,8 +35,9 @@ def test_hash_password():
     hashed = hash_password(password)
     
     assert hashed != password
-    assert len(hashed) == 64  # SHA-256 produces 64 character hex string
-    assert hashed == hash_password(password)  # Same password should produce same hash
+    assert hashed.startswith(f'scrypt${Config.PASSWORD_HASH_N}${Config.PASSWORD_HASH_R}$')
+    assert hashed != hash_password(password)  # Sal aleatório: hashes diferentes
+    assert verify_password(password, hash_password(password))
 
 def test_verify_password():
     """Testa verificação de senha"""
@@ -241,4 +248,373 @@ def test_health_check(client):
     assert response_data['service'] == 'auth_service'
 
 
+def test_connection_pool_reuses_thread_connection(tmp_path):
+    """Testa reutilização da conexão da thread e pragmas do pool"""
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'), busy_timeout_ms=1234)
+    repo = UserRepository(str(tmp_path / 'pool.db'), pool=pool)
+    repo.init_database()
+    
+    user_id = repo.create_user('pooluser', 'pool@example.com', 'hash')
+    assert repo.get_user_by_id(user_id).username == 'pooluser'
+    assert repo.get_user_by_username('pooluser').id == user_id
+    
+    stats = repo.pool_stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] >= 2
+    assert stats['open_connections'] == 1
+    
+    conn = pool.get_connection()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 1234
+    
+    # Reset fecha as conexões e recria o banco do zero
+    repo.init_database(reset=True)
+    assert repo.get_user_by_username('pooluser') is None
+    assert repo.pool_stats()['misses'] == 2
+
+
+def test_connection_pool_reuses_connections_of_finished_threads(tmp_path):
+    """Testa que threads por requisição reaproveitam conexões e respeitam o limite"""
+    import gc
+    import sqlite3
+    pool = SQLiteConnectionPool(str(tmp_path / 'threads.db'), busy_timeout_ms=200,
+                                max_connections=2)
+    
+    def request():
+        pool.get_connection().execute('SELECT 1')
+    
+    for _ in range(20):
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+        gc.collect()
+    
+    stats = pool.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 19
+    assert stats['open_connections'] == 1
+    assert stats['idle_connections'] == 1
+    
+    # Com as duas conexões presas a threads vivas, a terceira espera e falha
+    holding, release = threading.Barrier(3), threading.Event()
+    
+    def hold():
+        pool.get_connection()
+        holding.wait()
+        release.wait()
+    
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    holding.wait()
+    with pytest.raises(sqlite3.OperationalError):
+        pool.get_connection()
+    release.set()
+    for thread in threads:
+        thread.join()
+    gc.collect()
+    assert pool.stats()['open_connections'] == 2
+    assert pool.get_connection() is not None
+
+
+def test_concurrent_startup_shares_signing_key(tmp_path):
+    """Testa que workers iniciando juntos sem a chave EdDSA assinam com o mesmo kid"""
+    key_path = str(tmp_path / 'signing_key.pem')
+    barrier = threading.Barrier(8)
+    kids = []
+
+    def start():
+        barrier.wait()
+        kids.append(SigningKeyStore(key_path).kid)
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(kids) == 8 and len(set(kids)) == 1
+    assert os.listdir(tmp_path) == ['signing_key.pem']
+
+
+@pytest.fixture
+def eddsa_keys(tmp_path, monkeypatch):
+    """Ativa assinatura EdDSA com uma chave temporária"""
+    key_store = SigningKeyStore(str(tmp_path / 'signing_key.pem'))
+    monkeypatch.setattr(Config, 'JWT_ALGORITHM', 'EdDSA')
+    monkeypatch.setattr(jwt_keys, '_signing_keys', key_store)
+    return key_store
+
+
+def test_eddsa_token_with_kid(eddsa_keys):
+    """Testa emissão e verificação de token EdDSA com key id"""
+    import jwt
+    hs256_token = jwt.encode({'user_id': 7}, Config.SECRET_KEY, algorithm='HS256')
+    token = generate_token(42)
+    
+    assert jwt.get_unverified_header(token)['kid'] == eddsa_keys.kid
+    assert verify_token(token) == 42
+    # Tokens HS256 emitidos antes da troca continuam válidos
+    assert verify_token(hs256_token) == 7
+
+
+def test_jwks_endpoint(client, eddsa_keys):
+    """Testa publicação das chaves públicas"""
+    response = client.get('/.well-known/jwks.json')
+    assert response.status_code == 200
+    keys = json.loads(response.data)['keys']
+    assert len(keys) == 1
+    assert keys[0]['kid'] == eddsa_keys.kid
+    assert keys[0]['kty'] == 'OKP'
+    assert 'd' not in keys[0]
+
+
+def test_legacy_hash_upgraded_on_login(client):
+    """Testa que hashes SHA-256 antigos são regerados no login"""
+    import hashlib
+    from routes.auth_routes import user_repo
+    import uuid
+    username = f'legacy-{uuid.uuid4().hex[:8]}'
+    legacy_hash = hashlib.sha256(b'legacy123').hexdigest()
+    user_id = user_repo.create_user(username, f'{username}@example.com', legacy_hash)
+    assert verify_password('legacy123', legacy_hash)
+    assert needs_rehash(legacy_hash)
+    
+    response = client.post('/login', data=json.dumps({
+        'username': username, 'password': 'legacy123'
+    }), content_type='application/json')
+    assert response.status_code == 200
+    
+    upgraded = user_repo.get_user_by_id(user_id).password_hash
+    assert upgraded.startswith('scrypt$')
+    assert not needs_rehash(upgraded)
+    assert verify_password('legacy123', upgraded)
+    
+    response = client.post('/login', data=json.dumps({
+        'username': username, 'password': 'wrong123'
+    }), content_type='application/json')
+    assert response.status_code == 401
+
+
+def test_password_hasher_pool_and_cost_change():
+    """Testa o pool de processos, as métricas e a troca de custo"""
+    hasher = PasswordHasher(n=2 ** 10, r=8, p=1, workers=1)
+    try:
+        hashed = hasher.hash('secret123')
+        assert hasher.verify('secret123', hashed)
+        assert not hasher.verify('other123', hashed)
+        stats = hasher.stats()
+        assert stats['hashes'] == 3
+        assert stats['queue_depth'] == 0
+        assert stats['max_latency_ms'] > 0
+    finally:
+        hasher.shutdown()
+    
+    # Custo maior: hashes antigos continuam válidos, mas devem ser regerados
+    stronger = PasswordHasher(n=2 ** 11, r=8, p=1, workers=0)
+    assert stronger.verify('secret123', hashed)
+    assert stronger.needs_rehash(hashed)
+    assert not stronger.needs_rehash(stronger.hash('secret123'))
+
+
+def test_password_hasher_recovers_from_broken_pool():
+    """Testa que um processo do pool morto não quebra os hashes seguintes"""
+    import signal
+    hasher = PasswordHasher(n=2 ** 10, r=8, p=1, workers=1)
+    try:
+        hashed = hasher.hash('secret123')
+        for process in list(hasher._executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+        assert hasher.verify('secret123', hashed)
+        assert hasher.stats()['pool_restarts'] == 1
+    finally:
+        hasher.shutdown()
+
 
+def test_login_rate_limit_by_username(client, monkeypatch):
+    """Testa limite de tentativas de login por conta e IP com Retry-After"""
+    from routes.auth_routes import rate_limiter
+    from shared.rate_limit import MemoryBucketStore, RateLimitPolicy
+    monkeypatch.setattr(rate_limiter, 'store', MemoryBucketStore(shards=4))
+    monkeypatch.setattr(rate_limiter, 'policies', {
+        'auth.login': [RateLimitPolicy('ip', 100, 60), RateLimitPolicy('username_ip', 2, 60)]
+    })
+    
+    def login(username, ip='10.0.0.1'):
+        return client.post('/login', data=json.dumps({
+            'username': username, 'password': 'wrong123'
+        }), content_type='application/json', environ_base={'REMOTE_ADDR': ip})
+    
+    assert login('target').status_code == 404
+    assert login('Target').status_code == 404
+    response = login('target')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    # Outra conta tem bucket próprio
+    assert login('other').status_code == 404
+    # O dono da conta, de outro endereço, não fica bloqueado
+    assert login('target', ip='10.0.0.2').status_code == 404
+
+
+def test_rate_limit_rejection_spends_no_tokens():
+    """Testa que uma requisição recusada não gasta tokens das outras políticas"""
+    from shared.rate_limit import MemoryBucketStore, RateLimiter, RateLimitPolicy
+    limiter = RateLimiter({
+        'auth.login': [RateLimitPolicy('ip', 2, 60), RateLimitPolicy('username', 1, 60)]
+    }, store=MemoryBucketStore())
+    
+    assert limiter.consume('auth.login', {'username': 'ana'}, '10.0.0.1') == 0
+    # O bucket da conta recusa: o do IP não perde o token
+    assert limiter.consume('auth.login', {'username': 'ana'}, '10.0.0.1') > 0
+    assert limiter.consume('auth.login', {'username': 'bia'}, '10.0.0.1') == 0
+    assert limiter.consume('auth.login', {'username': 'caio'}, '10.0.0.1') > 0
+
+
+def test_verify_from_token_claims(client, monkeypatch):
+    """Testa /verify pelos claims do token, sem consultar a tabela de usuários"""
+    import uuid
+    from routes import auth_routes
+    username = f'claims-{uuid.uuid4().hex[:8]}'
+    email = f'{username}@example.com'
+    response = client.post('/register', data=json.dumps({
+        'username': username, 'email': email, 'password': 'test123'
+    }), content_type='application/json')
+    token = json.loads(response.data)['token']
+    
+    version_reads = []
+    get_user_version = auth_routes.user_repo.get_user_version
+    
+    def counted_get_user_version(user_id):
+        version_reads.append(user_id)
+        return get_user_version(user_id)
+    
+    def no_user_lookup(user_id):
+        raise AssertionError('consulta ao usuário não esperada')
+    
+    monkeypatch.setattr(auth_routes.user_repo, 'get_user_version', counted_get_user_version)
+    monkeypatch.setattr(auth_routes.user_repo, 'get_user_by_id', no_user_lookup)
+    
+    def verify(token):
+        return client.post('/verify', data=json.dumps({'token': token}),
+                           content_type='application/json')
+    
+    for _ in range(3):
+        response = verify(token)
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert (data['username'], data['email']) == (username, email)
+    assert len(version_reads) <= 1
+    
+    # Alterar o usuário invalida os tokens emitidos antes
+    user_id = data['user_id']
+    new_version = auth_routes.bump_user_version(user_id)
+    assert verify(token).status_code == 401
+    fresh = generate_token(user_id, username, email, user_version=new_version)
+    assert verify(fresh).status_code == 200
+    
+    # Tokens sem claims continuam validados pelo banco
+    monkeypatch.undo()
+    assert verify(generate_token(user_id)).status_code == 200
+
+
+def test_refresh_and_logout_revocation(client):
+    """Testa rotação do refresh token e revogação no logout"""
+    import uuid
+    from routes.auth_routes import revocation_index
+    from models.revoked_token import RevokedTokenRepository
+    from utils.revocation import RevocationIndex
+    username = f'session-{uuid.uuid4().hex[:8]}'
+    response = client.post('/register', data=json.dumps({
+        'username': username, 'email': f'{username}@example.com', 'password': 'test123'
+    }), content_type='application/json')
+    tokens = json.loads(response.data)
+    assert tokens['expires_in'] == Config.ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+    
+    def post(path, body):
+        return client.post(path, data=json.dumps(body), content_type='application/json')
+    
+    # Refresh token não serve como token de acesso
+    assert post('/verify', {'token': tokens['refresh_token']}).status_code == 401
+    assert verify_token(tokens['refresh_token']) is None
+    
+    response = post('/refresh', {'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+    renewed = json.loads(response.data)
+    assert post('/verify', {'token': renewed['token']}).status_code == 200
+    # O refresh token usado foi rotacionado
+    assert post('/refresh', {'refresh_token': tokens['refresh_token']}).status_code == 401
+    
+    response = post('/logout', {'token': renewed['token'], 'refresh_token': renewed['refresh_token']})
+    assert response.status_code == 200
+    assert json.loads(response.data)['revoked'] == 2
+    assert post('/verify', {'token': renewed['token']}).status_code == 401
+    assert post('/refresh', {'refresh_token': renewed['refresh_token']}).status_code == 401
+    assert post('/logout', {}).status_code == 400
+    
+    # Outro processo carrega as revogações persistidas
+    other = RevocationIndex(RevokedTokenRepository(Config.DATABASE))
+    other.sync()
+    assert other.is_revoked(decode_token(renewed['token'])['jti'])
+    assert not other.is_revoked(decode_token(tokens['token'])['jti'])
+    assert revocation_index.stats()['revoked_tokens'] >= 3
+
+
+def test_logout_all_invalidates_issued_tokens(client, monkeypatch):
+    """Testa que /logout/all invalida todos os tokens já emitidos para o usuário"""
+    import uuid
+    from routes.auth_routes import rate_limiter
+    from shared.rate_limit import MemoryBucketStore
+    monkeypatch.setattr(rate_limiter, 'store', MemoryBucketStore())
+    username = f'everywhere-{uuid.uuid4().hex[:8]}'
+    
+    def post(path, body, headers=None):
+        return client.post(path, data=json.dumps(body), content_type='application/json',
+                           headers=headers)
+    
+    first = json.loads(post('/register', {
+        'username': username, 'email': f'{username}@example.com', 'password': 'test123'
+    }).data)
+    second = json.loads(post('/login', {'username': username, 'password': 'test123'}).data)
+    assert post('/verify', {'token': first['token']}).status_code == 200
+    
+    assert post('/logout/all', {}).status_code == 401
+    response = post('/logout/all', {}, headers={'Authorization': f"Bearer {first['token']}"})
+    assert response.status_code == 200
+    
+    for session in (first, second):
+        assert post('/verify', {'token': session['token']}).status_code == 401
+        assert post('/refresh', {'refresh_token': session['refresh_token']}).status_code == 401
+    
+    # Um novo login volta a funcionar
+    fresh = json.loads(post('/login', {'username': username, 'password': 'test123'}).data)
+    assert post('/verify', {'token': fresh['token']}).status_code == 200
+
+
+def test_concurrent_refresh_rotates_once(client, monkeypatch):
+    """Testa que requisições concorrentes com o mesmo refresh token renovam uma única vez"""
+    import uuid
+    from app import app
+    from routes.auth_routes import rate_limiter
+    from shared.rate_limit import MemoryBucketStore
+    monkeypatch.setattr(rate_limiter, 'store', MemoryBucketStore())
+    username = f'racer-{uuid.uuid4().hex[:8]}'
+    tokens = json.loads(client.post('/register', data=json.dumps({
+        'username': username, 'email': f'{username}@example.com', 'password': 'test123'
+    }), content_type='application/json').data)
+    
+    barrier = threading.Barrier(8)
+    statuses = []
+    
+    def refresh():
+        with app.test_client() as own_client:
+            barrier.wait()
+            response = own_client.post('/refresh', data=json.dumps({'refresh_token': tokens['refresh_token']}),
+                                       content_type='application/json')
+            statuses.append(response.status_code)
+    
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(statuses) == [200] + [401] * 7
@@ -1,8 +1,13 @@
 """
 Utils do Auth Service
 """
-from .password import hash_password, verify_password, validate_password
-from .jwt_token import generate_token, verify_token
-
-__all__ = ['hash_password', 'verify_password', 'validate_password', 'generate_token', 'verify_token']
+from .password import (hash_password, verify_password, validate_password, needs_rehash,
+                       PasswordHasher, PasswordHasherBusy, get_password_hasher)
+from .jwt_token import generate_token, generate_refresh_token, verify_token, decode_token
+from .jwt_keys import SigningKeyStore, get_signing_keys
+from .revocation import RevocationIndex
 
+__all__ = ['hash_password', 'verify_password', 'validate_password', 'needs_rehash',
+           'PasswordHasher', 'PasswordHasherBusy', 'get_password_hasher', 'generate_token',
+           'generate_refresh_token', 'verify_token', 'decode_token', 'SigningKeyStore',
+           'get_signing_keys', 'RevocationIndex']
@@ -0,0 +1,86 @@
+"""
+Chaves assimétricas para assinatura de tokens JWT (EdDSA / Ed25519)
+"""
+import base64
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from jwt.algorithms import OKPAlgorithm
+
+from shared.key_files import create_exclusive
+
+
+def compute_kid(public_key: Ed25519PublicKey) -> str:
+    """Calcula o key id como thumbprint RFC 7638 da chave pública"""
+    jwk = OKPAlgorithm.to_jwk(public_key, as_dict=True)
+    canonical = json.dumps({'crv': jwk['crv'], 'kty': jwk['kty'], 'x': jwk['x']},
+                           separators=(',', ':'), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+class SigningKeyStore:
+    """
+    Chave privada de assinatura e conjunto de chaves públicas publicadas
+
+    A chave privada é carregada (ou gerada) em ``private_key_path``. Chaves
+    públicas antigas listadas em ``extra_public_key_paths`` continuam publicadas
+    para que tokens emitidos antes de uma rotação ainda sejam aceitos.
+    """
+
+    def __init__(self, private_key_path: str, extra_public_key_paths: Optional[List[str]] = None):
+        self.private_key_path = private_key_path
+        self.private_key = self._load_or_generate_private_key()
+        self.kid = compute_kid(self.private_key.public_key())
+        self.public_keys: Dict[str, Ed25519PublicKey] = {self.kid: self.private_key.public_key()}
+        for path in extra_public_key_paths or []:
+            with open(path, 'rb') as f:
+                public_key = serialization.load_pem_public_key(f.read())
+            self.public_keys[compute_kid(public_key)] = public_key
+
+    def _load_or_generate_private_key(self) -> Ed25519PrivateKey:
+        """
+        Carrega chave existente ou gera uma nova
+
+        Se vários workers iniciarem sem o arquivo, só um cria a chave; os
+        demais carregam a que ele gravou (todos assinam com o mesmo kid).
+        """
+        if not os.path.exists(self.private_key_path):
+            pem = Ed25519PrivateKey.generate().private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+            create_exclusive(self.private_key_path, pem)
+        with open(self.private_key_path, 'rb') as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+
+    def get_public_key(self, kid: str) -> Optional[Ed25519PublicKey]:
+        """Obtém a chave pública pelo key id"""
+        return self.public_keys.get(kid)
+
+    def jwks(self) -> Dict[str, Any]:
+        """Retorna o conjunto de chaves públicas no formato JWKS"""
+        keys = []
+        for kid, public_key in self.public_keys.items():
+            jwk = OKPAlgorithm.to_jwk(public_key, as_dict=True)
+            jwk.update({'kid': kid, 'alg': 'EdDSA', 'use': 'sig'})
+            keys.append(jwk)
+        return {'keys': keys}
+
+
+# Instância global das chaves de assinatura
+_signing_keys: Optional[SigningKeyStore] = None
+
+
+def get_signing_keys(private_key_path: str = 'jwt_signing_key.pem',
+                     extra_public_key_paths: Optional[List[str]] = None) -> SigningKeyStore:
+    """Obtém as chaves de assinatura (singleton)"""
+    global _signing_keys
+    if _signing_keys is None:
+        _signing_keys = SigningKeyStore(private_key_path, extra_public_key_paths)
+    return _signing_keys
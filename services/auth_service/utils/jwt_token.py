@@ -1,45 +1,123 @@
 """
 Utilitários para manipulação de tokens JWT
 """
+import secrets
 import jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from config import Config
+from utils.jwt_keys import SigningKeyStore, get_signing_keys
 
 
-def generate_token(user_id: int) -> str:
+def get_key_store() -> SigningKeyStore:
+    """Obtém as chaves de assinatura assimétrica configuradas"""
+    return get_signing_keys(Config.JWT_PRIVATE_KEY_PATH, Config.JWT_EXTRA_PUBLIC_KEY_PATHS)
+
+
+def _encode(payload: Dict[str, Any]) -> str:
+    """Assina o payload com o algoritmo configurado"""
+    if Config.JWT_ALGORITHM == 'EdDSA':
+        key_store = get_key_store()
+        return jwt.encode(payload, key_store.private_key, algorithm='EdDSA',
+                          headers={'kid': key_store.kid})
+    return jwt.encode(payload, Config.SECRET_KEY, algorithm='HS256')
+
+
+def generate_token(user_id: int, username: str = None, email: str = None,
+                   user_version: int = None) -> str:
     """
-    Gera token JWT para o usuário
+    Gera token de acesso JWT para o usuário
+    
+    Expira em ACCESS_TOKEN_EXPIRATION_MINUTES e tem um identificador
+    ('jti') para poder ser revogado.
+    
+    Com JWT_USER_CLAIMS ativo, username, email e a versão do usuário ('uv')
+    vão no token e o /verify responde sem consultar a tabela de usuários.
     
     Args:
         user_id: ID do usuário
+        username: Username (claim opcional)
+        email: Email (claim opcional)
+        user_version: Versão atual do usuário (claim opcional)
         
     Returns:
         Token JWT codificado
     """
+    now = datetime.utcnow()
     payload = {
         'user_id': user_id,
-        'iat': datetime.utcnow(),
-        'exp': datetime.utcnow() + timedelta(hours=Config.JWT_EXPIRATION_HOURS)
+        'typ': 'access',
+        'jti': secrets.token_urlsafe(12),
+        'iat': now,
+        'exp': now + timedelta(minutes=Config.ACCESS_TOKEN_EXPIRATION_MINUTES)
     }
-    return jwt.encode(payload, Config.SECRET_KEY, algorithm='HS256')
+    if Config.JWT_USER_CLAIMS and user_version is not None:
+        payload.update({'username': username, 'email': email, 'uv': user_version})
+    return _encode(payload)
 
 
-def verify_token(token: str) -> Optional[int]:
+def generate_refresh_token(user_id: int, user_version: int) -> str:
+    """
+    Gera refresh token JWT, aceito apenas por /refresh e /logout
+    
+    Args:
+        user_id: ID do usuário
+        user_version: Versão atual do usuário
+        
+    Returns:
+        Token JWT codificado
+    """
+    now = datetime.utcnow()
+    return _encode({
+        'user_id': user_id,
+        'typ': 'refresh',
+        'jti': secrets.token_urlsafe(12),
+        'uv': user_version,
+        'iat': now,
+        'exp': now + timedelta(hours=Config.REFRESH_TOKEN_EXPIRATION_HOURS)
+    })
+
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Verifica e decodifica o token JWT
     
+    Aceita tanto tokens HS256 quanto EdDSA, para que a troca de algoritmo
+    não invalide tokens já emitidos.
+    
     Args:
         token: Token JWT a ser verificado
         
     Returns:
-        ID do usuário se o token for válido, None caso contrário
+        Claims do token se ele for válido, None caso contrário
     """
     try:
-        payload = jwt.decode(token, Config.SECRET_KEY, algorithms=['HS256'])
-        return payload.get('user_id')
+        header = jwt.get_unverified_header(token)
+        if header.get('alg') == 'EdDSA':
+            public_key = get_key_store().get_public_key(header.get('kid', ''))
+            if public_key is None:
+                return None
+            payload = jwt.decode(token, public_key, algorithms=['EdDSA'])
+        else:
+            payload = jwt.decode(token, Config.SECRET_KEY, algorithms=['HS256'])
+        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+
+def verify_token(token: str) -> Optional[int]:
+    """
+    Verifica o token JWT de acesso
+    
+    Args:
+        token: Token JWT a ser verificado
+        
+    Returns:
+        ID do usuário se o token for válido, None caso contrário
+    """
+    payload = decode_token(token)
+    if not payload or payload.get('typ', 'access') != 'access':
+        return None
+    return payload.get('user_id')
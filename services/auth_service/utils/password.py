@@ -1,34 +1,274 @@
 """
 Utilitários para manipulação de senhas
+
+Hashes novos usam scrypt e descrevem a si mesmos:
+
+    scrypt$<n>$<r>$<p>$<salt base64>$<hash base64>
+
+O custo (n, r, p) pode ser ajustado por implantação sem invalidar os hashes
+existentes, pois cada hash carrega os parâmetros com que foi gerado. Hashes
+antigos (SHA-256 hexadecimal, sem sal) continuam aceitos e são substituídos
+no próximo login bem-sucedido (``needs_rehash``).
+
+O scrypt consome CPU e memória: o cálculo roda em um pool de processos
+limitado, fora das threads que atendem requisições.
 """
+import base64
 import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from config import Config
+
+SCHEME = 'scrypt'
+
+
+class PasswordHasherBusy(Exception):
+    """A fila de hashing está cheia; a requisição deve ser repetida depois"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+def _parse_hash(password_hash: str) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+    """Extrai (n, r, p, sal, hash) de um hash scrypt, ou None se não for um"""
+    parts = password_hash.split('$')
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    try:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        return n, r, p, _b64decode(parts[4]), _b64decode(parts[5])
+    except ValueError:
+        return None
+
+
+def _is_legacy_hash(password_hash: str) -> bool:
+    """SHA-256 hexadecimal do formato original"""
+    return len(password_hash) == 64 and all(c in '0123456789abcdef' for c in password_hash)
+
+
+class PasswordHasher:
+    """
+    Hash de senhas com scrypt em um pool de processos limitado
+
+    Até ``max_pending`` cálculos ficam em andamento ou na fila; acima disso a
+    chamada espera até ``queue_timeout`` segundos por uma vaga e então levanta
+    ``PasswordHasherBusy``. Com ``workers=0`` o cálculo roda na própria thread
+    (testes e desenvolvimento).
+    """
+
+    def __init__(self, n: int = None, r: int = None, p: int = None,
+                 salt_bytes: int = None, workers: int = None,
+                 max_pending: int = None, queue_timeout: float = None):
+        self.n = n or Config.PASSWORD_HASH_N
+        self.r = r or Config.PASSWORD_HASH_R
+        self.p = p or Config.PASSWORD_HASH_P
+        self.salt_bytes = salt_bytes or Config.PASSWORD_HASH_SALT_BYTES
+        self.workers = Config.PASSWORD_HASH_WORKERS if workers is None else workers
+        self.max_pending = max_pending or Config.PASSWORD_HASH_MAX_PENDING or max(1, self.workers) * 4
+        self.queue_timeout = Config.PASSWORD_HASH_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self._executor: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._peak_pending = 0
+        self._hashes = 0
+        self._rejected = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._restarts = 0
+
+    def _get_executor(self) -> Executor:
+        """Cria o pool na primeira utilização (após o fork dos workers do servidor)"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: o processo do serviço tem threads, fork não é seguro
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def _run_in_pool(self, password: bytes, kwargs: Dict) -> bytes:
+        """
+        Calcula o scrypt no pool, recriando-o se um processo do pool morreu
+
+        Um processo morto (OOM killer, sinal) quebra o pool inteiro: todas as
+        chamadas seguintes falhariam até o worker do servidor ser reciclado.
+        O pool quebrado é descartado e o cálculo é repetido uma vez em um novo.
+        """
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return executor.submit(hashlib.scrypt, password, **kwargs).result()
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                if attempt:
+                    raise
+
+    def _discard_executor(self, executor: Executor):
+        """Descarta o pool quebrado (se outra thread ainda não o substituiu)"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._restarts += 1
+        executor.shutdown(wait=False)
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+        """Calcula o scrypt no pool, contabilizando fila e latência"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy('Fila de hashing de senhas cheia')
+
+        with self._lock:
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+        started = time.perf_counter()
+        try:
+            kwargs = {'salt': salt, 'n': n, 'r': r, 'p': p, 'dklen': dklen,
+                      # Memória usada pelo scrypt: 128 * r * n (com folga)
+                      'maxmem': 256 * r * n + 1024 * 1024}
+            if self.workers > 0:
+                return self._run_in_pool(password.encode(), kwargs)
+            return hashlib.scrypt(password.encode(), **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._pending -= 1
+                self._hashes += 1
+                self._total_latency += elapsed
+                self._max_latency = max(self._max_latency, elapsed)
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """
+        Gera o hash de uma senha com os parâmetros atuais
+
+        Args:
+            password: Senha em texto plano
+
+        Returns:
+            Hash no formato scrypt$n$r$p$sal$hash
+        """
+        salt = os.urandom(self.salt_bytes)
+        derived = self._derive(password, salt, self.n, self.r, self.p, 32)
+        return f'{SCHEME}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(derived)}'
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """
+        Verifica uma senha contra um hash scrypt ou SHA-256 legado
+
+        Args:
+            password: Senha em texto plano
+            password_hash: Hash armazenado
+
+        Returns:
+            True se a senha está correta, False caso contrário
+        """
+        parsed = _parse_hash(password_hash)
+        if parsed is None:
+            if _is_legacy_hash(password_hash):
+                legacy = hashlib.sha256(password.encode()).hexdigest()
+                return hmac.compare_digest(legacy, password_hash)
+            return False
+        n, r, p, salt, expected = parsed
+        derived = self._derive(password, salt, n, r, p, len(expected))
+        return hmac.compare_digest(derived, expected)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Indica se o hash é legado ou foi gerado com parâmetros diferentes dos atuais"""
+        parsed = _parse_hash(password_hash)
+        return parsed is None or parsed[:3] != (self.n, self.r, self.p)
+
+    def stats(self) -> Dict[str, float]:
+        """Métricas: profundidade da fila e latência dos cálculos"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self._pending,
+                'peak_queue_depth': self._peak_pending,
+                'max_pending': self.max_pending,
+                'hashes': self._hashes,
+                'rejected': self._rejected,
+                'pool_restarts': self._restarts,
+                'avg_latency_ms': round(self._total_latency / self._hashes * 1000, 2) if self._hashes else 0.0,
+                'max_latency_ms': round(self._max_latency * 1000, 2),
+            }
+
+    def shutdown(self):
+        """Encerra o pool de processos"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Retorna o hasher compartilhado pelo processo"""
+    global _password_hasher
+    if _password_hasher is None:
+        with _hasher_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasher()
+    return _password_hasher
 
 
 def hash_password(password: str) -> str:
     """
-    Gera hash da senha usando SHA-256
-    
+    Gera hash da senha usando scrypt com sal aleatório
+
     Args:
         password: Senha em texto plano
-        
+
     Returns:
-        Hash hexadecimal da senha
+        Hash autodescritivo da senha
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    return get_password_hasher().hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     """
     Verifica se a senha está correta
-    
+
     Args:
         password: Senha em texto plano
         password_hash: Hash da senha armazenado
-        
+
     Returns:
         True se a senha está correta, False caso contrário
     """
-    return hash_password(password) == password_hash
+    return get_password_hasher().verify(password, password_hash)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """
+    Indica se o hash armazenado deve ser regerado no próximo login
+
+    Args:
+        password_hash: Hash da senha armazenado
+
+    Returns:
+        True para hashes SHA-256 legados ou com custo desatualizado
+    """
+    return get_password_hasher().needs_rehash(password_hash)
 
 
 def validate_password(password: str) -> tuple[bool, str]:
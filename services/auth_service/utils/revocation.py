@@ -0,0 +1,114 @@
+"""
+Índice em memória dos tokens revogados
+"""
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from models.revoked_token import RevokedTokenRepository
+
+
+class RevocationIndex:
+    """
+    Conjunto dos ``jti`` revogados, consultado em toda verificação de token
+
+    A consulta é uma busca em dicionário, sem lock nem alocação: as escritas
+    (revogações e limpeza) trocam ou alteram o dicionário sob lock e a leitura
+    sempre enxerga um dicionário consistente. Cada revogação é gravada no
+    SQLite; uma thread de fundo traz a cada ``sync_interval`` segundos as
+    revogações feitas por outros processos e descarta as de tokens expirados,
+    então o índice só guarda tokens que ainda seriam aceitos.
+    """
+
+    def __init__(self, repository: RevokedTokenRepository, sync_interval: float = 1.0,
+                 prune_interval: float = 60.0):
+        self.repository = repository
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self._revoked: Dict[str, float] = {}
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._syncs = 0
+        self._pruned = 0
+
+    def is_revoked(self, jti: str) -> bool:
+        """Indica se o token foi revogado (caminho quente do /verify)"""
+        if self._thread is None:
+            self.start()
+        return jti in self._revoked
+
+    def revoke(self, jti: str, expires_at: float) -> bool:
+        """
+        Revoga um token até a sua expiração
+
+        O banco decide quem revogou primeiro, inclusive entre processos: só
+        uma chamada por ``jti`` retorna True (ex.: a rotação do refresh token).
+
+        Args:
+            jti: Identificador do token
+            expires_at: Expiração do token (timestamp Unix)
+
+        Returns:
+            True se esta chamada revogou o token; False se ele já estava
+            revogado ou expirado
+        """
+        if expires_at <= time.time():
+            return False
+        revoked = self.repository.revoke(jti, expires_at) > 0
+        with self._lock:
+            self._revoked[jti] = expires_at
+        return revoked
+
+    def start(self):
+        """Carrega as revogações existentes e inicia a sincronização em segundo plano"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='revocation-sync', daemon=True)
+        self.sync()
+        self._thread.start()
+
+    def sync(self):
+        """Incorpora as revogações gravadas desde a última sincronização"""
+        try:
+            rows = self.repository.list_since(self._last_id, time.time())
+        except sqlite3.Error:
+            return
+        with self._lock:
+            for row_id, jti, expires_at in rows:
+                self._revoked[jti] = expires_at
+                self._last_id = max(self._last_id, row_id)
+            self._syncs += 1
+
+    def prune(self):
+        """Descarta as revogações de tokens já expirados (memória e banco)"""
+        now = time.time()
+        with self._lock:
+            active = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+            self._pruned += len(self._revoked) - len(active)
+            self._revoked = active
+        try:
+            self.repository.delete_expired(now)
+        except sqlite3.Error:
+            pass
+
+    def _run(self):
+        """Laço da thread de sincronização"""
+        next_prune = time.monotonic() + self.prune_interval
+        while True:
+            time.sleep(self.sync_interval)
+            self.sync()
+            if time.monotonic() >= next_prune:
+                self.prune()
+                next_prune = time.monotonic() + self.prune_interval
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna estatísticas do índice"""
+        with self._lock:
+            return {
+                'revoked_tokens': len(self._revoked),
+                'syncs': self._syncs,
+                'pruned': self._pruned
+            }
@@ -10,9 +10,14 @@ current_dir = Path(__file__).parent
 if str(current_dir) not in sys.path:
     sys.path.insert(0, str(current_dir))
 
+# Diretório services/ para os componentes compartilhados
+services_dir = current_dir.parent
+if str(services_dir) not in sys.path:
+    sys.path.append(str(services_dir))
+
 from flask import Flask
 from config import Config
-from routes.encryption_routes import encryption_bp
+from routes.encryption_routes import encryption_bp, encryption_service
 
 app = Flask(__name__)
 
@@ -20,6 +25,11 @@ app = Flask(__name__)
 app.register_blueprint(encryption_bp)
 
 
+def init_keys():
+    """Cria o arquivo de chaves mestras, se ainda não existir, antes de iniciar os workers"""
+    return encryption_service.primary_key_id
+
+
 if __name__ == '__main__':
     print(f"🔐 Serviço de Criptografia iniciado na porta {Config.PORT}")
     print(f"📍 Acesse: http://{Config.HOST}:{Config.PORT}")
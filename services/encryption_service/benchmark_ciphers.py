@@ -0,0 +1,65 @@
+"""
+Benchmark dos formatos de texto criptografado (Fernet x AES-256-GCM)
+
+Uso:
+    python benchmark_ciphers.py [--iterations 20000] [--length 16]
+
+Mede a vazão de criptografia/descriptografia com chave de dados (o caminho
+usado pelo cofre) e o tamanho médio do texto gerado, que determina o tamanho
+do banco e dos payloads JSON.
+"""
+import argparse
+import os
+import secrets
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Diretório services/ para os componentes compartilhados
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from utils.encryption import EncryptionService, FORMAT_AESGCM, FORMAT_FERNET
+
+
+def _measure(function, items) -> float:
+    """Executa a função sobre os itens e retorna operações por segundo"""
+    started_at = time.perf_counter()
+    for item in items:
+        function(item)
+    return len(items) / (time.perf_counter() - started_at)
+
+
+def benchmark(cipher_format: str, key_path: str, passwords):
+    """Mede um formato; retorna (cripto/s, decripto/s, tamanho médio)"""
+    service = EncryptionService(key_path, cipher_format=cipher_format)
+    data_key = service.generate_data_key()
+    encrypt_rate = _measure(lambda p: service.encrypt(p, data_key), passwords)
+    ciphertexts = [service.encrypt(p, data_key) for p in passwords]
+    decrypt_rate = _measure(lambda c: service.decrypt(c, data_key), ciphertexts)
+    average_size = sum(len(c) for c in ciphertexts) / len(ciphertexts)
+    return encrypt_rate, decrypt_rate, average_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara os formatos de criptografia')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--length', type=int, default=16, help='Tamanho das senhas')
+    args = parser.parse_args()
+
+    alphabet = string.ascii_letters + string.digits + string.punctuation
+    passwords = [''.join(secrets.choice(alphabet) for _ in range(args.length))
+                 for _ in range(args.iterations)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = os.path.join(tmp, 'benchmark.key')
+        print(f"{'formato':<8} {'cripto/s':>12} {'decripto/s':>12} {'bytes':>7}")
+        for cipher_format in (FORMAT_FERNET, FORMAT_AESGCM):
+            encrypt_rate, decrypt_rate, size = benchmark(cipher_format, key_path, passwords)
+            print(f"{cipher_format:<8} {encrypt_rate:>12,.0f} {decrypt_rate:>12,.0f} {size:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,4 +9,29 @@ class Config:
     HOST = os.getenv('ENCRYPTION_HOST', '0.0.0.0')
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     FERNET_KEY_PATH = os.getenv('FERNET_KEY_PATH', 'fernet_key.key')
+    MAX_BATCH_SIZE = int(os.getenv('ENCRYPTION_MAX_BATCH_SIZE', 1000))
 
+    # Formato das novas escritas: 'aesgcm' (AES-256-GCM) ou 'fernet'
+    CIPHER_FORMAT = os.getenv('ENCRYPTION_CIPHER_FORMAT', 'aesgcm')
+    # Intervalo mínimo entre releituras do arquivo de chaves, feitas quando
+    # chega um key id desconhecido (chave nova de uma rotação)
+    KEY_RELOAD_MIN_INTERVAL_SECONDS = float(os.getenv('KEY_RELOAD_MIN_INTERVAL_SECONDS', 5))
+
+    # Cache de chaves de dados desembrulhadas (criptografia envelope)
+    DATA_KEY_CACHE_SIZE = int(os.getenv('DATA_KEY_CACHE_SIZE', 1024))
+    DATA_KEY_CACHE_TTL_SECONDS = float(os.getenv('DATA_KEY_CACHE_TTL_SECONDS', 300))
+
+    # Limite de taxa (token bucket). Backend 'memory' vale por processo;
+    # 'sqlite' compartilha os buckets entre as réplicas que usam o mesmo arquivo
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', 'rate_limits.db')
+    # Por endpoint: [(chave, '<requisições>/<segundos>')]; valor vazio desativa.
+    # Desativados por padrão: os clientes são outros serviços e todas as
+    # requisições de um Password Manager chegam do mesmo IP, então um limite
+    # por IP seria dividido entre todos os usuários. Os limites por usuário
+    # ficam no Password Manager; defina estes só se o serviço ficar exposto
+    RATE_LIMITS = {
+        'encryption.decrypt': [('ip', os.getenv('RATE_LIMIT_DECRYPT_IP', ''))],
+        'encryption.decrypt_batch': [('ip', os.getenv('RATE_LIMIT_DECRYPT_BATCH_IP', ''))],
+    }
@@ -0,0 +1,36 @@
+"""
+Rotaciona a chave mestra do Encryption Service
+
+Uso:
+    python rotate_key.py [--key-path fernet_key.key]
+
+Adiciona uma nova chave primária no início do arquivo de chaves, mantendo as
+anteriores para leitura. Os processos em execução (Encryption Service e
+Password Managers com criptografia embutida) relêem o arquivo em até
+KEY_RELOAD_MIN_INTERVAL_SECONDS, sem reiniciar. Depois desse intervalo execute password_manager_service/reencrypt.py --reset para
+re-criptografar o cofre com a nova chave.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Diretório services/ para os componentes compartilhados
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import Config
+from utils.encryption import rotate_key_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera uma nova chave mestra primária')
+    parser.add_argument('--key-path', default=Config.FERNET_KEY_PATH,
+                        help='Arquivo de chaves (padrão: FERNET_KEY_PATH)')
+    args = parser.parse_args()
+
+    key_id = rotate_key_file(args.key_path)
+    print(f"🔑 Nova chave primária: {key_id} ({args.key_path})")
+
+
+if __name__ == '__main__':
+    main()
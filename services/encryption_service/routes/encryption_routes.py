@@ -4,9 +4,22 @@ Rotas do Encryption Service
 from flask import Blueprint, request, jsonify
 from utils.encryption import get_encryption_service
 from config import Config
+from shared.rate_limit import RateLimiter, build_policies, get_bucket_store
 
 encryption_bp = Blueprint('encryption', __name__)
-encryption_service = get_encryption_service(Config.FERNET_KEY_PATH)
+encryption_service = get_encryption_service(
+    Config.FERNET_KEY_PATH,
+    data_key_cache_size=Config.DATA_KEY_CACHE_SIZE,
+    data_key_cache_ttl=Config.DATA_KEY_CACHE_TTL_SECONDS,
+    cipher_format=Config.CIPHER_FORMAT,
+    key_reload_interval=Config.KEY_RELOAD_MIN_INTERVAL_SECONDS
+)
+rate_limiter = RateLimiter(
+    build_policies(Config.RATE_LIMITS),
+    store=get_bucket_store(Config.RATE_LIMIT_BACKEND, Config.RATE_LIMIT_DB_PATH),
+    enabled=Config.RATE_LIMIT_ENABLED
+)
+rate_limiter.init_blueprint(encryption_bp)
 
 
 @encryption_bp.route('/encrypt', methods=['POST'])
@@ -24,7 +37,7 @@ def encrypt():
             return jsonify({'error': 'Senha não pode ser vazia'}), 400
         
         try:
-            encrypted = encryption_service.encrypt(password)
+            encrypted = encryption_service.encrypt(password, data.get('data_key'))
             return jsonify({
                 'encrypted_password': encrypted
             }), 200
@@ -50,7 +63,7 @@ def decrypt():
             return jsonify({'error': 'Senha criptografada não pode ser vazia'}), 400
         
         try:
-            decrypted = encryption_service.decrypt(encrypted_password)
+            decrypted = encryption_service.decrypt(encrypted_password, data.get('data_key'))
             return jsonify({
                 'password': decrypted
             }), 200
@@ -61,12 +74,124 @@ def decrypt():
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 
+def _get_batch(data, field: str):
+    """
+    Valida o corpo de uma requisição em lote
+    
+    Returns:
+        Tupla (itens, resposta_erro)
+    """
+    if not data or field not in data:
+        return None, (jsonify({'error': f'Campo "{field}" é obrigatório'}), 400)
+    
+    items = data[field]
+    if not isinstance(items, list):
+        return None, (jsonify({'error': f'Campo "{field}" deve ser uma lista'}), 400)
+    
+    if len(items) > Config.MAX_BATCH_SIZE:
+        return None, (jsonify({
+            'error': f'Lote excede o máximo de {Config.MAX_BATCH_SIZE} itens'
+        }), 413)
+    
+    return items, None
+
+
+@encryption_bp.route('/encrypt/batch', methods=['POST'])
+def encrypt_batch():
+    """Endpoint para criptografar várias senhas em uma requisição"""
+    try:
+        data = request.get_json()
+        passwords, error_response = _get_batch(data, 'passwords')
+        if error_response:
+            return error_response
+        
+        results = []
+        for encrypted, error in encryption_service.encrypt_many(passwords, data.get('data_key')):
+            results.append({'error': error} if error else {'encrypted_password': encrypted})
+        
+        return jsonify({'results': results}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+@encryption_bp.route('/decrypt/batch', methods=['POST'])
+def decrypt_batch():
+    """Endpoint para descriptografar várias senhas em uma requisição"""
+    try:
+        data = request.get_json()
+        encrypted_passwords, error_response = _get_batch(data, 'encrypted_passwords')
+        if error_response:
+            return error_response
+        
+        results = []
+        for decrypted, error in encryption_service.decrypt_many(encrypted_passwords,
+                                                                data.get('data_key')):
+            results.append({'error': error} if error else {'password': decrypted})
+        
+        return jsonify({'results': results}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+@encryption_bp.route('/reencrypt/batch', methods=['POST'])
+def reencrypt_batch():
+    """Endpoint para re-criptografar textos para a chave atual (rotação de chaves)"""
+    try:
+        data = request.get_json()
+        encrypted_passwords, error_response = _get_batch(data, 'encrypted_passwords')
+        if error_response:
+            return error_response
+        
+        results = []
+        for reencrypted, error in encryption_service.reencrypt_many(encrypted_passwords,
+                                                                    data.get('data_key')):
+            results.append({'error': error} if error else {'encrypted_password': reencrypted})
+        
+        return jsonify({'results': results}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+@encryption_bp.route('/keys/rewrap', methods=['POST'])
+def rewrap_data_keys():
+    """Endpoint para embrulhar chaves de dados com a chave mestra primária"""
+    try:
+        data_keys, error_response = _get_batch(request.get_json(), 'data_keys')
+        if error_response:
+            return error_response
+        
+        results = []
+        for rewrapped, error in encryption_service.rewrap_data_keys(data_keys):
+            results.append({'error': error} if error else {'data_key': rewrapped})
+        
+        return jsonify({'results': results}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+@encryption_bp.route('/keys/generate', methods=['POST'])
+def generate_data_key():
+    """Endpoint para gerar uma chave de dados embrulhada pela chave mestra"""
+    try:
+        return jsonify({'data_key': encryption_service.generate_data_key()}), 201
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
 @encryption_bp.route('/health', methods=['GET'])
 def health():
     """Endpoint de health check"""
     return jsonify({
         'status': 'OK',
         'service': 'encryption_service',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'primary_key_id': encryption_service.primary_key_id,
+        'cipher_format': encryption_service.cipher_format,
+        'data_key_cache': encryption_service.data_key_cache_stats(),
+        'rate_limit': rate_limiter.stats()
     }), 200
 
@@ -10,7 +10,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
-from utils.encryption import EncryptionService
+from utils.encryption import EncryptionService, rotate_key_file
 
 
 @pytest.fixture
@@ -120,3 +120,222 @@ def test_health_check(client):
     assert response_data['status'] == 'OK'
     assert response_data['service'] == 'encryption_service'
 
+
+def test_encrypt_decrypt_many(encryption_service):
+    """Testa criptografia em lote com erros por item"""
+    results = encryption_service.encrypt_many(['a1', '', 'b2'])
+    assert results[0][1] is None and results[2][1] is None
+    assert results[1][0] is None and results[1][1]
+    
+    decrypted = encryption_service.decrypt_many([results[0][0], 'invalid', results[2][0]])
+    assert decrypted[0] == ('a1', None)
+    assert decrypted[1][0] is None
+    assert decrypted[2] == ('b2', None)
+
+
+def test_batch_endpoints(client):
+    """Testa endpoints de criptografia e descriptografia em lote"""
+    response = client.post('/encrypt/batch',
+                          data=json.dumps({'passwords': ['one', 'two', '']}),
+                          content_type='application/json')
+    assert response.status_code == 200
+    results = json.loads(response.data)['results']
+    assert 'encrypted_password' in results[0]
+    assert 'error' in results[2]
+    
+    encrypted = [results[0]['encrypted_password'], 'invalid', results[1]['encrypted_password']]
+    response = client.post('/decrypt/batch',
+                          data=json.dumps({'encrypted_passwords': encrypted}),
+                          content_type='application/json')
+    assert response.status_code == 200
+    results = json.loads(response.data)['results']
+    assert results[0] == {'password': 'one'}
+    assert 'error' in results[1]
+    assert results[2] == {'password': 'two'}
+
+
+def test_batch_size_limit(client, monkeypatch):
+    """Testa limite de tamanho do lote"""
+    from config import Config
+    monkeypatch.setattr(Config, 'MAX_BATCH_SIZE', 2)
+    
+    response = client.post('/encrypt/batch',
+                          data=json.dumps({'passwords': ['a', 'b', 'c']}),
+                          content_type='application/json')
+    assert response.status_code == 413
+
+
+def test_envelope_encryption(encryption_service):
+    """Testa criptografia envelope com chave de dados por usuário"""
+    legacy = encryption_service.encrypt('antiga')
+    wrapped_key = encryption_service.generate_data_key()
+    other_key = encryption_service.generate_data_key()
+    
+    encrypted = encryption_service.encrypt('segredo', wrapped_key)
+    assert encrypted.startswith('dk2:')
+    assert encryption_service.decrypt(encrypted, wrapped_key) == 'segredo'
+    # Textos antigos continuam legíveis com a chave mestra
+    assert encryption_service.decrypt(legacy, wrapped_key) == 'antiga'
+    
+    with pytest.raises(ValueError):
+        encryption_service.decrypt(encrypted)
+    with pytest.raises(ValueError):
+        encryption_service.decrypt(encrypted, other_key)
+    
+    # Chave desembrulhada uma única vez e reutilizada pelo cache
+    stats = encryption_service.data_key_cache_stats()
+    assert stats['size'] == 2
+    assert stats['hits'] >= 1
+
+
+def test_generate_data_key_endpoint(client):
+    """Testa geração de chave de dados e uso nos endpoints"""
+    response = client.post('/keys/generate')
+    assert response.status_code == 201
+    data_key = json.loads(response.data)['data_key']
+    
+    response = client.post('/encrypt',
+                          data=json.dumps({'password': 'abc123', 'data_key': data_key}),
+                          content_type='application/json')
+    encrypted = json.loads(response.data)['encrypted_password']
+    
+    response = client.post('/decrypt/batch',
+                          data=json.dumps({'encrypted_passwords': [encrypted], 'data_key': data_key}),
+                          content_type='application/json')
+    assert json.loads(response.data)['results'] == [{'password': 'abc123'}]
+
+
+def test_key_rotation(tmp_path):
+    """Testa rotação da chave mestra com textos marcados por key id"""
+    key_path = str(tmp_path / 'rotating.key')
+    old_service = EncryptionService(key_path)
+    old_text = old_service.encrypt('antiga')
+    wrapped_key = old_service.generate_data_key()
+    envelope_text = old_service.encrypt('envelope', wrapped_key)
+    assert old_text.startswith(f'k2:{old_service.primary_key_id}:')
+    
+    new_key_id = rotate_key_file(key_path)
+    assert sorted(os.listdir(tmp_path)) == ['rotating.key']
+    service = EncryptionService(key_path)
+    assert service.primary_key_id == new_key_id
+    
+    # Textos da chave anterior continuam legíveis
+    assert service.decrypt(old_text) == 'antiga'
+    assert service.decrypt(envelope_text, wrapped_key) == 'envelope'
+    
+    reencrypted = service.reencrypt(old_text)
+    assert reencrypted.startswith(f'k2:{new_key_id}:')
+    assert service.reencrypt(reencrypted) is None
+    
+    # Rotação da chave mestra só re-embrulha a chave de dados
+    rewrapped = service.rewrap_data_key(wrapped_key)
+    assert rewrapped.startswith(f'k2:{new_key_id}:')
+    assert service.rewrap_data_key(rewrapped) is None
+    assert service.decrypt(envelope_text, rewrapped) == 'envelope'
+    assert service.reencrypt(envelope_text, rewrapped) is None
+
+
+def test_key_rotation_under_running_service(tmp_path):
+    """Testa que um serviço em execução adota as chaves de uma rotação"""
+    key_path = str(tmp_path / 'live.key')
+    service = EncryptionService(key_path, key_reload_interval=60)
+    old_text = service.encrypt('antiga')
+    
+    new_key_id = rotate_key_file(key_path)
+    new_text = EncryptionService(key_path).encrypt('nova')
+    assert new_text.startswith(f'k2:{new_key_id}:')
+    
+    # Dentro do intervalo mínimo o arquivo não é relido
+    with pytest.raises(ValueError, match='Chave mestra desconhecida'):
+        service.decrypt(new_text)
+    
+    service.key_reload_interval = 0
+    assert service.decrypt(new_text) == 'nova'
+    assert service.primary_key_id == new_key_id
+    assert service.encrypt('depois').startswith(f'k2:{new_key_id}:')
+    assert service.decrypt(old_text) == 'antiga'
+    assert service.reencrypt(old_text).startswith(f'k2:{new_key_id}:')
+
+
+def test_concurrent_startup_shares_master_key(tmp_path):
+    """Testa que processos iniciando juntos sem arquivo de chaves usam a mesma chave"""
+    import threading
+    key_path = str(tmp_path / 'shared.key')
+    barrier = threading.Barrier(8)
+    key_ids = []
+
+    def start():
+        barrier.wait()
+        key_ids.append(EncryptionService(key_path).primary_key_id)
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(key_ids) == 8 and len(set(key_ids)) == 1
+    assert sorted(os.listdir(tmp_path)) == ['shared.key']
+
+
+def test_key_rotation_failure_keeps_key_file(tmp_path, monkeypatch):
+    """Testa que uma rotação interrompida não altera o arquivo de chaves"""
+    key_path = str(tmp_path / 'rotating.key')
+    EncryptionService(key_path)
+    with open(key_path, 'rb') as f:
+        original = f.read()
+
+    def failing_replace(src, dst):
+        raise OSError('disco cheio')
+
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    with pytest.raises(OSError):
+        rotate_key_file(key_path)
+    with open(key_path, 'rb') as f:
+        assert f.read() == original
+    assert sorted(os.listdir(tmp_path)) == ['rotating.key']
+
+
+def test_legacy_untagged_ciphertext(encryption_service):
+    """Testa leitura de textos Fernet antigos, sem key id"""
+    from cryptography.fernet import Fernet
+    with open(encryption_service.key_path, 'rb') as f:
+        legacy = Fernet(f.read().strip()).encrypt(b'legado').decode()
+    
+    assert encryption_service.decrypt(legacy) == 'legado'
+    assert encryption_service.reencrypt(legacy).startswith('k2:')
+
+
+
+def test_aead_and_fernet_formats(tmp_path):
+    """Testa o formato AES-GCM nas escritas e a leitura de textos Fernet"""
+    key_path = str(tmp_path / 'formats.key')
+    fernet_service = EncryptionService(key_path, cipher_format='fernet')
+    service = EncryptionService(key_path)
+    wrapped_key = fernet_service.generate_data_key()
+    
+    fernet_text = fernet_service.encrypt('senha_de_exemplo')
+    fernet_envelope = fernet_service.encrypt('senha_de_exemplo', wrapped_key)
+    aead_text = service.encrypt('senha_de_exemplo')
+    aead_envelope = service.encrypt('senha_de_exemplo', wrapped_key)
+    assert aead_text.startswith(f'k2:{service.primary_key_id}:')
+    assert aead_envelope.startswith('dk2:')
+    assert len(aead_envelope) < len(fernet_envelope)
+    
+    # Leitura independe do formato configurado
+    for reader in (service, fernet_service):
+        assert reader.decrypt(fernet_text) == 'senha_de_exemplo'
+        assert reader.decrypt(aead_text) == 'senha_de_exemplo'
+        assert reader.decrypt(fernet_envelope, wrapped_key) == 'senha_de_exemplo'
+        assert reader.decrypt(aead_envelope, wrapped_key) == 'senha_de_exemplo'
+    
+    # Re-criptografia converte para o formato atual
+    assert service.reencrypt(fernet_envelope, wrapped_key).startswith('dk2:')
+    assert service.reencrypt(aead_envelope, wrapped_key) is None
+    
+    # O prefixo é autenticado: trocar a versão ou o conteúdo invalida o texto
+    with pytest.raises(ValueError):
+        service.decrypt(aead_text[:-2] + ('A' if aead_text[-2] != 'A' else 'B') + aead_text[-1])
+    with pytest.raises(ValueError):
+        service.decrypt(aead_envelope, service.generate_data_key())
+    with pytest.raises(ValueError):
+        EncryptionService(key_path, cipher_format='rot13')
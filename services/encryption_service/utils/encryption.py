@@ -1,58 +1,333 @@
 """
-Utilitários para criptografia usando Fernet
+Utilitários para criptografia usando Fernet e AES-256-GCM
 """
-from cryptography.fernet import Fernet
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
+import hashlib
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from shared.key_files import create_exclusive, write_atomic
+from shared.ttl_cache import TTLCache
+
+# Formatos de texto criptografado (o prefixo identifica a versão):
+#   v1 (Fernet):      "dk:<token>"          e "k:<key_id>:<token>"
+#   v2 (AES-256-GCM): "dk2:<nonce+ct+tag>"  e "k2:<key_id>:<nonce+ct+tag>"
+# Textos Fernet sem prefixo (anteriores aos key ids) continuam legíveis.
+FORMAT_FERNET = 'fernet'
+FORMAT_AESGCM = 'aesgcm'
+
+# Prefixo dos textos criptografados com a chave de dados do usuário (envelope)
+DATA_KEY_PREFIX = 'dk:'
+AEAD_DATA_KEY_PREFIX = 'dk2:'
+# Prefixo dos textos criptografados com uma chave mestra: "k:<key_id>:<token>"
+MASTER_KEY_PREFIX = 'k:'
+AEAD_MASTER_KEY_PREFIX = 'k2:'
+
+# Tamanho do nonce do AES-GCM (96 bits, o recomendado pelo NIST)
+AEAD_NONCE_SIZE = 12
+
+
+def derive_aead_key(key: bytes) -> AESGCM:
+    """
+    Deriva a chave AES-256-GCM de uma chave Fernet
+    
+    A derivação (HKDF) separa os usos: o mesmo material não é usado
+    diretamente pelos dois esquemas, e o arquivo de chaves não muda.
+    """
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                info=b'fortress-aes-256-gcm', backend=default_backend())
+    return AESGCM(hkdf.derive(base64.urlsafe_b64decode(key)))
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64 URL-safe sem padding (economiza até 2 caracteres)"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def aead_seal(aead: AESGCM, data: bytes, header: str) -> str:
+    """Criptografa com AES-GCM; o cabeçalho (prefixo) é autenticado como AAD"""
+    nonce = os.urandom(AEAD_NONCE_SIZE)
+    return header + _b64encode(nonce + aead.encrypt(nonce, data, header.encode()))
+
+
+def aead_open(aead: AESGCM, ciphertext: str, header: str) -> bytes:
+    """Descriptografa um texto gerado por ``aead_seal``"""
+    try:
+        raw = _b64decode(ciphertext[len(header):])
+        return aead.decrypt(raw[:AEAD_NONCE_SIZE], raw[AEAD_NONCE_SIZE:], header.encode())
+    except (InvalidTag, ValueError) as e:
+        raise ValueError(f"Texto criptografado inválido: {type(e).__name__}")
+
+
+class _DataKey(NamedTuple):
+    """Chave de dados desembrulhada, pronta para os dois formatos"""
+    fernet: Fernet
+    aead: AESGCM
+
+
+def compute_key_id(key: bytes) -> str:
+    """Identificador curto e estável de uma chave mestra"""
+    return hashlib.sha256(key).hexdigest()[:8]
+
+
+def rotate_key_file(key_path: str) -> str:
+    """
+    Gera uma nova chave mestra primária, mantendo as anteriores no arquivo
+    
+    O arquivo é substituído atomicamente: uma queda no meio da rotação não
+    perde as chaves anteriores. Use pelo script rotate_key.py, uma rotação
+    por vez.
+    
+    Args:
+        key_path: Caminho do arquivo de chaves (uma chave por linha)
+        
+    Returns:
+        Key id da nova chave primária
+    """
+    existing = b''
+    if os.path.exists(key_path):
+        with open(key_path, 'rb') as f:
+            existing = f.read().strip()
+    key = Fernet.generate_key()
+    write_atomic(key_path, key + (b'\n' + existing if existing else b''))
+    return compute_key_id(key)
 
 
 class EncryptionService:
-    """Serviço de criptografia usando Fernet"""
+    """
+    Serviço de criptografia usando AES-256-GCM (padrão) ou Fernet
+    
+    Novas escritas usam o formato configurado em ``cipher_format``; a leitura
+    aceita os dois, pelo prefixo de versão. O AES-GCM dispensa o padding CBC,
+    o HMAC separado e o cabeçalho do Fernet: é mais rápido e o texto de uma
+    senha típica fica com cerca de metade do tamanho.
     
-    def __init__(self, key_path: str = 'fernet_key.key'):
+    O arquivo de chaves pode conter várias chaves mestras, uma por linha; a
+    primeira é a primária (usada nas novas escritas) e as demais continuam
+    válidas para leitura. Textos criptografados com chave mestra levam o key id
+    no prefixo, então a decriptação escolhe a chave em O(1). Textos antigos,
+    sem prefixo, são testados contra cada chave até serem re-criptografados.
+    
+    Depois de uma rotação (rotate_key.py), os processos em execução adotam o
+    arquivo novo sem reiniciar: escritas e textos com key id desconhecido
+    verificam se o arquivo mudou e, se sim, o relêem (a decriptação é então
+    tentada de novo). A verificação acontece no máximo uma vez a cada
+    ``key_reload_interval`` segundos, para que textos forjados com key ids
+    aleatórios não gerem um acesso a disco cada.
+    
+    Suporta também criptografia envelope: cada usuário tem uma chave de dados
+    própria, guardada "embrulhada" (criptografada) pela chave mestra. As chaves
+    de dados desembrulhadas ficam em um cache limitado e com expiração, de modo
+    que usuários ativos não pagam o custo de desembrulhar a cada operação.
+    """
+    
+    def __init__(self, key_path: str = 'fernet_key.key', data_key_cache_size: int = 1024,
+                 data_key_cache_ttl: float = 300.0, cipher_format: str = FORMAT_AESGCM,
+                 key_reload_interval: float = 5.0):
+        if cipher_format not in (FORMAT_AESGCM, FORMAT_FERNET):
+            raise ValueError(f"Formato de criptografia desconhecido: {cipher_format}")
         self.key_path = key_path
+        self.cipher_format = cipher_format
         self._fernet = None
+        self._keys: Dict[str, Fernet] = {}
+        self._aead_keys: Dict[str, AESGCM] = {}
+        self.primary_key_id = ''
+        self.key_reload_interval = key_reload_interval
+        self._reload_lock = threading.Lock()
+        self._last_reload = 0.0
+        self._key_file_signature: Tuple[int, int, int] = (0, 0, 0)
+        self._data_keys = TTLCache(max_size=data_key_cache_size, default_ttl=data_key_cache_ttl)
         self._load_or_generate_key()
     
     def _load_or_generate_key(self):
-        """Carrega chave existente ou gera uma nova"""
-        if os.path.exists(self.key_path):
-            with open(self.key_path, 'rb') as f:
-                key = f.read()
-        else:
-            # Gera nova chave
-            key = Fernet.generate_key()
-            with open(self.key_path, 'wb') as f:
-                f.write(key)
+        """
+        Carrega as chaves existentes ou gera uma nova
+        
+        Se vários processos iniciarem sem o arquivo, só um cria a chave; os
+        demais carregam a que ele gravou.
+        """
+        if not os.path.exists(self.key_path):
+            create_exclusive(self.key_path, Fernet.generate_key())
+        self._read_keys()
+    
+    def _read_keys(self):
+        """Lê o arquivo de chaves e substitui o chaveiro em memória"""
+        with open(self.key_path, 'rb') as f:
+            signature = self._file_signature(os.fstat(f.fileno()))
+            keys = [line.strip() for line in f.read().splitlines() if line.strip()]
         
-        self._fernet = Fernet(key)
+        # Os dicionários são trocados antes do key id primário, para que uma
+        # escrita concorrente nunca procure uma chave primária ainda ausente
+        self._keys = {compute_key_id(key): Fernet(key) for key in keys}
+        self._aead_keys = {compute_key_id(key): derive_aead_key(key) for key in keys}
+        primary_key_id = compute_key_id(keys[0])
+        self._fernet = self._keys[primary_key_id]
+        self.primary_key_id = primary_key_id
+        # Textos legados (sem key id) são testados contra todas as chaves
+        self._legacy_fernet = MultiFernet(list(self._keys.values()))
+        self._key_file_signature = signature
+    
+    @staticmethod
+    def _file_signature(stat: os.stat_result) -> Tuple[int, int, int]:
+        """Identifica uma versão do arquivo (a rotação o substitui por outro inode)"""
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
     
-    def encrypt(self, plaintext: str) -> str:
+    def _reload_keys(self):
+        """
+        Relê o arquivo de chaves se ele mudou, respeitando o intervalo mínimo
+        
+        Entre duas verificações o custo é só o do relógio; a cada
+        ``key_reload_interval`` segundos, um ``stat`` do arquivo.
+        """
+        if time.monotonic() - self._last_reload < self.key_reload_interval:
+            return
+        with self._reload_lock:
+            now = time.monotonic()
+            if now - self._last_reload < self.key_reload_interval:
+                return
+            self._last_reload = now
+            try:
+                if self._file_signature(os.stat(self.key_path)) != self._key_file_signature:
+                    self._read_keys()
+            except (OSError, IndexError, ValueError):
+                # Arquivo ausente ou ilegível: mantém as chaves já carregadas
+                return
+    
+    def _master_key(self, key_id: str, aead: bool):
+        """Obtém uma chave mestra pelo key id, relendo o arquivo se for desconhecida"""
+        key = (self._aead_keys if aead else self._keys).get(key_id)
+        if key is None:
+            self._reload_keys()
+            key = (self._aead_keys if aead else self._keys).get(key_id)
+        if key is None:
+            raise ValueError(f"Chave mestra desconhecida: {key_id}")
+        return key
+    
+    def _master_header_for(self, key_id: str) -> str:
+        """Prefixo dos textos sob a chave mestra ``key_id`` no formato atual"""
+        prefix = AEAD_MASTER_KEY_PREFIX if self.cipher_format == FORMAT_AESGCM else MASTER_KEY_PREFIX
+        return f'{prefix}{key_id}:'
+    
+    @property
+    def _master_header(self) -> str:
+        """Prefixo dos textos sob a chave mestra primária no formato atual"""
+        return self._master_header_for(self.primary_key_id)
+    
+    @property
+    def _data_key_header(self) -> str:
+        """Prefixo dos textos sob chave de dados no formato atual"""
+        return AEAD_DATA_KEY_PREFIX if self.cipher_format == FORMAT_AESGCM else DATA_KEY_PREFIX
+    
+    def _encrypt_with_master(self, data: bytes) -> str:
+        """Criptografa com a chave mestra primária, marcando o key id"""
+        self._reload_keys()
+        # Um único key id do início ao fim, mesmo que uma releitura troque a primária
+        key_id = self.primary_key_id
+        header = self._master_header_for(key_id)
+        if self.cipher_format == FORMAT_AESGCM:
+            return aead_seal(self._aead_keys[key_id], data, header)
+        return f'{header}{self._keys[key_id].encrypt(data).decode()}'
+    
+    def _decrypt_with_master(self, ciphertext: str) -> bytes:
+        """Descriptografa um texto de chave mestra (com ou sem key id)"""
+        if ciphertext.startswith(AEAD_MASTER_KEY_PREFIX):
+            key_id = ciphertext[len(AEAD_MASTER_KEY_PREFIX):].partition(':')[0]
+            aead = self._master_key(key_id, aead=True)
+            return aead_open(aead, ciphertext, f'{AEAD_MASTER_KEY_PREFIX}{key_id}:')
+        if ciphertext.startswith(MASTER_KEY_PREFIX):
+            key_id, _, token = ciphertext[len(MASTER_KEY_PREFIX):].partition(':')
+            fernet = self._master_key(key_id, aead=False)
+            return fernet.decrypt(token.encode())
+        return self._legacy_fernet.decrypt(ciphertext.encode())
+    
+    def _is_current_master(self, ciphertext: str) -> bool:
+        """Indica se o texto já está sob a chave mestra primária"""
+        self._reload_keys()
+        return ciphertext.startswith(self._master_header)
+    
+    def generate_data_key(self) -> str:
+        """
+        Gera uma nova chave de dados embrulhada pela chave mestra
+        
+        Returns:
+            Chave de dados criptografada, para ser armazenada junto ao cofre
+        """
+        return self._encrypt_with_master(Fernet.generate_key())
+    
+    def _get_data_key(self, wrapped_key: str) -> _DataKey:
+        """Desembrulha a chave de dados, usando o cache quando possível"""
+        data_key = self._data_keys.get(wrapped_key)
+        if data_key is None:
+            try:
+                key = self._decrypt_with_master(wrapped_key)
+                data_key = _DataKey(Fernet(key), derive_aead_key(key))
+            except Exception as e:
+                raise ValueError(f"Chave de dados inválida: {str(e)}")
+            self._data_keys.set(wrapped_key, data_key)
+        return data_key
+    
+    def rewrap_data_key(self, wrapped_key: str) -> Optional[str]:
+        """
+        Embrulha novamente uma chave de dados com a chave mestra primária
+        
+        Args:
+            wrapped_key: Chave de dados embrulhada
+            
+        Returns:
+            Nova chave embrulhada, ou None se ela já usa a chave primária
+        """
+        if self._is_current_master(wrapped_key):
+            return None
+        try:
+            key = self._decrypt_with_master(wrapped_key)
+        except Exception as e:
+            raise ValueError(f"Chave de dados inválida: {str(e)}")
+        return self._encrypt_with_master(key)
+    
+    def encrypt(self, plaintext: str, wrapped_key: Optional[str] = None) -> str:
         """
         Criptografa um texto
         
         Args:
             plaintext: Texto a ser criptografado
+            wrapped_key: Chave de dados embrulhada do usuário (opcional)
             
         Returns:
-            Texto criptografado em base64
+            Texto criptografado em base64, prefixado pela chave usada
         """
         if not plaintext:
             raise ValueError("Texto não pode ser vazio")
         
-        encrypted_bytes = self._fernet.encrypt(plaintext.encode())
-        return encrypted_bytes.decode()
+        if wrapped_key:
+            data_key = self._get_data_key(wrapped_key)
+            if self.cipher_format == FORMAT_AESGCM:
+                return aead_seal(data_key.aead, plaintext.encode(), AEAD_DATA_KEY_PREFIX)
+            return DATA_KEY_PREFIX + data_key.fernet.encrypt(plaintext.encode()).decode()
+        
+        return self._encrypt_with_master(plaintext.encode())
     
-    def decrypt(self, ciphertext: str) -> str:
+    def decrypt(self, ciphertext: str, wrapped_key: Optional[str] = None) -> str:
         """
         Descriptografa um texto
         
+        Textos de chave mestra continuam legíveis mesmo depois que o usuário
+        recebe uma chave de dados.
+        
         Args:
             ciphertext: Texto criptografado em base64
+            wrapped_key: Chave de dados embrulhada do usuário (opcional)
             
         Returns:
             Texto descriptografado
@@ -61,20 +336,128 @@ class EncryptionService:
             raise ValueError("Texto criptografado não pode ser vazio")
         
         try:
-            decrypted_bytes = self._fernet.decrypt(ciphertext.encode())
+            if ciphertext.startswith((AEAD_DATA_KEY_PREFIX, DATA_KEY_PREFIX)):
+                if not wrapped_key:
+                    raise ValueError("Chave de dados é obrigatória para este texto")
+                data_key = self._get_data_key(wrapped_key)
+                if ciphertext.startswith(AEAD_DATA_KEY_PREFIX):
+                    decrypted_bytes = aead_open(data_key.aead, ciphertext, AEAD_DATA_KEY_PREFIX)
+                else:
+                    decrypted_bytes = data_key.fernet.decrypt(
+                        ciphertext[len(DATA_KEY_PREFIX):].encode()
+                    )
+            else:
+                decrypted_bytes = self._decrypt_with_master(ciphertext)
             return decrypted_bytes.decode()
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Erro ao descriptografar: {str(e)}")
+    
+    def reencrypt(self, ciphertext: str, wrapped_key: Optional[str] = None) -> Optional[str]:
+        """
+        Re-criptografa um texto para a chave atual
+        
+        A chave atual é a chave de dados do usuário, quando informada, ou a
+        chave mestra primária; textos em outro formato também são convertidos.
+        
+        Args:
+            ciphertext: Texto criptografado
+            wrapped_key: Chave de dados embrulhada do usuário (opcional)
+            
+        Returns:
+            Novo texto criptografado, ou None se ele já usa a chave atual
+        """
+        if wrapped_key and ciphertext.startswith(self._data_key_header):
+            return None
+        if not wrapped_key and self._is_current_master(ciphertext):
+            return None
+        return self.encrypt(self.decrypt(ciphertext, wrapped_key), wrapped_key)
+    
+    def data_key_cache_stats(self):
+        """Retorna estatísticas do cache de chaves de dados"""
+        return self._data_keys.stats()
+    
+    def encrypt_many(self, plaintexts: List[str],
+                     wrapped_key: Optional[str] = None) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Criptografa vários textos em uma única passada
+        
+        Args:
+            plaintexts: Textos a serem criptografados
+            wrapped_key: Chave de dados embrulhada do usuário (opcional)
+            
+        Returns:
+            Lista posicional de tuplas (texto_criptografado, erro)
+        """
+        results = []
+        for plaintext in plaintexts:
+            try:
+                results.append((self.encrypt(plaintext, wrapped_key), None))
+            except (ValueError, TypeError, AttributeError) as e:
+                results.append((None, str(e) or 'Texto inválido'))
+        return results
+    
+    def reencrypt_many(self, ciphertexts: List[str],
+                       wrapped_key: Optional[str] = None) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Re-criptografa vários textos para a chave atual
+        
+        Returns:
+            Lista posicional de tuplas (novo_texto ou None se já atual, erro)
+        """
+        results = []
+        for ciphertext in ciphertexts:
+            try:
+                results.append((self.reencrypt(ciphertext, wrapped_key), None))
+            except (ValueError, TypeError, AttributeError) as e:
+                results.append((None, str(e) or 'Texto criptografado inválido'))
+        return results
+    
+    def rewrap_data_keys(self, wrapped_keys: List[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Embrulha novamente várias chaves de dados com a chave primária
+        
+        Returns:
+            Lista posicional de tuplas (nova_chave ou None se já atual, erro)
+        """
+        results = []
+        for wrapped_key in wrapped_keys:
+            try:
+                results.append((self.rewrap_data_key(wrapped_key), None))
+            except (ValueError, TypeError, AttributeError) as e:
+                results.append((None, str(e) or 'Chave de dados inválida'))
+        return results
+    
+    def decrypt_many(self, ciphertexts: List[str],
+                     wrapped_key: Optional[str] = None) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Descriptografa vários textos em uma única passada
+        
+        Args:
+            ciphertexts: Textos criptografados em base64
+            wrapped_key: Chave de dados embrulhada do usuário (opcional)
+            
+        Returns:
+            Lista posicional de tuplas (texto_descriptografado, erro)
+        """
+        results = []
+        for ciphertext in ciphertexts:
+            try:
+                results.append((self.decrypt(ciphertext, wrapped_key), None))
+            except (ValueError, TypeError, AttributeError) as e:
+                results.append((None, str(e) or 'Texto criptografado inválido'))
+        return results
 
 
 # Instância global do serviço de criptografia
 _encryption_service: Optional[EncryptionService] = None
 
 
-def get_encryption_service(key_path: str = 'fernet_key.key') -> EncryptionService:
+def get_encryption_service(key_path: str = 'fernet_key.key', **options) -> EncryptionService:
     """Obtém instância do serviço de criptografia (singleton)"""
     global _encryption_service
     if _encryption_service is None:
-        _encryption_service = EncryptionService(key_path)
+        _encryption_service = EncryptionService(key_path, **options)
     return _encryption_service
 
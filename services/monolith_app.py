@@ -0,0 +1,131 @@
+"""
+Modo monolito: Auth, Encryption e Password Manager em um único processo
+
+Uso:
+    python monolith_app.py
+    python launcher.py supervise --services monolith,frontend
+
+Os três blueprints são montados em uma só aplicação Flask: ``auth_bp`` e
+``password_bp`` na raiz (as mesmas URLs dos serviços separados) e
+``encryption_bp`` sob /encryption. O Password Manager verifica tokens e
+criptografa senhas por chamadas diretas (backends 'inprocess'), sem HTTP.
+O frontend aponta AUTH_SERVICE_URL e PASSWORD_MANAGER_SERVICE_URL para esta
+aplicação (porta MONOLITH_PORT, padrão 5000).
+
+Os serviços têm módulos de mesmo nome (config, models, routes, utils); cada
+um é importado com o próprio diretório no início do sys.path e os seus
+módulos são retirados de sys.modules em seguida, para não colidirem com os
+do próximo serviço.
+"""
+import importlib
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Iterable
+
+services_dir = Path(__file__).resolve().parent
+if str(services_dir) not in sys.path:
+    sys.path.append(str(services_dir))
+
+from flask import Flask, jsonify
+from shared import inprocess
+
+# Módulos de nível superior que existem em todos os serviços
+SERVICE_MODULES = ('app', 'config', 'models', 'routes', 'utils')
+
+HOST = os.getenv('MONOLITH_HOST', '0.0.0.0')
+PORT = int(os.getenv('MONOLITH_PORT', 5000))
+DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
+
+
+def _is_service_module(name: str) -> bool:
+    return name.split('.', 1)[0] in SERVICE_MODULES
+
+
+def load_service(directory: Path, path_settings: Iterable[str] = ()) -> Dict[str, ModuleType]:
+    """
+    Importa o app.py de um serviço isolando os seus módulos
+
+    Caminhos relativos da configuração (bancos, chaves) são resolvidos em
+    relação ao diretório do serviço, como quando ele roda sozinho.
+
+    Args:
+        directory: Diretório do serviço
+        path_settings: Atributos de Config que contêm caminhos de arquivo
+
+    Returns:
+        Módulos do serviço por nome ('app', 'config', 'routes.auth_routes', ...)
+    """
+    saved_path = list(sys.path)
+    saved_modules = {name: sys.modules.pop(name) for name in list(sys.modules)
+                     if _is_service_module(name)}
+    sys.path.insert(0, str(directory))
+    try:
+        config = importlib.import_module('config').Config
+        for setting in path_settings:
+            value = getattr(config, setting)
+            if isinstance(value, list):
+                setattr(config, setting, [str(directory / path) for path in value])
+            elif value and not os.path.isabs(value):
+                setattr(config, setting, str(directory / value))
+        importlib.import_module('app')
+        return {name: sys.modules[name] for name in list(sys.modules) if _is_service_module(name)}
+    finally:
+        for name in [name for name in sys.modules if _is_service_module(name)]:
+            del sys.modules[name]
+        sys.modules.update(saved_modules)
+        sys.path[:] = saved_path
+
+
+# Auth e Encryption primeiro: o Password Manager resolve as implementações
+# publicadas por eles ao criar os clientes
+auth = load_service(services_dir / 'auth_service',
+                    ('DATABASE', 'JWT_PRIVATE_KEY_PATH', 'JWT_EXTRA_PUBLIC_KEY_PATHS',
+                     'RATE_LIMIT_DB_PATH'))
+encryption = load_service(services_dir / 'encryption_service', ('FERNET_KEY_PATH', 'RATE_LIMIT_DB_PATH'))
+inprocess.register(inprocess.AUTH_VERIFY, auth['routes.auth_routes'].verify_user_token)
+inprocess.register(inprocess.ENCRYPTION_SERVICE, encryption['routes.encryption_routes'].encryption_service)
+
+os.environ.setdefault('AUTH_VERIFY_MODE', 'inprocess')
+os.environ.setdefault('ENCRYPTION_BACKEND', 'inprocess')
+password_manager = load_service(services_dir / 'password_manager_service',
+                                ('DATABASE', 'RATE_LIMIT_DB_PATH'))
+
+app = Flask(__name__)
+app.config['SECRET_KEY'] = auth['config'].Config.SECRET_KEY
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Health check agregado dos três serviços"""
+    statuses = {}
+    for endpoint in ('auth.health', 'encryption.health', 'password.health'):
+        response, status = app.view_functions[endpoint]()
+        statuses[endpoint.split('.')[0]] = response.get_json() if status == 200 else {'status': 'ERROR'}
+    healthy = all(data.get('status') == 'OK' for data in statuses.values())
+    return jsonify({
+        'status': 'OK' if healthy else 'ERROR',
+        'service': 'monolith',
+        'services': statuses
+    }), 200 if healthy else 503
+
+
+# Registrado depois de /health: a rota agregada tem precedência sobre as dos serviços
+app.register_blueprint(auth['routes.auth_routes'].auth_bp)
+app.register_blueprint(password_manager['routes.password_routes'].password_bp)
+app.register_blueprint(encryption['routes.encryption_routes'].encryption_bp, url_prefix='/encryption')
+
+
+def init_db():
+    """Inicializa os bancos do Auth e do Password Manager e as chaves do Auth"""
+    auth['app'].init_db()
+    auth['app'].init_keys()
+    password_manager['app'].init_db()
+
+
+if __name__ == '__main__':
+    init_db()
+    print(f"🧩 Modo monolito (Auth + Encryption + Password Manager) iniciado na porta {PORT}")
+    print(f"📍 Acesse: http://{HOST}:{PORT}")
+    app.run(host=HOST, port=PORT, debug=DEBUG)
@@ -10,6 +10,11 @@ current_dir = Path(__file__).parent
 if str(current_dir) not in sys.path:
     sys.path.insert(0, str(current_dir))
 
+# Diretório services/ para os componentes compartilhados
+services_dir = current_dir.parent
+if str(services_dir) not in sys.path:
+    sys.path.append(str(services_dir))
+
 from flask import Flask
 from config import Config
 from models.password import PasswordRepository
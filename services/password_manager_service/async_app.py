@@ -0,0 +1,59 @@
+"""
+Serviço de Gerenciamento de Senhas em modo assíncrono (ASGI)
+
+Uso:
+    hypercorn async_app:app --bind 0.0.0.0:5001
+    python async_app.py
+
+Mesma API de app.py, servida por um único event loop: as requisições em
+andamento esperam o Auth Service e o Encryption Service sem ocupar uma
+thread cada. Requer os pacotes opcionais quart e httpx.
+"""
+import sys
+from pathlib import Path
+
+# Adicionar diretório pai ao path para permitir importações absolutas quando executado diretamente
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+# Diretório services/ para os componentes compartilhados
+services_dir = current_dir.parent
+if str(services_dir) not in sys.path:
+    sys.path.append(str(services_dir))
+
+try:
+    from quart import Quart
+except ImportError as exc:
+    raise ImportError('O modo assíncrono requer os pacotes quart e httpx '
+                      '(pip install quart httpx)') from exc
+
+from config import Config
+from routes.async_password_routes import async_password_bp, db_executor, password_repo
+from utils.async_transport import get_async_transport
+
+app = Quart(__name__)
+# Importações em massa são recebidas em streaming; sem o limite padrão de 16 MB
+app.config['MAX_CONTENT_LENGTH'] = None
+
+# Registra blueprint
+app.register_blueprint(async_password_bp)
+
+
+@app.before_serving
+async def init_db():
+    """Inicializa o banco de dados"""
+    password_repo.init_database()
+
+
+@app.after_serving
+async def shutdown():
+    """Fecha as conexões HTTP e o pool de threads do banco"""
+    await get_async_transport().aclose()
+    db_executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    print(f"🔑 Serviço de Gerenciamento de Senhas (ASGI) iniciado na porta {Config.PORT}")
+    print(f"📍 Acesse: http://{Config.HOST}:{Config.PORT}")
+    app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
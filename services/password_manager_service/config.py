@@ -2,6 +2,7 @@
 Configurações do Password Manager Service
 """
 import os
+from pathlib import Path
 
 class Config:
     """Configurações da aplicação"""
@@ -14,3 +15,90 @@ class Config:
     AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', 'http://localhost:5000')
     ENCRYPTION_SERVICE_URL = os.getenv('ENCRYPTION_SERVICE_URL', 'http://localhost:5002')
 
+    # Backend de criptografia: 'remote' (HTTP, padrão), 'embedded' (carrega o
+    # EncryptionService neste processo) ou 'inprocess' (o do modo monolito)
+    ENCRYPTION_BACKEND = os.getenv('ENCRYPTION_BACKEND', 'remote')
+    EMBEDDED_ENCRYPTION_KEY_PATH = os.getenv(
+        'EMBEDDED_ENCRYPTION_KEY_PATH',
+        str(Path(__file__).resolve().parent.parent / 'encryption_service' / 'fernet_key.key')
+    )
+
+    # Criptografia envelope: uma chave de dados por usuário, embrulhada pela chave mestra
+    ENVELOPE_ENCRYPTION = os.getenv('ENVELOPE_ENCRYPTION', 'True').lower() == 'true'
+
+    # Armazenamento dos textos criptografados: 'blob' (bytes crus) ou 'text' (base64)
+    CIPHERTEXT_STORAGE = os.getenv('PM_CIPHERTEXT_STORAGE', 'blob')
+
+    # Paginação da listagem de senhas (GET /passwords)
+    PAGE_SIZE_DEFAULT = int(os.getenv('PM_PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.getenv('PM_PAGE_SIZE_MAX', 200))
+
+    # Respostas em streaming (GET /passwords?stream=1 e /passwords/export)
+    STREAM_BATCH_SIZE = int(os.getenv('PM_STREAM_BATCH_SIZE', 500))
+
+    # Máximo de senhas reveladas por requisição (POST /passwords/reveal)
+    REVEAL_MAX_BATCH = int(os.getenv('PM_REVEAL_MAX_BATCH', 100))
+
+    # Importação em massa (POST /passwords/import)
+    IMPORT_CHUNK_SIZE = int(os.getenv('PM_IMPORT_CHUNK_SIZE', 500))
+    IMPORT_MAX_REPORTED_ROWS = int(os.getenv('PM_IMPORT_MAX_REPORTED_ROWS', 1000))
+
+    # Tamanho máximo dos lotes enviados a /encrypt/batch e /decrypt/batch
+    ENCRYPTION_BATCH_SIZE = int(os.getenv('ENCRYPTION_BATCH_SIZE', 500))
+
+    # Re-criptografia em segundo plano após rotação de chaves
+    REENCRYPT_ROWS_PER_SECOND = float(os.getenv('REENCRYPT_ROWS_PER_SECOND', 200))
+    REENCRYPT_BATCH_SIZE = int(os.getenv('REENCRYPT_BATCH_SIZE', 100))
+
+    # Pool de conexões HTTP keep-alive para os outros serviços
+    HTTP_POOL_SIZE = int(os.getenv('PM_HTTP_POOL_SIZE', 20))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('PM_HTTP_CONNECT_TIMEOUT', 2))
+    HTTP_READ_TIMEOUT = float(os.getenv('PM_HTTP_READ_TIMEOUT', 5))
+    HTTP_MAX_IDLE_SECONDS = float(os.getenv('PM_HTTP_MAX_IDLE_SECONDS', 30))
+
+    # Modo assíncrono (async_app.py): conexões HTTP simultâneas por destino e
+    # threads para as chamadas bloqueantes ao SQLite
+    ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('PM_ASYNC_HTTP_MAX_CONNECTIONS', 100))
+    ASYNC_DB_THREADS = int(os.getenv('PM_ASYNC_DB_THREADS', 16))
+
+    # Verificação de tokens: 'remote' (POST /verify), 'local' (EdDSA via JWKS)
+    # ou 'inprocess' (chamada direta ao Auth Service do modo monolito)
+    AUTH_VERIFY_MODE = os.getenv('AUTH_VERIFY_MODE', 'remote')
+    AUTH_JWKS_URL = os.getenv('AUTH_JWKS_URL', f'{AUTH_SERVICE_URL}/.well-known/jwks.json')
+    AUTH_JWKS_MIN_REFRESH_SECONDS = float(os.getenv('AUTH_JWKS_MIN_REFRESH_SECONDS', 30))
+
+    # Cache de tokens verificados (TTL 0 desativa). O cache é por processo:
+    # logout, revogação e /logout/all só valem aqui quando a entrada expira,
+    # então um token revogado ainda é aceito por até AUTH_CACHE_TTL_SECONDS
+    # (nunca além do exp do token). /tokens/invalidate limpa só o processo que
+    # recebe a chamada. No modo 'local' a revogação não é vista até o exp
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000))
+    AUTH_CACHE_TTL_SECONDS = float(os.getenv('AUTH_CACHE_TTL_SECONDS', 5))
+    AUTH_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv('AUTH_CACHE_NEGATIVE_TTL_SECONDS', 5))
+
+    # Pool de conexões SQLite
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 64 * 1024 * 1024))
+    SQLITE_CACHED_STATEMENTS = int(os.getenv('SQLITE_CACHED_STATEMENTS', 128))
+    # Conexões abertas por banco (em uso + ociosas reaproveitadas entre threads)
+    SQLITE_MAX_CONNECTIONS = int(os.getenv('SQLITE_MAX_CONNECTIONS', 64))
+
+    # Group commit das escritas
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 64))
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv('GROUP_COMMIT_MAX_DELAY_MS', 2))
+    # Espera máxima pela confirmação de uma escrita (depois disso a rota responde 503)
+    GROUP_COMMIT_SUBMIT_TIMEOUT_SECONDS = float(os.getenv('GROUP_COMMIT_SUBMIT_TIMEOUT_SECONDS', 10))
+
+    # Limite de taxa (token bucket). Backend 'memory' vale por processo;
+    # 'sqlite' compartilha os buckets entre as réplicas que usam o mesmo arquivo
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', 'rate_limits.db')
+    # Por endpoint: [(chave, '<requisições>/<segundos>')]; valor vazio desativa.
+    # 'user' é o usuário do token verificado
+    RATE_LIMITS = {
+        'password.get_password': [('user', os.getenv('RATE_LIMIT_GET_PASSWORD_USER', '120/60'))],
+        'password.reveal_passwords': [('user', os.getenv('RATE_LIMIT_REVEAL_USER', '30/60'))],
+        'password.export_passwords': [('user', os.getenv('RATE_LIMIT_EXPORT_USER', '10/60'))],
+        'password.import_passwords': [('user', os.getenv('RATE_LIMIT_IMPORT_USER', '10/60'))],
+    }
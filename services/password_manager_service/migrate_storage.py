@@ -0,0 +1,41 @@
+"""
+Converte o armazenamento das senhas criptografadas entre BLOB e TEXT
+
+Uso:
+    python migrate_storage.py [--to blob|text] [--batch-size 500] [--vacuum]
+
+A conversão é feita em lotes curtos e pode rodar com o serviço no ar: a
+leitura aceita os dois formatos. Use --vacuum ao final para devolver ao
+sistema o espaço liberado no arquivo do banco.
+"""
+import argparse
+
+from app import init_db
+from config import Config
+from models.password import PasswordRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migra o armazenamento dos textos criptografados')
+    parser.add_argument('--to', choices=['blob', 'text'], default=Config.CIPHERTEXT_STORAGE,
+                        help='Formato de destino')
+    parser.add_argument('--batch-size', type=int, default=500, help='Linhas por transação')
+    parser.add_argument('--vacuum', action='store_true', help='Compacta o banco ao final')
+    args = parser.parse_args()
+
+    init_db()
+    repository = PasswordRepository(Config.DATABASE, ciphertext_storage=args.to)
+    converted = repository.migrate_ciphertext_storage(batch_size=args.batch_size)
+    print(f"📦 Senhas convertidas para {args.to.upper()}: {converted}")
+
+    if args.vacuum:
+        conn = repository.pool.connect()
+        try:
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        print("🧹 Banco compactado")
+
+
+if __name__ == '__main__':
+    main()
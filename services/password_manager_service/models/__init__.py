@@ -2,6 +2,7 @@
 Models do Password Manager Service
 """
 from .password import Password, PasswordRepository
+from .unit_of_work import UnitOfWork
 
-__all__ = ['Password', 'PasswordRepository']
+__all__ = ['Password', 'PasswordRepository', 'UnitOfWork']
 
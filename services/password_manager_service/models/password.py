@@ -3,14 +3,26 @@ Modelo de Password
 """
 from datetime import datetime
 import sqlite3
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Union
+from config import Config
+from shared.ciphertext_codec import decode_ciphertext, encode_ciphertext
+from shared.sqlite_pool import SQLiteConnectionPool, get_pool
+from shared.group_commit import GroupCommitWriter, WriteOperation, get_writer
+from models.unit_of_work import UnitOfWork, current_unit_of_work
+
+# O tokenizador de trigramas só encontra consultas com 3 ou mais caracteres
+TRIGRAM_MIN_QUERY_LENGTH = 3
+
+# Linhas por comando nos inserts multi-linha (4 parâmetros por linha, abaixo
+# do limite de 999 variáveis de versões antigas do SQLite)
+ROWS_PER_STATEMENT = 100
 
 
 class Password:
     """Classe para representar uma senha armazenada"""
     
     def __init__(self, password_id: int, user_id: int, site: str, 
-                 username: str, encrypted_password: str,
+                 username: str, encrypted_password: Union[str, bytes],
                  created_at: Optional[datetime] = None,
                  updated_at: Optional[datetime] = None):
         self.id = password_id
@@ -21,17 +33,24 @@ class Password:
         self.created_at = created_at or datetime.now()
         self.updated_at = updated_at or datetime.now()
     
-    def to_dict(self) -> Dict[str, Any]:
+    @property
+    def encrypted_text(self) -> str:
+        """Texto criptografado em base64 (o valor armazenado pode ser BLOB)"""
+        return decode_ciphertext(self.encrypted_password)
+    
+    def to_dict(self, include_ciphertext: bool = True) -> Dict[str, Any]:
         """Converte a senha para dicionário"""
-        return {
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'site': self.site,
             'username': self.username,
-            'encrypted_password': self.encrypted_password,
             'created_at': self.created_at.isoformat() if isinstance(self.created_at, datetime) else self.created_at,
             'updated_at': self.updated_at.isoformat() if isinstance(self.updated_at, datetime) else self.updated_at
         }
+        if include_ciphertext:
+            data['encrypted_password'] = self.encrypted_text
+        return data
     
     @classmethod
     def from_db_row(cls, row: tuple) -> 'Password':
@@ -51,29 +70,152 @@ class Password:
 class PasswordRepository:
     """Repositório para operações de banco de dados de senhas"""
     
-    def __init__(self, database_path: str):
+    def __init__(self, database_path: str, pool: Optional[SQLiteConnectionPool] = None,
+                 writer: Optional[GroupCommitWriter] = None, ciphertext_storage: str = None):
         self.database_path = database_path
+        # 'blob': bytes crus (padrão) ou 'text': base64, como antes da migração
+        self.ciphertext_storage = ciphertext_storage or Config.CIPHERTEXT_STORAGE
+        self._search_index_ready = False
+        pool_options = {
+            'busy_timeout_ms': Config.SQLITE_BUSY_TIMEOUT_MS,
+            'mmap_size': Config.SQLITE_MMAP_SIZE,
+            'cached_statements': Config.SQLITE_CACHED_STATEMENTS,
+            'max_connections': Config.SQLITE_MAX_CONNECTIONS
+        }
+        self.pool = pool or get_pool(database_path, **pool_options)
+        self.writer = writer or get_writer(
+            database_path,
+            max_batch_size=Config.GROUP_COMMIT_MAX_BATCH,
+            max_delay_ms=Config.GROUP_COMMIT_MAX_DELAY_MS,
+            submit_timeout=Config.GROUP_COMMIT_SUBMIT_TIMEOUT_SECONDS,
+            **pool_options
+        )
+    
+    def _unit_of_work(self) -> UnitOfWork:
+        """Obtém a unidade de trabalho da requisição atual"""
+        return current_unit_of_work(self.pool, self.writer)
     
     def _get_connection(self) -> sqlite3.Connection:
-        """Obtém conexão com o banco de dados"""
-        return sqlite3.connect(self.database_path)
+        """Obtém a conexão de leitura compartilhada pela requisição"""
+        return self._unit_of_work().connection
+    
+    def _write(self, operation: WriteOperation) -> Any:
+        """Executa uma escrita atômica através do group commit"""
+        return self._unit_of_work().write(operation)
+    
+    def _to_storage(self, encrypted_password: str) -> Union[str, bytes]:
+        """Converte o texto criptografado para o formato de armazenamento"""
+        if self.ciphertext_storage == 'blob':
+            return encode_ciphertext(encrypted_password)
+        return encrypted_password
     
     def create_password(self, user_id: int, site: str, username: str, 
                        encrypted_password: str) -> int:
         """Cria uma nova senha e retorna o ID"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
+        def insert(conn: sqlite3.Connection) -> int:
+            cursor = conn.execute(
                 '''INSERT INTO passwords (user_id, site, username, encrypted_password)
                    VALUES (?, ?, ?, ?)''',
-                (user_id, site, username, encrypted_password)
+                (user_id, site, username, self._to_storage(encrypted_password))
             )
-            password_id = cursor.lastrowid
-            conn.commit()
-            return password_id
-        finally:
-            conn.close()
+            return cursor.lastrowid
+        
+        return self._write(insert)
+    
+    def iter_password_batches(self, user_id: int, batch_size: int) -> Iterator[List[Password]]:
+        """
+        Percorre o cofre do usuário em lotes, na ordem (site, username, id)
+        
+        Cada lote é uma consulta por keyset independente, então nenhum cursor
+        fica aberto entre os lotes e a memória usada é a de um lote.
+        
+        Args:
+            user_id: ID do usuário
+            batch_size: Senhas por lote
+            
+        Yields:
+            Listas de senhas
+        """
+        after = None
+        while True:
+            batch = self.get_passwords_page(user_id, batch_size, after)
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            last = batch[-1]
+            after = (last.site, last.username, last.id)
+    
+    @staticmethod
+    def _select_existing(conn: sqlite3.Connection, user_id: int,
+                         keys: List[Tuple[str, str]]) -> set:
+        """Retorna os pares (site, username) do usuário que já existem"""
+        existing = set()
+        for start in range(0, len(keys), ROWS_PER_STATEMENT):
+            part = keys[start:start + ROWS_PER_STATEMENT]
+            rows = conn.execute(
+                f'''SELECT site, username FROM passwords
+                    WHERE user_id = ? AND (site, username) IN
+                          (VALUES {', '.join(['(?, ?)'] * len(part))})''',
+                (user_id, *[value for key in part for value in key])
+            ).fetchall()
+            existing.update((site, username) for site, username in rows)
+        return existing
+    
+    def find_existing_entries(self, user_id: int, keys: List[Tuple[str, str]]) -> set:
+        """
+        Verifica quais pares (site, username) já existem no cofre do usuário
+        
+        Args:
+            user_id: ID do usuário
+            keys: Pares (site, username)
+            
+        Returns:
+            Conjunto dos pares já existentes
+        """
+        return self._select_existing(self._get_connection(), user_id, keys)
+    
+    def import_passwords(self, user_id: int, entries: List[Tuple[str, str, str]],
+                         overwrite: bool = False) -> List[str]:
+        """
+        Grava um lote de senhas com inserts multi-linha, em uma transação
+        
+        Args:
+            user_id: ID do usuário
+            entries: Tuplas (site, username, senha_criptografada), sem pares repetidos
+            overwrite: Substitui senhas já existentes (senão, elas são ignoradas)
+            
+        Returns:
+            Situação de cada entrada, na ordem: 'created', 'updated' ou 'skipped'
+        """
+        if overwrite:
+            conflict_clause = '''ON CONFLICT(user_id, site, username) DO UPDATE SET
+                       encrypted_password = excluded.encrypted_password,
+                       updated_at = CURRENT_TIMESTAMP'''
+        else:
+            conflict_clause = 'ON CONFLICT(user_id, site, username) DO NOTHING'
+        
+        def insert(conn: sqlite3.Connection) -> List[str]:
+            existing = self._select_existing(
+                conn, user_id, [(site, username) for site, username, _ in entries]
+            )
+            rows = entries if overwrite else [
+                entry for entry in entries if (entry[0], entry[1]) not in existing
+            ]
+            for start in range(0, len(rows), ROWS_PER_STATEMENT):
+                part = rows[start:start + ROWS_PER_STATEMENT]
+                conn.execute(
+                    f'''INSERT INTO passwords (user_id, site, username, encrypted_password)
+                        VALUES {', '.join(['(?, ?, ?, ?)'] * len(part))}
+                        {conflict_clause}''',
+                    [value for site, username, encrypted_password in part
+                     for value in (user_id, site, username, self._to_storage(encrypted_password))]
+                )
+            existing_status = 'updated' if overwrite else 'skipped'
+            return [existing_status if (site, username) in existing else 'created'
+                    for site, username, _ in entries]
+        
+        return self._write(insert)
     
     def get_password_by_id(self, password_id: int, user_id: int) -> Optional[Password]:
         """Busca senha por ID (apenas se pertencer ao usuário)"""
@@ -92,7 +234,55 @@ class PasswordRepository:
                 return Password.from_db_row(row)
             return None
         finally:
-            conn.close()
+            cursor.close()
+    
+    def find_password_by_id(self, password_id: int) -> Optional[Password]:
+        """
+        Busca senha por ID sem filtrar pelo usuário
+        
+        Usado para adiantar a leitura enquanto o token ainda é verificado: o
+        chamador deve conferir ``user_id`` antes de devolver qualquer dado.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                '''SELECT id, user_id, site, username, encrypted_password, 
+                          created_at, updated_at 
+                   FROM passwords 
+                   WHERE id = ?''',
+                (password_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                return Password.from_db_row(row)
+            return None
+        finally:
+            cursor.close()
+    
+    def get_passwords_by_ids(self, user_id: int, password_ids: List[int]) -> List[Password]:
+        """
+        Busca várias senhas do usuário por ID, em uma consulta por lote de IDs
+        
+        IDs inexistentes ou de outros usuários são simplesmente omitidos.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        passwords = []
+        try:
+            for start in range(0, len(password_ids), ROWS_PER_STATEMENT * 4):
+                part = password_ids[start:start + ROWS_PER_STATEMENT * 4]
+                cursor.execute(
+                    f'''SELECT id, user_id, site, username, encrypted_password, 
+                               created_at, updated_at 
+                        FROM passwords 
+                        WHERE id IN ({', '.join('?' * len(part))}) AND user_id = ?''',
+                    (*part, user_id)
+                )
+                passwords.extend(Password.from_db_row(row) for row in cursor.fetchall())
+            return passwords
+        finally:
+            cursor.close()
     
     def get_all_passwords(self, user_id: int) -> List[Password]:
         """Busca todas as senhas de um usuário"""
@@ -110,43 +300,367 @@ class PasswordRepository:
             rows = cursor.fetchall()
             return [Password.from_db_row(row) for row in rows]
         finally:
-            conn.close()
+            cursor.close()
     
-    def update_password(self, password_id: int, user_id: int, site: str,
-                        username: str, encrypted_password: str) -> bool:
-        """Atualiza uma senha"""
+    def get_passwords_page(self, user_id: int, limit: int,
+                           after: Optional[Tuple[str, str, int]] = None) -> List[Password]:
+        """
+        Busca uma página de senhas do usuário, ordenada por (site, username, id)
+        
+        A busca por keyset usa o índice único (user_id, site, username): cada
+        página custa O(limit), independentemente da posição no cofre.
+        
+        Args:
+            user_id: ID do usuário
+            limit: Quantidade máxima de senhas
+            after: Posição (site, username, id) do último item da página anterior
+            
+        Returns:
+            Lista de senhas da página
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute(
+            if after is None:
+                cursor.execute(
+                    '''SELECT id, user_id, site, username, encrypted_password, 
+                              created_at, updated_at 
+                       FROM passwords 
+                       WHERE user_id = ? 
+                       ORDER BY site, username, id
+                       LIMIT ?''',
+                    (user_id, limit)
+                )
+            else:
+                cursor.execute(
+                    '''SELECT id, user_id, site, username, encrypted_password, 
+                              created_at, updated_at 
+                       FROM passwords 
+                       WHERE user_id = ? AND (site, username, id) > (?, ?, ?)
+                       ORDER BY site, username, id
+                       LIMIT ?''',
+                    (user_id, *after, limit)
+                )
+            return [Password.from_db_row(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    
+    def _has_search_index(self, conn: sqlite3.Connection) -> bool:
+        """Indica se o índice FTS5 existe (SQLite sem FTS5/trigram usa LIKE)"""
+        if not self._search_index_ready:
+            self._search_index_ready = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'passwords_fts'"
+            ).fetchone() is not None
+        return self._search_index_ready
+    
+    @staticmethod
+    def _like_escape(text: str) -> str:
+        """Escapa os curingas do LIKE"""
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    
+    def search_passwords(self, user_id: int, query: str, limit: int,
+                         offset: int = 0) -> List[Password]:
+        """
+        Busca senhas do usuário por trecho do site ou do username
+        
+        Usa o índice FTS5 (trigramas), restrito ao dono pela coluna ``owner``
+        do próprio índice. Resultados que começam pela consulta vêm primeiro,
+        seguidos pela relevância (bm25, site pesa mais que username). Consultas
+        curtas demais para trigramas fazem busca por prefixo nas senhas do usuário.
+        
+        Args:
+            user_id: ID do usuário
+            query: Texto buscado
+            limit: Quantidade máxima de resultados
+            offset: Resultados a pular (paginação)
+            
+        Returns:
+            Lista de senhas encontradas, ordenadas por relevância
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        prefix = self._like_escape(query) + '%'
+        try:
+            if len(query) >= TRIGRAM_MIN_QUERY_LENGTH and self._has_search_index(conn):
+                match = 'owner : "#{}#" AND {{site username}} : "{}"'.format(
+                    user_id, query.replace('"', '""')
+                )
+                cursor.execute(
+                    '''SELECT p.id, p.user_id, p.site, p.username, p.encrypted_password,
+                              p.created_at, p.updated_at
+                       FROM passwords_fts
+                       JOIN passwords p ON p.id = passwords_fts.rowid
+                       WHERE passwords_fts MATCH ? AND p.user_id = ?
+                       ORDER BY (p.site LIKE ? ESCAPE '\\') DESC,
+                                bm25(passwords_fts, 10.0, 5.0, 0.0), p.site, p.username, p.id
+                       LIMIT ? OFFSET ?''',
+                    (match, user_id, prefix, limit, offset)
+                )
+            else:
+                pattern = prefix if len(query) < TRIGRAM_MIN_QUERY_LENGTH else '%' + prefix
+                cursor.execute(
+                    '''SELECT id, user_id, site, username, encrypted_password, 
+                              created_at, updated_at 
+                       FROM passwords 
+                       WHERE user_id = ? AND (site LIKE ? ESCAPE '\\' OR username LIKE ? ESCAPE '\\')
+                       ORDER BY (site LIKE ? ESCAPE '\\') DESC, site, username, id
+                       LIMIT ? OFFSET ?''',
+                    (user_id, pattern, pattern, prefix, limit, offset)
+                )
+            return [Password.from_db_row(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    
+    def update_password(self, password_id: int, user_id: int, site: str,
+                        username: str, encrypted_password: str) -> bool:
+        """Atualiza uma senha"""
+        def update(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
                 '''UPDATE passwords 
                    SET site = ?, username = ?, encrypted_password = ?, 
                        updated_at = CURRENT_TIMESTAMP
                    WHERE id = ? AND user_id = ?''',
-                (site, username, encrypted_password, password_id, user_id)
+                (site, username, self._to_storage(encrypted_password), password_id, user_id)
             )
-            conn.commit()
             return cursor.rowcount > 0
-        finally:
-            conn.close()
+        
+        return self._write(update)
+    
+    def patch_password(self, password_id: int, user_id: int, site: Optional[str] = None,
+                       username: Optional[str] = None,
+                       encrypted_password: Optional[str] = None) -> bool:
+        """
+        Atualiza apenas os campos informados, em um único UPDATE condicional
+        
+        O próprio UPDATE verifica existência e dono (rowcount 0 = não encontrada).
+        Só as colunas informadas entram no SET, então trocar a senha não mexe
+        no índice de busca e renomear não regrava o texto criptografado.
+        
+        Returns:
+            True se a senha existia e foi atualizada
+        """
+        columns = {'site': site, 'username': username,
+                   'encrypted_password': self._to_storage(encrypted_password)
+                   if encrypted_password is not None else None}
+        changes = {column: value for column, value in columns.items() if value is not None}
+        if not changes:
+            raise ValueError('Nenhum campo para atualizar')
+        assignments = ', '.join(f'{column} = ?' for column in changes)
+        
+        def update(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                f'''UPDATE passwords 
+                    SET {assignments}, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND user_id = ?''',
+                (*changes.values(), password_id, user_id)
+            )
+            return cursor.rowcount > 0
+        
+        return self._write(update)
     
     def delete_password(self, password_id: int, user_id: int) -> bool:
         """Deleta uma senha"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
+        def delete(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
                 'DELETE FROM passwords WHERE id = ? AND user_id = ?',
                 (password_id, user_id)
             )
-            conn.commit()
             return cursor.rowcount > 0
+        
+        return self._write(delete)
+    
+    def get_user_data_key(self, user_id: int) -> Optional[str]:
+        """Busca a chave de dados embrulhada do usuário"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT wrapped_key FROM user_keys WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
         finally:
-            conn.close()
+            cursor.close()
+    
+    def save_user_data_key(self, user_id: int, wrapped_key: str) -> str:
+        """
+        Armazena a chave de dados do usuário, se ele ainda não tiver uma
+        
+        Returns:
+            Chave efetivamente armazenada (a existente, em caso de corrida)
+        """
+        def insert(conn: sqlite3.Connection) -> str:
+            conn.execute(
+                'INSERT OR IGNORE INTO user_keys (user_id, wrapped_key) VALUES (?, ?)',
+                (user_id, wrapped_key)
+            )
+            row = conn.execute(
+                'SELECT wrapped_key FROM user_keys WHERE user_id = ?', (user_id,)
+            ).fetchone()
+            return row[0]
+        
+        return self._write(insert)
+    
+    def get_vault_version(self, user_id: int) -> int:
+        """
+        Obtém a versão do cofre do usuário
+        
+        A versão é incrementada por triggers a cada criação, atualização ou
+        remoção de senha do usuário, na mesma transação da escrita.
+        
+        Returns:
+            Versão atual (0 se o usuário nunca alterou o cofre)
+        """
+        conn = self._get_connection()
+        row = conn.execute(
+            'SELECT version FROM vault_versions WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def get_checkpoint(self, name: str) -> int:
+        """Obtém o último ID processado por um job de manutenção"""
+        conn = self._get_connection()
+        row = conn.execute(
+            'SELECT last_id FROM job_checkpoints WHERE name = ?', (name,)
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def reset_checkpoint(self, name: str):
+        """Reinicia o checkpoint de um job de manutenção"""
+        self._write(lambda conn: conn.execute('DELETE FROM job_checkpoints WHERE name = ?', (name,)))
+    
+    def get_ciphertext_batch(self, after_id: int, limit: int) -> List[Tuple[int, int, str]]:
+        """Busca (id, user_id, encrypted_password) em ordem de ID, a partir de after_id"""
+        conn = self._get_connection()
+        rows = conn.execute(
+            '''SELECT id, user_id, encrypted_password FROM passwords
+               WHERE id > ? ORDER BY id LIMIT ?''',
+            (after_id, limit)
+        ).fetchall()
+        return [(row[0], row[1], decode_ciphertext(row[2])) for row in rows]
+    
+    def get_data_key_batch(self, after_user_id: int, limit: int) -> List[Tuple[int, str]]:
+        """Busca (user_id, wrapped_key) em ordem de usuário, a partir de after_user_id"""
+        conn = self._get_connection()
+        return conn.execute(
+            '''SELECT user_id, wrapped_key FROM user_keys
+               WHERE user_id > ? ORDER BY user_id LIMIT ?''',
+            (after_user_id, limit)
+        ).fetchall()
+    
+    def apply_reencryption(self, updates: List[Tuple[int, str, str]],
+                           checkpoint_name: str, last_id: int) -> int:
+        """
+        Grava textos re-criptografados e avança o checkpoint na mesma transação
+        
+        Cada linha só é alterada se o texto ainda for o lido pelo job, de modo
+        que uma edição concorrente do usuário nunca é sobrescrita.
+        
+        Args:
+            updates: Tuplas (id, texto_antigo, texto_novo)
+            checkpoint_name: Nome do checkpoint
+            last_id: Último ID processado
+            
+        Returns:
+            Quantidade de linhas atualizadas
+        """
+        def apply(conn: sqlite3.Connection) -> int:
+            updated = 0
+            for password_id, old, new in updates:
+                # O valor lido pode estar em qualquer um dos formatos de armazenamento
+                cursor = conn.execute(
+                    '''UPDATE passwords SET encrypted_password = ?
+                       WHERE id = ? AND encrypted_password IN (?, ?)''',
+                    (self._to_storage(new), password_id, old, encode_ciphertext(old))
+                )
+                updated += cursor.rowcount
+            self._save_checkpoint(conn, checkpoint_name, last_id)
+            return updated
+        
+        return self._write(apply)
+    
+    def apply_data_key_rewrap(self, updates: List[Tuple[int, str, str]],
+                              checkpoint_name: str, last_user_id: int) -> int:
+        """
+        Grava chaves de dados re-embrulhadas e avança o checkpoint
+        
+        Args:
+            updates: Tuplas (user_id, chave_antiga, chave_nova)
+            checkpoint_name: Nome do checkpoint
+            last_user_id: Último usuário processado
+            
+        Returns:
+            Quantidade de chaves atualizadas
+        """
+        def apply(conn: sqlite3.Connection) -> int:
+            updated = 0
+            for user_id, old, new in updates:
+                cursor = conn.execute(
+                    'UPDATE user_keys SET wrapped_key = ? WHERE user_id = ? AND wrapped_key = ?',
+                    (new, user_id, old)
+                )
+                updated += cursor.rowcount
+            self._save_checkpoint(conn, checkpoint_name, last_user_id)
+            return updated
+        
+        return self._write(apply)
+    
+    def migrate_ciphertext_storage(self, batch_size: int = 500) -> int:
+        """
+        Converte as senhas armazenadas para o formato configurado (BLOB ou TEXT)
+        
+        A conversão é feita em lotes curtos pelo group commit, então pode rodar
+        com o serviço no ar; linhas já convertidas são ignoradas.
+        
+        Args:
+            batch_size: Linhas por transação
+            
+        Returns:
+            Quantidade de linhas convertidas
+        """
+        source_type = 'text' if self.ciphertext_storage == 'blob' else 'blob'
+        
+        def convert(conn: sqlite3.Connection, after_id: int) -> Tuple[int, int]:
+            rows = conn.execute(
+                '''SELECT id, encrypted_password FROM passwords
+                   WHERE id > ? AND typeof(encrypted_password) = ?
+                   ORDER BY id LIMIT ?''',
+                (after_id, source_type, batch_size)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE passwords SET encrypted_password = ? WHERE id = ?',
+                [(self._to_storage(decode_ciphertext(value)), password_id)
+                 for password_id, value in rows]
+            )
+            return len(rows), rows[-1][0] if rows else after_id
+        
+        converted, last_id = 0, 0
+        while True:
+            count, last_id = self._write(lambda conn: convert(conn, last_id))
+            if not count:
+                return converted
+            converted += count
+    
+    @staticmethod
+    def _save_checkpoint(conn: sqlite3.Connection, name: str, last_id: int):
+        """Grava o checkpoint de um job de manutenção"""
+        conn.execute(
+            '''INSERT INTO job_checkpoints (name, last_id, updated_at)
+               VALUES (?, ?, CURRENT_TIMESTAMP)
+               ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id,
+                                               updated_at = excluded.updated_at''',
+            (name, last_id)
+        )
+    
+    def pool_stats(self) -> Dict[str, int]:
+        """Retorna estatísticas do pool de conexões (hits/misses)"""
+        return self.pool.stats()
+    
+    def write_stats(self) -> Dict[str, int]:
+        """Retorna estatísticas do group commit"""
+        return self.writer.stats()
     
     def init_database(self):
         """Inicializa o banco de dados"""
-        conn = self._get_connection()
+        conn = self.pool.get_connection()
         cursor = conn.cursor()
         try:
             cursor.execute('''
@@ -155,14 +669,94 @@ class PasswordRepository:
                     user_id INTEGER NOT NULL,
                     site TEXT NOT NULL,
                     username TEXT NOT NULL,
-                    encrypted_password TEXT NOT NULL,
+                    encrypted_password BLOB NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES users(id),
                     UNIQUE(user_id, site, username)
                 )
             ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_keys (
+                    user_id INTEGER PRIMARY KEY,
+                    wrapped_key TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vault_versions (
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            ''')
+            cursor.executescript('''
+                CREATE TRIGGER IF NOT EXISTS vault_version_insert AFTER INSERT ON passwords BEGIN
+                    INSERT INTO vault_versions (user_id, version) VALUES (new.user_id, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS vault_version_update AFTER UPDATE ON passwords BEGIN
+                    INSERT INTO vault_versions (user_id, version) VALUES (new.user_id, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS vault_version_move AFTER UPDATE OF user_id ON passwords
+                WHEN old.user_id <> new.user_id BEGIN
+                    INSERT INTO vault_versions (user_id, version) VALUES (old.user_id, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS vault_version_delete AFTER DELETE ON passwords BEGIN
+                    INSERT INTO vault_versions (user_id, version) VALUES (old.user_id, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+                END;
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS job_checkpoints (
+                    name TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
             conn.commit()
         finally:
-            conn.close()
-
+            cursor.close()
+        self._init_search_index(conn)
+    
+    def _init_search_index(self, conn: sqlite3.Connection):
+        """
+        Cria o índice de busca FTS5 e os triggers que o mantêm sincronizado
+        
+        O índice é contentless (guarda só os trigramas) e inclui a coluna
+        ``owner`` ("#<user_id>#") para que a busca já seja restrita ao usuário.
+        Em bancos existentes, o índice é preenchido na criação.
+        """
+        if self._has_search_index(conn):
+            return
+        try:
+            conn.executescript('''
+                BEGIN;
+                CREATE VIRTUAL TABLE passwords_fts USING fts5(
+                    site, username, owner, content='', tokenize='trigram'
+                );
+                INSERT INTO passwords_fts (rowid, site, username, owner)
+                    SELECT id, site, username, '#' || user_id || '#' FROM passwords;
+                CREATE TRIGGER IF NOT EXISTS passwords_fts_insert AFTER INSERT ON passwords BEGIN
+                    INSERT INTO passwords_fts (rowid, site, username, owner)
+                    VALUES (new.id, new.site, new.username, '#' || new.user_id || '#');
+                END;
+                CREATE TRIGGER IF NOT EXISTS passwords_fts_delete AFTER DELETE ON passwords BEGIN
+                    INSERT INTO passwords_fts (passwords_fts, rowid, site, username, owner)
+                    VALUES ('delete', old.id, old.site, old.username, '#' || old.user_id || '#');
+                END;
+                CREATE TRIGGER IF NOT EXISTS passwords_fts_update
+                AFTER UPDATE OF site, username, user_id ON passwords BEGIN
+                    INSERT INTO passwords_fts (passwords_fts, rowid, site, username, owner)
+                    VALUES ('delete', old.id, old.site, old.username, '#' || old.user_id || '#');
+                    INSERT INTO passwords_fts (rowid, site, username, owner)
+                    VALUES (new.id, new.site, new.username, '#' || new.user_id || '#');
+                END;
+                COMMIT;
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite sem FTS5 ou sem o tokenizador trigram (< 3.34): busca via LIKE
+            conn.rollback()
+            return
+        self._search_index_ready = True
@@ -0,0 +1,70 @@
+"""
+Unidade de trabalho por requisição
+"""
+import sqlite3
+from typing import Any, Optional
+from flask import g, has_request_context
+from shared.sqlite_pool import SQLiteConnectionPool
+from shared.group_commit import GroupCommitWriter, WriteOperation
+
+
+class UnitOfWork:
+    """
+    Agrupa todas as operações de repositório de uma requisição
+
+    Leituras usam uma única conexão, obtida na primeira chamada e compartilhada
+    por todo o restante da requisição. Escritas são enviadas ao escritor de
+    group commit, que as junta com as de outras requisições concorrentes.
+
+    Não é uma transação única: cada escrita é atômica por si, mas uma leitura
+    seguida de escrita na mesma requisição pode ser intercalada com escritas
+    de outras requisições. Por isso as escritas não dependem do que foi lido:
+    UPDATE e DELETE filtram por ``id`` e ``user_id`` no próprio comando, e o
+    resultado (linhas afetadas) é o que vale para a resposta.
+    """
+
+    def __init__(self, pool: SQLiteConnectionPool, writer: GroupCommitWriter):
+        self.pool = pool
+        self.writer = writer
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Conexão de leitura da unidade de trabalho"""
+        if self._connection is None:
+            self._connection = self.pool.get_connection()
+        return self._connection
+
+    def write(self, operation: WriteOperation) -> Any:
+        """Executa uma escrita atômica através do group commit"""
+        return self.writer.submit(operation)
+
+    def close(self):
+        """Encerra a unidade de trabalho, descartando transações pendentes"""
+        if self._connection is not None and self._connection.in_transaction:
+            self._connection.rollback()
+        self._connection = None
+
+
+def current_unit_of_work(pool: SQLiteConnectionPool,
+                         writer: GroupCommitWriter) -> UnitOfWork:
+    """
+    Obtém a unidade de trabalho da requisição atual
+
+    Fora de uma requisição Flask (scripts, testes) retorna uma unidade avulsa.
+    """
+    if not has_request_context():
+        return UnitOfWork(pool, writer)
+
+    unit = g.get('unit_of_work')
+    if unit is None:
+        unit = UnitOfWork(pool, writer)
+        g.unit_of_work = unit
+    return unit
+
+
+def close_unit_of_work(exception: Optional[BaseException] = None):
+    """Encerra a unidade de trabalho da requisição (usar em teardown_request)"""
+    unit = g.pop('unit_of_work', None)
+    if unit is not None:
+        unit.close()
@@ -0,0 +1,44 @@
+"""
+Re-criptografa o cofre após a rotação da chave mestra
+
+Uso:
+    python reencrypt.py [--rate 200] [--batch-size 100] [--reset]
+
+A rotação em si é feita por encryption_service/rotate_key.py; os serviços
+que carregam a chave adotam a nova chave primária em até
+KEY_RELOAD_MIN_INTERVAL_SECONDS (Encryption Service).
+
+O job é retomável: se interrompido, a próxima execução continua do último
+checkpoint gravado. Use --reset ao iniciar uma nova rotação.
+"""
+import argparse
+
+from app import password_repo, init_db
+from config import Config
+from utils.encryption_client import create_encryption_client
+from utils.reencryption import ReencryptionJob
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-criptografa senhas com a chave atual')
+    parser.add_argument('--rate', type=float, default=Config.REENCRYPT_ROWS_PER_SECOND,
+                        help='Limite de linhas por segundo (0 = sem limite)')
+    parser.add_argument('--batch-size', type=int, default=Config.REENCRYPT_BATCH_SIZE,
+                        help='Linhas por lote/transação')
+    parser.add_argument('--reset', action='store_true',
+                        help='Reinicia os checkpoints antes de executar')
+    args = parser.parse_args()
+
+    init_db()
+    job = ReencryptionJob(password_repo, create_encryption_client(),
+                          rows_per_second=args.rate, batch_size=args.batch_size)
+    if args.reset:
+        job.reset()
+
+    result = job.run()
+    print(f"🔄 Chaves re-embrulhadas: {result['keys_rewrapped']}/{result['keys_scanned']}")
+    print(f"🔄 Senhas re-criptografadas: {result['rows_reencrypted']}/{result['rows_scanned']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,643 @@
+"""
+Rotas assíncronas do Password Manager Service (modo ASGI, Quart)
+
+Mesma API de routes/password_routes.py. A verificação do token roda em
+paralelo com as leituras no banco que dependem só do usuário; chamadas aos
+outros serviços (ex.: /encrypt) esperam a verificação, para que um token
+forjado não gere trabalho no Encryption Service. Essas chamadas não ocupam
+threads e o SQLite, que é bloqueante, é acessado por um pool de threads
+dedicado.
+"""
+import asyncio
+import hmac
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from quart import Blueprint, Response, jsonify, request
+
+from config import Config
+from shared.group_commit import WriterUnavailable
+from shared.rate_limit import RateLimiter, build_policies, get_bucket_store, too_many_requests_message
+from models.password import PasswordRepository
+from utils.async_clients import AsyncAuthClient, create_async_encryption_client
+from utils.encryption_client import create_encryption_client
+from utils.importer import (CONFLICT_MODES, IMPORT_FORMATS, ImportFormatError,
+                            PasswordImporter, iter_import_rows)
+from utils.pagination import (decode_cursor, decode_offset_cursor, encode_cursor,
+                              encode_offset_cursor, list_etag, parse_limit)
+from utils.validation import parse_entry_fields, parse_password_ids
+
+async_password_bp = Blueprint('async_password', __name__)
+password_repo = PasswordRepository(Config.DATABASE)
+auth_client = AsyncAuthClient()
+encryption_client = create_async_encryption_client()
+# A importação em massa roda inteira em uma thread, com o cliente síncrono
+batch_encryption_client = create_encryption_client()
+db_executor = ThreadPoolExecutor(max_workers=Config.ASYNC_DB_THREADS,
+                                 thread_name_prefix='pm-db')
+
+# Mesmas políticas das rotas síncronas ('password.x' -> 'async_password.x')
+rate_limiter = RateLimiter(
+    {f'async_{endpoint}': rules for endpoint, rules in build_policies(Config.RATE_LIMITS).items()},
+    store=get_bucket_store(Config.RATE_LIMIT_BACKEND, Config.RATE_LIMIT_DB_PATH),
+    enabled=Config.RATE_LIMIT_ENABLED
+)
+
+# Corpo de importação guardado em memória até este tamanho; acima, em disco
+IMPORT_SPOOL_MAX_MEMORY = 1024 * 1024
+
+async def run_db(function: Callable, *args) -> Any:
+    """Executa uma chamada ao repositório no pool de threads do banco"""
+    return await asyncio.get_running_loop().run_in_executor(db_executor, function, *args)
+
+
+def error(message: str, status: int) -> Tuple[Response, int]:
+    """Resposta de erro no formato das rotas síncronas"""
+    return jsonify({'error': message}), status
+
+
+def internal_error(e: Exception) -> Tuple[Response, int]:
+    """Resposta para erros inesperados (503 quando a escrita não pôde ser confirmada)"""
+    if isinstance(e, WriterUnavailable):
+        return error('Serviço temporariamente indisponível, tente novamente', 503)
+    return error(f'Erro interno: {str(e)}', 500)
+
+
+@async_password_bp.before_request
+async def check_rate_limit():
+    """
+    Limite de taxa por usuário (equivalente ao ``RateLimiter.check`` do Flask)
+
+    O usuário vem do token verificado; a verificação fica no cache e é
+    reaproveitada pela rota. Tokens inválidos são limitados pelo IP.
+    """
+    rules = rate_limiter.rules_for(request.endpoint)
+    if not rules:
+        return None
+
+    identities = {}
+    parts = request.headers.get('Authorization', '').split(' ')
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        user_data = await auth_client.verify_token(parts[1])
+        identities['user'] = str(user_data['user_id']) if user_data else None
+    # O backend SQLite é bloqueante: consome no pool de threads do banco
+    seconds = await run_db(rate_limiter.consume, request.endpoint, identities, request.remote_addr)
+    if not seconds:
+        return None
+
+    response = jsonify({'error': too_many_requests_message(seconds)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+
+async def authorize(work: Optional[Callable[[int], Awaitable[Any]]] = None):
+    """
+    Extrai o token do header Authorization e o verifica
+
+    Args:
+        work: Trabalho sem efeitos colaterais a adiantar durante a verificação
+            (ver ``AsyncAuthClient.verify_with``)
+
+    Returns:
+        Tupla (user_id, resultado de work, resposta_erro)
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header:
+        return None, None, error('Token de autorização não fornecido', 401)
+
+    # Formato esperado: "Bearer <token>"
+    parts = auth_header.split(' ')
+    if len(parts) != 2 or parts[0] != 'Bearer':
+        return None, None, error('Formato de token inválido. Use: Bearer <token>', 401)
+
+    user_id, result = await auth_client.verify_with(parts[1], work or _no_work)
+    if user_id is None:
+        return None, None, error('Token inválido ou expirado', 401)
+    return user_id, result, None
+
+
+async def _no_work(user_id: int) -> None:
+    """Nada a adiantar durante a verificação"""
+    return None
+
+
+async def get_user_data_key(user_id: int, create: bool = False):
+    """Obtém (e opcionalmente cria) a chave de dados do usuário; ver a versão síncrona"""
+    data_key = await run_db(password_repo.get_user_data_key, user_id)
+    if data_key or not create or not Config.ENVELOPE_ENCRYPTION:
+        return True, data_key
+
+    data_key = await encryption_client.generate_data_key()
+    if not data_key:
+        return False, None
+    return True, await run_db(password_repo.save_user_data_key, user_id, data_key)
+
+
+async def encrypt_for_user(user_id: int, password: str) -> Any:
+    """Criptografa a senha com a chave de dados do usuário (criada se preciso)"""
+    key_ok, data_key = await get_user_data_key(user_id, create=True)
+    if not key_ok:
+        return None
+    return await encryption_client.encrypt(password, data_key)
+
+
+async def authorize_and_encrypt(password: Optional[str]):
+    """
+    Verifica o token e criptografa a senha para o usuário verificado
+
+    A chave de dados é lida durante a verificação; o /encrypt só é chamado
+    depois dela.
+    """
+    user_id, data_key, auth_error = await authorize(
+        None if password is None else (lambda uid: run_db(password_repo.get_user_data_key, uid))
+    )
+    if auth_error or password is None:
+        return user_id, None, auth_error
+    if not data_key and Config.ENVELOPE_ENCRYPTION:
+        return user_id, await encrypt_for_user(user_id, password), None
+    return user_id, await encryption_client.encrypt(password, data_key), None
+
+
+def not_modified(etag: str) -> Response:
+    """Resposta 304 para um If-None-Match que ainda corresponde ao cofre"""
+    return with_etag(Response('', status=304), etag)
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    """Anexa o ETag e exige revalidação a cada uso do cache"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def wants_ndjson() -> bool:
+    """Indica se o cliente pediu NDJSON (parâmetro format ou header Accept)"""
+    if request.args.get('format'):
+        return request.args.get('format') == 'ndjson'
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def with_vary(response: Response, negotiated: bool) -> Response:
+    """Marca a resposta como dependente do header Accept, se ele foi usado"""
+    if negotiated:
+        response.vary.add('Accept')
+    return response
+
+
+async def iter_password_batches(user_id: int):
+    """Percorre o cofre em lotes; cada lote é uma consulta em uma thread do banco"""
+    batches = password_repo.iter_password_batches(user_id, Config.STREAM_BATCH_SIZE)
+    while True:
+        batch = await run_db(next, batches, None)
+        if batch is None:
+            return
+        yield batch
+
+
+def stream_passwords(user_id: int, include_ciphertext: bool, ndjson: bool) -> Response:
+    """Resposta em streaming com todas as senhas do usuário (ver a versão síncrona)"""
+    async def generate():
+        count = 0
+        if not ndjson:
+            yield '{"passwords":['
+        async for batch in iter_password_batches(user_id):
+            items = [json.dumps(p.to_dict(include_ciphertext)) for p in batch]
+            if ndjson:
+                yield '\n'.join(items) + '\n'
+            else:
+                yield (',' if count else '') + ','.join(items)
+            count += len(items)
+        if not ndjson:
+            yield f'],"count":{count}}}'
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(generate(), mimetype=mimetype)
+
+
+@async_password_bp.route('/passwords', methods=['GET'])
+async def list_passwords():
+    """Endpoint para listar as senhas do usuário, página a página"""
+    try:
+        try:
+            limit = parse_limit(request.args.get('limit'), Config.PAGE_SIZE_DEFAULT,
+                                Config.PAGE_SIZE_MAX)
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            params_error = None
+        except ValueError as e:
+            params_error = str(e)
+
+        stream = request.args.get('stream') in ('1', 'true')
+        # Com If-None-Match a página só é lida se o cofre tiver mudado
+        version_only = stream or bool(request.if_none_match)
+
+        def read(user_id: int):
+            version = password_repo.get_vault_version(user_id)
+            if version_only:
+                return version, None
+            return version, password_repo.get_passwords_page(user_id, limit + 1, after)
+
+        async def work(user_id: int):
+            return None if params_error else await run_db(read, user_id)
+
+        user_id, result, auth_error = await authorize(work)
+        if auth_error:
+            return auth_error
+        if params_error:
+            return error(params_error, 400)
+
+        version, passwords = result
+        include_ciphertext = request.args.get('include_ciphertext', '').lower() == 'true'
+        negotiated = stream and not request.args.get('format')
+        ndjson = stream and wants_ndjson()
+        media_type = 'application/x-ndjson' if ndjson else 'application/json'
+        if stream:
+            etag = list_etag(f'{user_id}.{version}', media_type, include_ciphertext)
+        else:
+            etag = list_etag(f'{user_id}.{version}', media_type, include_ciphertext, limit, after)
+        if request.if_none_match.contains_weak(etag):
+            return with_vary(not_modified(etag), negotiated)
+
+        if stream:
+            return with_vary(with_etag(stream_passwords(user_id, include_ciphertext, ndjson), etag),
+                             negotiated)
+
+        if passwords is None:
+            passwords = await run_db(password_repo.get_passwords_page, user_id, limit + 1, after)
+        next_cursor = None
+        if len(passwords) > limit:
+            passwords = passwords[:limit]
+            last = passwords[-1]
+            next_cursor = encode_cursor(last.site, last.username, last.id)
+
+        return with_etag(jsonify({
+            'passwords': [p.to_dict(include_ciphertext) for p in passwords],
+            'count': len(passwords),
+            'limit': limit,
+            'next_cursor': next_cursor
+        }), etag), 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/search', methods=['GET'])
+async def search_passwords():
+    """Endpoint para buscar senhas por trecho do site ou do username"""
+    try:
+        query = request.args.get('q', '').strip()
+        try:
+            limit = parse_limit(request.args.get('limit'), Config.PAGE_SIZE_DEFAULT,
+                                Config.PAGE_SIZE_MAX)
+            cursor = request.args.get('cursor')
+            offset = decode_offset_cursor(cursor) if cursor else 0
+            params_error = None if query else 'Parâmetro "q" é obrigatório'
+        except ValueError as e:
+            params_error = str(e)
+
+        async def work(user_id: int):
+            if params_error:
+                return None
+            return await run_db(password_repo.search_passwords, user_id, query, limit + 1, offset)
+
+        user_id, passwords, auth_error = await authorize(work)
+        if auth_error:
+            return auth_error
+        if params_error:
+            return error(params_error, 400)
+
+        next_cursor = None
+        if len(passwords) > limit:
+            passwords = passwords[:limit]
+            next_cursor = encode_offset_cursor(offset + limit)
+
+        return jsonify({
+            'query': query,
+            'passwords': [p.to_dict(include_ciphertext=False) for p in passwords],
+            'count': len(passwords),
+            'limit': limit,
+            'next_cursor': next_cursor
+        }), 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords', methods=['POST'])
+async def create_password():
+    """Endpoint para criar uma nova senha (a criptografia corre junto com a verificação)"""
+    try:
+        fields, fields_error = parse_entry_fields(await request.get_json(silent=True))
+        user_id, encrypted_password, auth_error = await authorize_and_encrypt(
+            None if fields_error else fields['password']
+        )
+        if auth_error:
+            return auth_error
+        if fields_error:
+            return error(fields_error, 400)
+        if not encrypted_password:
+            return error('Erro ao criptografar senha', 500)
+
+        try:
+            password_id = await run_db(password_repo.create_password, user_id,
+                                       fields['site'], fields['username'], encrypted_password)
+        except Exception as e:
+            if 'UNIQUE' in str(e):
+                return error('Já existe uma senha para este site e username', 400)
+            raise
+
+        return jsonify({
+            'message': 'Senha criada com sucesso',
+            'id': password_id
+        }), 201
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/import', methods=['POST'])
+async def import_passwords():
+    """
+    Endpoint para importar senhas em massa (CSV com cabeçalho ou NDJSON)
+
+    O corpo é recebido sem bloquear o event loop e guardado em um arquivo
+    temporário (em memória até IMPORT_SPOOL_MAX_MEMORY); a importação, que é
+    um trabalho em lote, roda depois em uma thread.
+    """
+    try:
+        user_id, _, auth_error = await authorize()
+        if auth_error:
+            return auth_error
+
+        import_format = request.args.get('format') or (
+            'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        )
+        on_conflict = request.args.get('on_conflict', 'skip')
+        if import_format not in IMPORT_FORMATS:
+            return error('Parâmetro "format" deve ser "csv" ou "ndjson"', 400)
+        if on_conflict not in CONFLICT_MODES:
+            return error('Parâmetro "on_conflict" deve ser "skip", "overwrite" ou "fail"', 400)
+
+        key_ok, data_key = await get_user_data_key(user_id, create=True)
+        if not key_ok:
+            return error('Erro ao criptografar senha', 500)
+
+        importer = PasswordImporter(
+            password_repo, batch_encryption_client, user_id, data_key,
+            on_conflict=on_conflict,
+            chunk_size=Config.IMPORT_CHUNK_SIZE,
+            max_reported=Config.IMPORT_MAX_REPORTED_ROWS
+        )
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_MEMORY) as body:
+            async for chunk in request.body:
+                body.write(chunk)
+            body.seek(0)
+            try:
+                summary = await run_db(importer.run, iter_import_rows(body, import_format))
+            except ImportFormatError as e:
+                return jsonify(dict(importer.summary.to_dict(), error=str(e))), 400
+
+        return jsonify(summary.to_dict()), 409 if summary.aborted else 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/export', methods=['GET'])
+async def export_passwords():
+    """Endpoint para exportar o cofre em NDJSON, em streaming"""
+    try:
+        user_id, _, auth_error = await authorize()
+        if auth_error:
+            return auth_error
+
+        decrypt = request.args.get('decrypt', '').lower() == 'true'
+        _, data_key = await get_user_data_key(user_id)
+
+        async def generate():
+            async for batch in iter_password_batches(user_id):
+                entries = [p.to_dict(include_ciphertext=not decrypt) for p in batch]
+                if decrypt:
+                    plaintexts = await encryption_client.decrypt_many(
+                        [p.encrypted_text for p in batch], data_key
+                    )
+                    for entry, plaintext in zip(entries, plaintexts):
+                        entry['password'] = plaintext
+                        if plaintext is None:
+                            entry['error'] = 'Erro ao descriptografar senha'
+                yield ''.join(json.dumps(entry) + '\n' for entry in entries)
+
+        response = Response(generate(), mimetype='application/x-ndjson')
+        response.headers['Content-Disposition'] = 'attachment; filename="fortress-export.ndjson"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/reveal', methods=['POST'])
+async def reveal_passwords():
+    """Endpoint para descriptografar várias senhas em uma requisição"""
+    try:
+        ids, ids_error, ids_status = parse_password_ids(await request.get_json(silent=True),
+                                                        Config.REVEAL_MAX_BATCH)
+
+        def load(user_id: int):
+            return (password_repo.get_passwords_by_ids(user_id, ids),
+                    password_repo.get_user_data_key(user_id))
+
+        async def work(user_id: int):
+            return None if ids_error else await run_db(load, user_id)
+
+        user_id, result, auth_error = await authorize(work)
+        if auth_error:
+            return auth_error
+        if ids_error:
+            return error(ids_error, ids_status)
+
+        loaded, data_key = result
+        found = {p.id: p for p in loaded}
+        passwords = [found[i] for i in ids if i in found]
+        plaintexts = await encryption_client.decrypt_many(
+            [p.encrypted_text for p in passwords], data_key
+        ) if passwords else []
+
+        revealed = []
+        for password, plaintext in zip(passwords, plaintexts):
+            entry = {'id': password.id, 'site': password.site,
+                     'username': password.username, 'password': plaintext}
+            if plaintext is None:
+                entry['error'] = 'Erro ao descriptografar senha'
+            revealed.append(entry)
+
+        response = jsonify({
+            'passwords': revealed,
+            'not_found': [i for i in ids if i not in found],
+            'count': len(revealed)
+        })
+        response.headers['Cache-Control'] = 'no-store'
+        return response, 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/<int:password_id>', methods=['GET'])
+async def get_password(password_id):
+    """
+    Endpoint para obter uma senha específica
+
+    A senha é lida pelo ID enquanto o token é verificado; o dono é conferido
+    depois, então a senha de outro usuário nunca é descriptografada.
+    """
+    try:
+        def load(_: int):
+            password = password_repo.find_password_by_id(password_id)
+            if password is None:
+                return None, None, None
+            return (password, password_repo.get_vault_version(password.user_id),
+                    password_repo.get_user_data_key(password.user_id))
+
+        user_id, result, auth_error = await authorize(lambda uid: run_db(load, uid))
+        if auth_error:
+            return auth_error
+
+        password, version, data_key = result
+        if password is None or password.user_id != user_id:
+            return error('Senha não encontrada', 404)
+
+        # Cofre inalterado: 304 sem chamar o serviço de criptografia
+        etag = f'{user_id}.{version}'
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+
+        decrypted_password = await encryption_client.decrypt(password.encrypted_text, data_key)
+        if not decrypted_password:
+            return error('Erro ao descriptografar senha', 500)
+
+        password_dict = password.to_dict()
+        password_dict['password'] = decrypted_password
+        return with_etag(jsonify(password_dict), etag), 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/<int:password_id>', methods=['PUT'])
+async def update_password(password_id):
+    """Endpoint para atualizar uma senha"""
+    try:
+        fields, fields_error = parse_entry_fields(await request.get_json(silent=True))
+        user_id, encrypted_password, auth_error = await authorize_and_encrypt(
+            None if fields_error else fields['password']
+        )
+        if auth_error:
+            return auth_error
+        if fields_error:
+            return error(fields_error, 400)
+        if not encrypted_password:
+            return error('Erro ao criptografar senha', 500)
+
+        try:
+            success = await run_db(password_repo.update_password, password_id, user_id,
+                                   fields['site'], fields['username'], encrypted_password)
+        except Exception as e:
+            if 'UNIQUE' in str(e):
+                return error('Já existe uma senha para este site e username', 400)
+            raise
+
+        if not success:
+            return error('Senha não encontrada', 404)
+        return jsonify({'message': 'Senha atualizada com sucesso'}), 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/<int:password_id>', methods=['PATCH'])
+async def patch_password(password_id):
+    """Endpoint para atualização parcial de uma senha"""
+    try:
+        fields, fields_error = parse_entry_fields(await request.get_json(silent=True),
+                                                  partial=True)
+        user_id, encrypted_password, auth_error = await authorize_and_encrypt(
+            None if fields_error else fields.get('password')
+        )
+        if auth_error:
+            return auth_error
+        if fields_error:
+            return error(fields_error, 400)
+        if 'password' in fields and not encrypted_password:
+            return error('Erro ao criptografar senha', 500)
+
+        try:
+            success = await run_db(lambda: password_repo.patch_password(
+                password_id, user_id,
+                site=fields.get('site'),
+                username=fields.get('username'),
+                encrypted_password=encrypted_password
+            ))
+        except Exception as e:
+            if 'UNIQUE' in str(e):
+                return error('Já existe uma senha para este site e username', 400)
+            raise
+
+        if not success:
+            return error('Senha não encontrada', 404)
+        return jsonify({'message': 'Senha atualizada com sucesso'}), 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/passwords/<int:password_id>', methods=['DELETE'])
+async def delete_password(password_id):
+    """Endpoint para deletar uma senha"""
+    try:
+        user_id, _, auth_error = await authorize()
+        if auth_error:
+            return auth_error
+
+        success = await run_db(password_repo.delete_password, password_id, user_id)
+        if not success:
+            return error('Senha não encontrada', 404)
+        return jsonify({'message': 'Senha deletada com sucesso'}), 200
+
+    except Exception as e:
+        return internal_error(e)
+
+
+@async_password_bp.route('/tokens/invalidate', methods=['POST'])
+async def invalidate_token():
+    """Endpoint para remover um token do cache de verificação; ver a versão síncrona"""
+    parts = request.headers.get('Authorization', '').split(' ')
+    if len(parts) != 2 or parts[0] != 'Bearer' or not parts[1]:
+        return error('Token de autorização não fornecido', 401)
+
+    token = parts[1]
+    data = await request.get_json(silent=True) or {}
+    if data.get('token') and not hmac.compare_digest(str(data['token']), token):
+        return error('Só é possível invalidar o próprio token', 403)
+
+    removed = auth_client.invalidate_token(token)
+    return jsonify({'invalidated': removed}), 200
+
+
+@async_password_bp.route('/health', methods=['GET'])
+async def health():
+    """Endpoint de health check"""
+    return jsonify({
+        'status': 'OK',
+        'service': 'password_manager_service',
+        'version': '1.0.0',
+        'mode': 'asgi',
+        'db_pool': password_repo.pool_stats(),
+        'group_commit': password_repo.write_stats(),
+        'token_cache': auth_client.cache_stats(),
+        'http_transport': auth_client.transport.stats(),
+        'rate_limit': rate_limiter.stats()
+    }), 200
@@ -1,16 +1,54 @@
 """
 Rotas do Password Manager Service
 """
-from flask import Blueprint, request, jsonify
+import hmac
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from models.password import PasswordRepository
+from models.unit_of_work import close_unit_of_work
 from utils.auth_client import AuthClient
-from utils.encryption_client import EncryptionClient
+from utils.encryption_client import create_encryption_client
+from utils.importer import (CONFLICT_MODES, IMPORT_FORMATS, ImportFormatError,
+                            PasswordImporter, iter_import_rows)
+from utils.pagination import (decode_cursor, decode_offset_cursor, encode_cursor,
+                              encode_offset_cursor, list_etag, parse_limit)
+from utils.validation import parse_entry_fields, parse_password_ids
 from config import Config
+from shared.group_commit import WriterUnavailable
+from shared.rate_limit import RateLimiter, build_policies, get_bucket_store
 
 password_bp = Blueprint('password', __name__)
 password_repo = PasswordRepository(Config.DATABASE)
 auth_client = AuthClient()
-encryption_client = EncryptionClient()
+encryption_client = create_encryption_client()
+rate_limiter = RateLimiter(
+    build_policies(Config.RATE_LIMITS),
+    store=get_bucket_store(Config.RATE_LIMIT_BACKEND, Config.RATE_LIMIT_DB_PATH),
+    enabled=Config.RATE_LIMIT_ENABLED
+)
+
+
+@rate_limiter.key_function('user')
+def rate_limit_user():
+    """Usuário do token (a verificação fica no cache e é reaproveitada pela rota)"""
+    parts = request.headers.get('Authorization', '').split(' ')
+    if len(parts) != 2 or parts[0] != 'Bearer':
+        return None
+    user_data = auth_client.verify_token(parts[1])
+    return str(user_data['user_id']) if user_data else None
+
+
+rate_limiter.init_blueprint(password_bp)
+
+# Uma conexão por requisição, liberada ao final
+password_bp.teardown_request(close_unit_of_work)
+
+
+def internal_error(e: Exception):
+    """Resposta para erros inesperados (503 quando a escrita não pôde ser confirmada)"""
+    if isinstance(e, WriterUnavailable):
+        return jsonify({'error': 'Serviço temporariamente indisponível, tente novamente'}), 503
+    return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 
 def get_user_id_from_token():
@@ -39,24 +77,196 @@ def get_user_id_from_token():
     return True, user_data['user_id'], None
 
 
+def get_user_data_key(user_id: int, create: bool = False):
+    """
+    Obtém a chave de dados embrulhada do usuário (criptografia envelope)
+    
+    Args:
+        user_id: ID do usuário
+        create: Gera e armazena uma chave se o usuário ainda não tiver
+        
+    Returns:
+        Tupla (sucesso, chave_de_dados). A chave é None para usuários sem
+        chave própria, cujas senhas usam a chave mestra.
+    """
+    data_key = password_repo.get_user_data_key(user_id)
+    if data_key or not create or not Config.ENVELOPE_ENCRYPTION:
+        return True, data_key
+    
+    data_key = encryption_client.generate_data_key()
+    if not data_key:
+        return False, None
+    return True, password_repo.save_user_data_key(user_id, data_key)
+
+
+def get_vault_etag(user_id: int) -> str:
+    """
+    ETag das leituras do cofre, derivado da versão do usuário
+    
+    A versão é lida antes dos dados: se uma escrita acontecer entre as duas
+    leituras, a resposta sai com a versão antiga e o cliente apenas baixa os
+    dados de novo na próxima vez (nunca guarda dados velhos com ETag novo).
+    """
+    return f'{user_id}.{password_repo.get_vault_version(user_id)}'
+
+
+def not_modified(etag: str) -> Response:
+    """Resposta 304 para um If-None-Match que ainda corresponde ao cofre"""
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    """Anexa o ETag e exige revalidação a cada uso do cache"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def wants_ndjson() -> bool:
+    """Indica se o cliente pediu NDJSON (parâmetro format ou header Accept)"""
+    if request.args.get('format'):
+        return request.args.get('format') == 'ndjson'
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def with_vary(response: Response, negotiated: bool) -> Response:
+    """Marca a resposta como dependente do header Accept, se ele foi usado"""
+    if negotiated:
+        response.vary.add('Accept')
+    return response
+
+
+def stream_passwords(user_id: int, include_ciphertext: bool, ndjson: bool) -> Response:
+    """
+    Resposta em streaming com todas as senhas do usuário
+    
+    As senhas são lidas e serializadas lote a lote: a memória fica constante,
+    qualquer que seja o tamanho do cofre. Em JSON, o formato é o da listagem
+    paginada sem cursor: {"passwords": [...], "count": N}.
+    """
+    def generate():
+        count = 0
+        if not ndjson:
+            yield '{"passwords":['
+        for batch in password_repo.iter_password_batches(user_id, Config.STREAM_BATCH_SIZE):
+            items = [json.dumps(p.to_dict(include_ciphertext)) for p in batch]
+            if ndjson:
+                yield '\n'.join(items) + '\n'
+            else:
+                yield (',' if count else '') + ','.join(items)
+            count += len(items)
+        if not ndjson:
+            yield f'],"count":{count}}}'
+    
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
 @password_bp.route('/passwords', methods=['GET'])
 def list_passwords():
-    """Endpoint para listar todas as senhas do usuário"""
+    """
+    Endpoint para listar as senhas do usuário, página a página
+    
+    Parâmetros: ``limit`` (limitado a PAGE_SIZE_MAX) e ``cursor`` (o
+    ``next_cursor`` da página anterior). ``next_cursor`` é null na última página.
+    Com ``stream=1`` o cofre inteiro é enviado em streaming (JSON ou NDJSON).
+    """
     try:
         result = get_user_id_from_token()
         success, user_id, error_response = result[0], result[1], result[2]
         if not success:
             return error_response[0], error_response[1]
         
-        passwords = password_repo.get_all_passwords(user_id)
+        try:
+            limit = parse_limit(request.args.get('limit'), Config.PAGE_SIZE_DEFAULT,
+                                Config.PAGE_SIZE_MAX)
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Texto criptografado só é codificado se o cliente pedir
+        include_ciphertext = request.args.get('include_ciphertext', '').lower() == 'true'
+        stream = request.args.get('stream') in ('1', 'true')
+        # Só o streaming negocia o formato pelo header Accept
+        negotiated = stream and not request.args.get('format')
+        ndjson = stream and wants_ndjson()
+        media_type = 'application/x-ndjson' if ndjson else 'application/json'
+        
+        # Cofre inalterado: 304 sem consultar a tabela de senhas
+        if stream:
+            etag = list_etag(get_vault_etag(user_id), media_type, include_ciphertext)
+        else:
+            etag = list_etag(get_vault_etag(user_id), media_type, include_ciphertext, limit, after)
+        if request.if_none_match.contains_weak(etag):
+            return with_vary(not_modified(etag), negotiated)
+        
+        if stream:
+            return with_vary(with_etag(stream_passwords(user_id, include_ciphertext, ndjson), etag),
+                             negotiated)
+        
+        # Um item a mais indica se existe próxima página
+        passwords = password_repo.get_passwords_page(user_id, limit + 1, after)
+        next_cursor = None
+        if len(passwords) > limit:
+            passwords = passwords[:limit]
+            last = passwords[-1]
+            next_cursor = encode_cursor(last.site, last.username, last.id)
+        
+        return with_etag(jsonify({
+            'passwords': [p.to_dict(include_ciphertext) for p in passwords],
+            'count': len(passwords),
+            'limit': limit,
+            'next_cursor': next_cursor
+        }), etag), 200
+        
+    except Exception as e:
+        return internal_error(e)
+
+
+@password_bp.route('/passwords/search', methods=['GET'])
+def search_passwords():
+    """
+    Endpoint para buscar senhas por trecho do site ou do username
+    
+    Parâmetros: ``q`` (obrigatório), ``limit`` e ``cursor``. Resultados vêm
+    ordenados por relevância, paginados como a listagem.
+    """
+    try:
+        result = get_user_id_from_token()
+        success, user_id, error_response = result[0], result[1], result[2]
+        if not success:
+            return error_response[0], error_response[1]
+        
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Parâmetro "q" é obrigatório'}), 400
+        
+        try:
+            limit = parse_limit(request.args.get('limit'), Config.PAGE_SIZE_DEFAULT,
+                                Config.PAGE_SIZE_MAX)
+            cursor = request.args.get('cursor')
+            offset = decode_offset_cursor(cursor) if cursor else 0
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        passwords = password_repo.search_passwords(user_id, query, limit + 1, offset)
+        next_cursor = None
+        if len(passwords) > limit:
+            passwords = passwords[:limit]
+            next_cursor = encode_offset_cursor(offset + limit)
         
         return jsonify({
-            'passwords': [p.to_dict() for p in passwords],
-            'count': len(passwords)
+            'query': query,
+            'passwords': [p.to_dict(include_ciphertext=False) for p in passwords],
+            'count': len(passwords),
+            'limit': limit,
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
-        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+        return internal_error(e)
 
 
 @password_bp.route('/passwords', methods=['POST'])
@@ -68,26 +278,14 @@ def create_password():
         if not success:
             return error_response[0], error_response[1]
         
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'Dados não fornecidos'}), 400
-        
-        site = data.get('site', '').strip()
-        username = data.get('username', '').strip()
-        password = data.get('password', '')
-        
-        if not site:
-            return jsonify({'error': 'Campo "site" é obrigatório'}), 400
+        fields, error = parse_entry_fields(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+        site, username, password = fields['site'], fields['username'], fields['password']
         
-        if not username:
-            return jsonify({'error': 'Campo "username" é obrigatório'}), 400
-        
-        if not password:
-            return jsonify({'error': 'Campo "password" é obrigatório'}), 400
-        
-        # Criptografa a senha
-        encrypted_password = encryption_client.encrypt(password)
+        # Criptografa a senha com a chave de dados do usuário
+        key_ok, data_key = get_user_data_key(user_id, create=True)
+        encrypted_password = encryption_client.encrypt(password, data_key) if key_ok else None
         if not encrypted_password:
             return jsonify({'error': 'Erro ao criptografar senha'}), 500
         
@@ -107,7 +305,138 @@ def create_password():
             raise
             
     except Exception as e:
-        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+        return internal_error(e)
+
+
+@password_bp.route('/passwords/import', methods=['POST'])
+def import_passwords():
+    """
+    Endpoint para importar senhas em massa (CSV com cabeçalho ou NDJSON)
+    
+    O corpo é lido em streaming. Parâmetros: ``format`` ('csv' ou 'ndjson',
+    padrão pelo Content-Type) e ``on_conflict`` ('skip', 'overwrite' ou 'fail').
+    """
+    try:
+        result = get_user_id_from_token()
+        success, user_id, error_response = result[0], result[1], result[2]
+        if not success:
+            return error_response[0], error_response[1]
+        
+        import_format = request.args.get('format') or (
+            'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        )
+        on_conflict = request.args.get('on_conflict', 'skip')
+        if import_format not in IMPORT_FORMATS:
+            return jsonify({'error': 'Parâmetro "format" deve ser "csv" ou "ndjson"'}), 400
+        if on_conflict not in CONFLICT_MODES:
+            return jsonify({'error': 'Parâmetro "on_conflict" deve ser "skip", "overwrite" ou "fail"'}), 400
+        
+        key_ok, data_key = get_user_data_key(user_id, create=True)
+        if not key_ok:
+            return jsonify({'error': 'Erro ao criptografar senha'}), 500
+        
+        importer = PasswordImporter(
+            password_repo, encryption_client, user_id, data_key,
+            on_conflict=on_conflict,
+            chunk_size=Config.IMPORT_CHUNK_SIZE,
+            max_reported=Config.IMPORT_MAX_REPORTED_ROWS
+        )
+        try:
+            summary = importer.run(iter_import_rows(request.stream, import_format))
+        except ImportFormatError as e:
+            return jsonify(dict(importer.summary.to_dict(), error=str(e))), 400
+        
+        return jsonify(summary.to_dict()), 409 if summary.aborted else 200
+        
+    except Exception as e:
+        return internal_error(e)
+
+
+@password_bp.route('/passwords/export', methods=['GET'])
+def export_passwords():
+    """
+    Endpoint para exportar o cofre em NDJSON, em streaming
+    
+    Com ``decrypt=true`` cada entrada traz a senha em claro, descriptografada
+    em lotes (o arquivo pode ser reimportado em POST /passwords/import). Sem
+    ele, as entradas trazem o texto criptografado.
+    """
+    try:
+        result = get_user_id_from_token()
+        success, user_id, error_response = result[0], result[1], result[2]
+        if not success:
+            return error_response[0], error_response[1]
+        
+        decrypt = request.args.get('decrypt', '').lower() == 'true'
+        _, data_key = get_user_data_key(user_id)
+        
+        def generate():
+            for batch in password_repo.iter_password_batches(user_id, Config.STREAM_BATCH_SIZE):
+                entries = [p.to_dict(include_ciphertext=not decrypt) for p in batch]
+                if decrypt:
+                    plaintexts = encryption_client.decrypt_many(
+                        [p.encrypted_text for p in batch], data_key
+                    )
+                    for entry, plaintext in zip(entries, plaintexts):
+                        entry['password'] = plaintext
+                        if plaintext is None:
+                            entry['error'] = 'Erro ao descriptografar senha'
+                yield ''.join(json.dumps(entry) + '\n' for entry in entries)
+        
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        response.headers['Content-Disposition'] = 'attachment; filename="fortress-export.ndjson"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+        
+    except Exception as e:
+        return internal_error(e)
+
+
+@password_bp.route('/passwords/reveal', methods=['POST'])
+def reveal_passwords():
+    """
+    Endpoint para descriptografar várias senhas em uma requisição
+    
+    Corpo: {"ids": [...]} com até REVEAL_MAX_BATCH IDs. As senhas são lidas
+    em uma consulta e descriptografadas em um único lote.
+    """
+    try:
+        result = get_user_id_from_token()
+        success, user_id, error_response = result[0], result[1], result[2]
+        if not success:
+            return error_response[0], error_response[1]
+        
+        ids, error, status = parse_password_ids(request.get_json(silent=True),
+                                                Config.REVEAL_MAX_BATCH)
+        if error:
+            return jsonify({'error': error}), status
+        
+        found = {p.id: p for p in password_repo.get_passwords_by_ids(user_id, ids)}
+        passwords = [found[i] for i in ids if i in found]
+        
+        _, data_key = get_user_data_key(user_id)
+        plaintexts = encryption_client.decrypt_many(
+            [p.encrypted_text for p in passwords], data_key
+        ) if passwords else []
+        
+        revealed = []
+        for password, plaintext in zip(passwords, plaintexts):
+            entry = {'id': password.id, 'site': password.site,
+                     'username': password.username, 'password': plaintext}
+            if plaintext is None:
+                entry['error'] = 'Erro ao descriptografar senha'
+            revealed.append(entry)
+        
+        response = jsonify({
+            'passwords': revealed,
+            'not_found': [i for i in ids if i not in found],
+            'count': len(revealed)
+        })
+        response.headers['Cache-Control'] = 'no-store'
+        return response, 200
+        
+    except Exception as e:
+        return internal_error(e)
 
 
 @password_bp.route('/passwords/<int:password_id>', methods=['GET'])
@@ -119,23 +448,30 @@ def get_password(password_id):
         if not success:
             return error_response[0], error_response[1]
         
+        # Versão lida antes da senha: o ETag nunca é mais novo que o conteúdo
+        etag = get_vault_etag(user_id)
         password = password_repo.get_password_by_id(password_id, user_id)
         
         if not password:
             return jsonify({'error': 'Senha não encontrada'}), 404
         
+        # Cofre inalterado: 304 sem chamar o serviço de criptografia
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        
         # Descriptografa a senha para retornar
-        decrypted_password = encryption_client.decrypt(password.encrypted_password)
+        _, data_key = get_user_data_key(user_id)
+        decrypted_password = encryption_client.decrypt(password.encrypted_text, data_key)
         if not decrypted_password:
             return jsonify({'error': 'Erro ao descriptografar senha'}), 500
         
         password_dict = password.to_dict()
         password_dict['password'] = decrypted_password
         
-        return jsonify(password_dict), 200
+        return with_etag(jsonify(password_dict), etag), 200
         
     except Exception as e:
-        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+        return internal_error(e)
 
 
 @password_bp.route('/passwords/<int:password_id>', methods=['PUT'])
@@ -147,46 +483,80 @@ def update_password(password_id):
         if not success:
             return error_response[0], error_response[1]
         
-        data = request.get_json()
+        fields, error = parse_entry_fields(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+        site, username, password = fields['site'], fields['username'], fields['password']
         
-        if not data:
-            return jsonify({'error': 'Dados não fornecidos'}), 400
+        # Criptografa a nova senha
+        key_ok, data_key = get_user_data_key(user_id, create=True)
+        encrypted_password = encryption_client.encrypt(password, data_key) if key_ok else None
+        if not encrypted_password:
+            return jsonify({'error': 'Erro ao criptografar senha'}), 500
         
-        site = data.get('site', '').strip()
-        username = data.get('username', '').strip()
-        password = data.get('password', '')
+        # Atualiza (o UPDATE já verifica se a senha existe e pertence ao usuário)
+        try:
+            success = password_repo.update_password(
+                password_id, user_id, site, username, encrypted_password
+            )
+        except Exception as e:
+            if 'UNIQUE' in str(e):
+                return jsonify({'error': 'Já existe uma senha para este site e username'}), 400
+            raise
         
-        if not site:
-            return jsonify({'error': 'Campo "site" é obrigatório'}), 400
+        if not success:
+            return jsonify({'error': 'Senha não encontrada'}), 404
         
-        if not username:
-            return jsonify({'error': 'Campo "username" é obrigatório'}), 400
+        return jsonify({'message': 'Senha atualizada com sucesso'}), 200
         
-        if not password:
-            return jsonify({'error': 'Campo "password" é obrigatório'}), 400
+    except Exception as e:
+        return internal_error(e)
+
+
+@password_bp.route('/passwords/<int:password_id>', methods=['PATCH'])
+def patch_password(password_id):
+    """
+    Endpoint para atualização parcial de uma senha
+    
+    Aceita qualquer subconjunto de ``site``, ``username`` e ``password``. O
+    serviço de criptografia só é chamado quando ``password`` é informado.
+    """
+    try:
+        result = get_user_id_from_token()
+        success, user_id, error_response = result[0], result[1], result[2]
+        if not success:
+            return error_response[0], error_response[1]
         
-        # Verifica se a senha existe e pertence ao usuário
-        existing_password = password_repo.get_password_by_id(password_id, user_id)
-        if not existing_password:
-            return jsonify({'error': 'Senha não encontrada'}), 404
+        fields, error = parse_entry_fields(request.get_json(), partial=True)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Criptografa a nova senha
-        encrypted_password = encryption_client.encrypt(password)
-        if not encrypted_password:
-            return jsonify({'error': 'Erro ao criptografar senha'}), 500
+        encrypted_password = None
+        if 'password' in fields:
+            key_ok, data_key = get_user_data_key(user_id, create=True)
+            encrypted_password = encryption_client.encrypt(fields['password'], data_key) if key_ok else None
+            if not encrypted_password:
+                return jsonify({'error': 'Erro ao criptografar senha'}), 500
         
-        # Atualiza
-        success = password_repo.update_password(
-            password_id, user_id, site, username, encrypted_password
-        )
+        try:
+            success = password_repo.patch_password(
+                password_id, user_id,
+                site=fields.get('site'),
+                username=fields.get('username'),
+                encrypted_password=encrypted_password
+            )
+        except Exception as e:
+            if 'UNIQUE' in str(e):
+                return jsonify({'error': 'Já existe uma senha para este site e username'}), 400
+            raise
         
         if not success:
-            return jsonify({'error': 'Erro ao atualizar senha'}), 500
+            return jsonify({'error': 'Senha não encontrada'}), 404
         
         return jsonify({'message': 'Senha atualizada com sucesso'}), 200
         
     except Exception as e:
-        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+        return internal_error(e)
 
 
 @password_bp.route('/passwords/<int:password_id>', methods=['DELETE'])
@@ -206,7 +576,29 @@ def delete_password(password_id):
         return jsonify({'message': 'Senha deletada com sucesso'}), 200
         
     except Exception as e:
-        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+        return internal_error(e)
+
+
+@password_bp.route('/tokens/invalidate', methods=['POST'])
+def invalidate_token():
+    """
+    Endpoint para remover um token do cache de verificação (logout/revogação)
+
+    Só quem apresenta o token (header Authorization) pode descartá-lo; o
+    token não é verificado, pois normalmente já foi revogado. Se o corpo
+    informar ``token``, ele precisa ser o mesmo do header.
+    """
+    parts = request.headers.get('Authorization', '').split(' ')
+    if len(parts) != 2 or parts[0] != 'Bearer' or not parts[1]:
+        return jsonify({'error': 'Token de autorização não fornecido'}), 401
+    
+    token = parts[1]
+    data = request.get_json(silent=True) or {}
+    if data.get('token') and not hmac.compare_digest(str(data['token']), token):
+        return jsonify({'error': 'Só é possível invalidar o próprio token'}), 403
+    
+    removed = auth_client.invalidate_token(token)
+    return jsonify({'invalidated': removed}), 200
 
 
 @password_bp.route('/health', methods=['GET'])
@@ -215,6 +607,11 @@ def health():
     return jsonify({
         'status': 'OK',
         'service': 'password_manager_service',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'db_pool': password_repo.pool_stats(),
+        'group_commit': password_repo.write_stats(),
+        'token_cache': auth_client.cache_stats(),
+        'http_transport': auth_client.transport.stats(),
+        'rate_limit': rate_limiter.stats()
     }), 200
 
@@ -0,0 +1,974 @@
+"""
+Testes unitários para o serviço de gerenciamento de senhas
+"""
+import pytest
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# Banco isolado para os testes
+os.environ.setdefault('PM_DB_PATH', os.path.join(tempfile.mkdtemp(), 'test_pm.db'))
+
+# Adiciona o diretório pai ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, init_db, password_repo
+from routes import password_routes
+from utils.token_verifier import LocalTokenVerifier
+from utils.auth_client import AuthClient
+from utils.async_clients import AsyncAuthClient
+from utils.encryption_client import EncryptionClient, create_encryption_client
+from utils.embedded_encryption import EmbeddedEncryptionClient, load_encryption_module
+
+AUTH_HEADER = {'Authorization': 'Bearer valid-token'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Cliente de teste com Auth e Encryption simulados"""
+    def fake_verify(token):
+        if token == 'valid-token':
+            return {'valid': True, 'user_id': 1, 'username': 'testuser'}
+        return None
+
+    monkeypatch.setattr(password_routes.auth_client, 'verify_token', fake_verify)
+    def fake_encrypt(password, data_key=None):
+        return f'enc:{data_key}:{password}'
+
+    def fake_decrypt(encrypted_password, data_key=None):
+        prefix = f'enc:{data_key}:'
+        return encrypted_password[len(prefix):] if encrypted_password.startswith(prefix) else None
+
+    monkeypatch.setattr(password_routes.encryption_client, 'generate_data_key', lambda: 'wrapped-key')
+    monkeypatch.setattr(password_routes.encryption_client, 'encrypt', fake_encrypt)
+    monkeypatch.setattr(password_routes.encryption_client, 'decrypt', fake_decrypt)
+
+    app.config['TESTING'] = True
+    init_db()
+    conn = password_repo.pool.get_connection()
+    conn.execute('DELETE FROM passwords')
+    conn.execute('DELETE FROM user_keys')
+    conn.commit()
+    with app.test_client() as client:
+        yield client
+
+
+def create_entry(client, site='example.com', username='alice', password='secret123'):
+    """Cria uma entrada via API e retorna a resposta"""
+    return client.post('/passwords',
+                       data=json.dumps({'site': site, 'username': username, 'password': password}),
+                       content_type='application/json',
+                       headers=AUTH_HEADER)
+
+
+def test_create_and_get_password(client):
+    """Testa criação e leitura de uma senha"""
+    response = create_entry(client)
+    assert response.status_code == 201
+    password_id = json.loads(response.data)['id']
+
+    response = client.get(f'/passwords/{password_id}', headers=AUTH_HEADER)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['password'] == 'secret123'
+    assert data['encrypted_password'] == 'enc:wrapped-key:secret123'
+    assert password_repo.get_user_data_key(1) == 'wrapped-key'
+
+
+def test_create_duplicate_password(client):
+    """Testa violação de unicidade passando pelo group commit"""
+    assert create_entry(client).status_code == 201
+    response = create_entry(client)
+    assert response.status_code == 400
+    assert 'Já existe' in json.loads(response.data)['error']
+
+
+def test_update_password(client):
+    """Testa atualização de senha"""
+    password_id = json.loads(create_entry(client).data)['id']
+
+    response = client.put(f'/passwords/{password_id}',
+                          data=json.dumps({'site': 'example.org', 'username': 'bob', 'password': 'other'}),
+                          content_type='application/json',
+                          headers=AUTH_HEADER)
+    assert response.status_code == 200
+
+    data = json.loads(client.get(f'/passwords/{password_id}', headers=AUTH_HEADER).data)
+    assert data['site'] == 'example.org'
+    assert data['password'] == 'other'
+
+
+def test_delete_password(client):
+    """Testa remoção de senha"""
+    password_id = json.loads(create_entry(client).data)['id']
+    assert client.delete(f'/passwords/{password_id}', headers=AUTH_HEADER).status_code == 200
+    assert client.delete(f'/passwords/{password_id}', headers=AUTH_HEADER).status_code == 404
+
+
+def test_requires_token(client):
+    """Testa acesso sem token"""
+    assert client.get('/passwords').status_code == 401
+
+
+def test_invalidate_token_requires_same_token(client, monkeypatch):
+    """Testa que só o portador do token pode removê-lo do cache"""
+    removed = []
+    monkeypatch.setattr(password_routes.auth_client, 'invalidate_token',
+                        lambda token: removed.append(token) or True)
+
+    assert client.post('/tokens/invalidate', json={'token': 'valid-token'}).status_code == 401
+    response = client.post('/tokens/invalidate', json={'token': 'other-token'}, headers=AUTH_HEADER)
+    assert response.status_code == 403
+    response = client.post('/tokens/invalidate', json={'token': 'valid-token'}, headers=AUTH_HEADER)
+    assert response.status_code == 200
+    assert client.post('/tokens/invalidate', headers=AUTH_HEADER).status_code == 200
+    assert removed == ['valid-token', 'valid-token']
+
+
+def test_concurrent_writes_group_commit(client):
+    """Testa que escritas concorrentes são agrupadas e isoladas por savepoint"""
+    import time
+    writer = password_repo.writer
+    errors = []
+
+    # Prende o escritor até as 20 escritas estarem na fila, para que sejam agrupadas
+    release = threading.Event()
+    blocker = threading.Thread(target=writer.submit, args=(lambda conn: release.wait(),))
+    blocker.start()
+    before = password_repo.write_stats()
+
+    def worker(index):
+        try:
+            password_repo.create_password(2, f'site{index % 10}.com', 'user', 'enc:x')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while writer._queue.qsize() < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    blocker.join()
+    for thread in threads:
+        thread.join()
+
+    after = password_repo.write_stats()
+    assert after['operations'] - before['operations'] == 21
+    assert after['batches'] - before['batches'] <= 2
+    assert after['largest_batch'] > 1
+    # Metade das inserções repete (site, username) e falha sem afetar as demais
+    assert len(errors) == 10
+    assert len(password_repo.get_all_passwords(2)) == 10
+
+
+def test_group_commit_writer_failures_do_not_hang(tmp_path):
+    """Testa que falhas do escritor chegam às requisições em vez de travá-las"""
+    import sqlite3
+    import time
+    from shared.group_commit import GroupCommitWriter, WriterUnavailable
+    from shared.sqlite_pool import SQLiteConnectionPool
+
+    # Banco inacessível: a conexão falha, o erro é repassado e a thread continua viva
+    broken = GroupCommitWriter(SQLiteConnectionPool(str(tmp_path / 'missing' / 'x.db')),
+                               submit_timeout=5)
+    for _ in range(2):
+        with pytest.raises(sqlite3.OperationalError):
+            broken.submit(lambda conn: conn.execute('SELECT 1'))
+    assert broken._thread.is_alive()
+
+    # Escritor ocupado: a espera termina em WriterUnavailable e a operação é descartada
+    writer = GroupCommitWriter(SQLiteConnectionPool(str(tmp_path / 'ok.db')), submit_timeout=5)
+    running, release = threading.Event(), threading.Event()
+    blocker = threading.Thread(
+        target=writer.submit, args=(lambda conn: running.set() or release.wait(),)
+    )
+    blocker.start()
+    assert running.wait(5)
+    writer.submit_timeout = 0.2
+    executed = []
+    with pytest.raises(WriterUnavailable):
+        writer.submit(lambda conn: executed.append(1))
+    release.set()
+    blocker.join()
+    assert writer.submit(lambda conn: 'ok') == 'ok'
+    assert executed == []
+
+    # Lote lento, já em execução: o prazo passa, mas o cliente recebe o resultado real
+    def slow_insert(conn):
+        time.sleep(0.5)
+        conn.execute('CREATE TABLE IF NOT EXISTS slow (id INTEGER PRIMARY KEY)')
+        return conn.execute('INSERT INTO slow DEFAULT VALUES').lastrowid
+
+    assert writer.submit(slow_insert) == 1
+    count = writer.pool.get_connection().execute('SELECT COUNT(*) FROM slow').fetchone()[0]
+    assert count == 1
+
+
+def test_local_token_verifier_refreshes_on_unknown_kid():
+    """Testa verificação local com JWKS e recarga apenas para kid desconhecido"""
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+    from jwt.algorithms import OKPAlgorithm
+
+    keys = {}
+    fetches = []
+
+    def fetch_jwks(url):
+        fetches.append(url)
+        return {'keys': [dict(OKPAlgorithm.to_jwk(k.public_key(), as_dict=True), kid=kid)
+                         for kid, k in keys.items()]}
+
+    def sign(kid):
+        return jwt.encode({'user_id': 5}, keys[kid], algorithm='EdDSA', headers={'kid': kid})
+
+    keys['k1'] = Ed25519PrivateKey.generate()
+    verifier = LocalTokenVerifier('http://auth/jwks', min_refresh_interval=0, fetch_jwks=fetch_jwks)
+
+    assert verifier.verify(sign('k1'))['user_id'] == 5
+    assert verifier.verify(sign('k1'))['user_id'] == 5
+    assert len(fetches) == 1
+
+    # Rotação: nova chave só é buscada quando aparece o kid novo
+    keys['k2'] = Ed25519PrivateKey.generate()
+    assert verifier.verify(sign('k2'))['user_id'] == 5
+    assert len(fetches) == 2
+
+    forged = jwt.encode({'user_id': 5}, Ed25519PrivateKey.generate(), algorithm='EdDSA',
+                        headers={'kid': 'k1'})
+    assert verifier.verify(forged) is None
+    assert LocalTokenVerifier.handles('invalid.token.here') is False
+
+
+class FakeResponse:
+    """Resposta HTTP simulada"""
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class FakeTransport:
+    """Transporte HTTP simulado que delega a uma função"""
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def post(self, url, json=None, **kwargs):
+        return self.handler(url, json)
+
+
+def test_auth_client_caches_verified_tokens():
+    """Testa cache positivo, negativo, LRU e invalidação do AuthClient"""
+    import jwt
+    import time
+
+    calls = []
+
+    def fake_post(url, json):
+        calls.append(json['token'])
+        if json['token'].startswith('bad'):
+            return FakeResponse(401, {'error': 'Token inválido ou expirado'})
+        return FakeResponse(200, {'valid': True, 'user_id': 9})
+
+    client = AuthClient(auth_service_url='http://auth', transport=FakeTransport(fake_post))
+    client.cache.max_size = 2
+
+    token = jwt.encode({'user_id': 9, 'exp': int(time.time()) + 3600}, 'k' * 32, algorithm='HS256')
+    assert client.verify_token(token)['user_id'] == 9
+    assert client.verify_token(token)['user_id'] == 9
+    assert calls.count(token) == 1
+
+    assert client.verify_token('bad-token') is None
+    assert client.verify_token('bad-token') is None
+    assert calls.count('bad-token') == 1
+
+    # Terceira entrada despeja a menos usada recentemente
+    client.verify_token('other-token')
+    assert client.cache_stats()['evictions'] == 1
+
+    assert client.invalidate_token('other-token') is True
+    client.verify_token('other-token')
+    assert calls.count('other-token') == 2
+
+    # Token já expirado não entra no cache positivo
+    expired = jwt.encode({'user_id': 9, 'exp': int(time.time()) - 1}, 'k' * 32, algorithm='HS256')
+    client.verify_token(expired)
+    client.verify_token(expired)
+    assert calls.count(expired) == 2
+
+
+def test_auth_client_revocation_window():
+    """Testa que um token revogado deixa de ser aceito quando a entrada expira"""
+    import jwt
+    import time
+    from config import Config
+
+    revoked = set()
+
+    def fake_post(url, json):
+        if json['token'] in revoked:
+            return FakeResponse(401, {'error': 'Token revogado'})
+        return FakeResponse(200, {'valid': True, 'user_id': 9})
+
+    assert Config.AUTH_CACHE_TTL_SECONDS <= 5
+    client = AuthClient(auth_service_url='http://auth', transport=FakeTransport(fake_post))
+    # O TTL positivo nunca passa do exp do token
+    short = jwt.encode({'user_id': 9, 'exp': int(time.time()) + 2}, 'k' * 32, algorithm='HS256')
+    assert client._positive_ttl(short) <= 2
+
+    client.cache.default_ttl = 0.2
+    token = jwt.encode({'user_id': 9, 'exp': int(time.time()) + 3600}, 'k' * 32, algorithm='HS256')
+    assert client.verify_token(token)['user_id'] == 9
+    # Revogado em outro processo (sem /tokens/invalidate aqui)
+    revoked.add(token)
+    assert client.verify_token(token)['user_id'] == 9
+    time.sleep(0.3)
+    assert client.verify_token(token) is None
+
+
+def test_async_auth_client_overlaps_verification_with_work():
+    """Testa verify_with: trabalho em paralelo com /verify, descartado se o token for inválido"""
+    import asyncio
+    import jwt
+    import time
+
+    class FakeAsyncTransport:
+        async def post(self, url, json):
+            await asyncio.sleep(0.1)
+            if json['token'].startswith('bad'):
+                return FakeResponse(401, {'error': 'Token inválido ou expirado'})
+            return FakeResponse(200, {'valid': True, 'user_id': 9})
+
+    started = []
+
+    async def work(user_id):
+        started.append(user_id)
+        await asyncio.sleep(0.1)
+        return f'dados de {user_id}'
+
+    client = AsyncAuthClient(AuthClient(auth_service_url='http://auth'),
+                             transport=FakeAsyncTransport())
+    token = jwt.encode({'user_id': 9, 'exp': int(time.time()) + 3600}, 'k' * 32, algorithm='HS256')
+
+    started_at = time.perf_counter()
+    assert asyncio.run(client.verify_with(token, work)) == (9, 'dados de 9')
+    assert time.perf_counter() - started_at < 0.18
+
+    # Em cache: o trabalho roda depois, sem especulação
+    assert asyncio.run(client.verify_with(token, work)) == (9, 'dados de 9')
+    assert started == [9, 9]
+
+    # Token declarando outro usuário: o trabalho é refeito para o usuário verificado
+    other = jwt.encode({'user_id': 7}, 'k' * 32, algorithm='HS256')
+    assert asyncio.run(client.verify_with(other, work)) == (9, 'dados de 9')
+    assert started[-2:] == [7, 9]
+
+    forged = 'bad' + jwt.encode({'user_id': 3}, 'k' * 32, algorithm='HS256')
+    assert asyncio.run(client.verify_with(forged, work)) == (None, None)
+
+
+def test_http_transport_reuses_keep_alive_connections():
+    """Testa reutilização de conexões keep-alive e descarte por ociosidade"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from shared.http_transport import HTTPTransport
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = b'{"status": "OK"}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/health'
+    try:
+        transport = HTTPTransport(pool_size=2, max_idle_seconds=60)
+        for _ in range(3):
+            assert transport.get(url).json()['status'] == 'OK'
+        host_stats = next(iter(transport.stats()['hosts'].values()))
+        assert host_stats['connections_opened'] == 1
+        assert host_stats['requests'] == 3
+
+        transport.max_idle_seconds = 0
+        transport.get(url)
+        assert transport.stats()['idle_resets'] == 1
+        transport.close()
+    finally:
+        server.shutdown()
+
+
+def test_encryption_client_batches(monkeypatch):
+    """Testa divisão em lotes e resultados posicionais do EncryptionClient"""
+    from config import Config
+    monkeypatch.setattr(Config, 'ENCRYPTION_BATCH_SIZE', 2)
+    requests_sent = []
+
+    def fake_post(url, json):
+        requests_sent.append(json['passwords'])
+        return FakeResponse(200, {'results': [
+            {'encrypted_password': f'enc:{p}'} if p else {'error': 'Texto não pode ser vazio'}
+            for p in json['passwords']
+        ]})
+
+    client = EncryptionClient('http://encryption', transport=FakeTransport(fake_post))
+    assert client.encrypt_many(['a', '', 'c']) == ['enc:a', None, 'enc:c']
+    assert requests_sent == [['a', ''], ['c']]
+
+
+def test_embedded_encryption_backend(tmp_path, monkeypatch):
+    """Testa seleção e funcionamento do backend de criptografia em processo"""
+    from config import Config
+    monkeypatch.setattr(Config, 'ENCRYPTION_BACKEND', 'embedded')
+    monkeypatch.setattr(Config, 'EMBEDDED_ENCRYPTION_KEY_PATH', str(tmp_path / 'key.key'))
+
+    client = create_encryption_client()
+    assert isinstance(client, EmbeddedEncryptionClient)
+
+    encrypted = client.encrypt('segredo')
+    assert encrypted and encrypted != 'segredo'
+    assert client.decrypt(encrypted) == 'segredo'
+    assert client.decrypt('invalid') is None
+    assert client.decrypt_many(client.encrypt_many(['a', 'b'])) == ['a', 'b']
+
+    data_key = client.generate_data_key()
+    encrypted = client.encrypt_many(['x', 'y'], data_key)
+    assert client.decrypt_many(encrypted, data_key) == ['x', 'y']
+    assert client.decrypt(encrypted[0]) is None
+
+
+
+def test_inprocess_backends(tmp_path, monkeypatch):
+    """Testa os backends 'inprocess' do modo monolito (sem HTTP)"""
+    from config import Config
+    from shared import inprocess
+
+    def fake_verify(token):
+        if token == 'good-token':
+            return {'valid': True, 'user_id': 4}, 200
+        return None, 401
+
+    def no_http(url, **kwargs):
+        raise AssertionError('não deveria usar HTTP')
+
+    service = load_encryption_module().EncryptionService(str(tmp_path / 'key.key'))
+    inprocess.register(inprocess.AUTH_VERIFY, fake_verify)
+    inprocess.register(inprocess.ENCRYPTION_SERVICE, service)
+    try:
+        client = AuthClient(verify_mode='inprocess', transport=FakeTransport(no_http))
+        assert client.verify_token('good-token')['user_id'] == 4
+        assert client.verify_token('bad-token') is None
+
+        monkeypatch.setattr(Config, 'ENCRYPTION_BACKEND', 'inprocess')
+        encryption = create_encryption_client()
+        assert encryption.service is service
+        assert encryption.decrypt(encryption.encrypt('segredo')) == 'segredo'
+    finally:
+        inprocess.unregister(inprocess.AUTH_VERIFY)
+        inprocess.unregister(inprocess.ENCRYPTION_SERVICE)
+
+    with pytest.raises(LookupError):
+        AuthClient(verify_mode='inprocess')
+
+
+def test_reencryption_job_after_key_rotation(client, tmp_path):
+    """Testa o job de re-criptografia: chaves re-embrulhadas e checkpoint retomável"""
+    from utils.reencryption import ReencryptionJob
+    key_path = str(tmp_path / 'key.key')
+    old_client = EmbeddedEncryptionClient(key_path)
+
+    data_key = password_repo.save_user_data_key(1, old_client.generate_data_key())
+    enveloped = old_client.encrypt('envelope', data_key)
+    master = old_client.encrypt('legado')
+    first = password_repo.create_password(1, 'a.com', 'alice', enveloped)
+    second = password_repo.create_password(1, 'b.com', 'bob', master)
+
+    module = load_encryption_module()
+    new_kid = module.rotate_key_file(key_path)
+    new_client = EmbeddedEncryptionClient(key_path)
+
+    sleeps = []
+    job = ReencryptionJob(password_repo, new_client, rows_per_second=1000,
+                          batch_size=1, sleep=sleeps.append)
+    job.reset()
+    assert job.run(max_batches=2)['finished'] is False
+    assert password_repo.get_checkpoint(job.keys_checkpoint) == 1
+    assert password_repo.get_checkpoint(job.passwords_checkpoint) == first
+
+    result = job.run()
+    assert result['finished'] is True
+    assert result['keys_rewrapped'] == 1
+    assert result['rows_reencrypted'] == 1
+    assert password_repo.get_checkpoint(job.passwords_checkpoint) == second
+
+    new_key = password_repo.get_user_data_key(1)
+    assert new_key.startswith(f'k2:{new_kid}:')
+    stored = {p.id: p.encrypted_text for p in password_repo.get_all_passwords(1)}
+    assert stored[first] == enveloped
+    assert new_client.decrypt(stored[first], new_key) == 'envelope'
+    assert new_client.decrypt(stored[second], new_key) == 'legado'
+    assert new_client.reencrypt_many(list(stored.values()), new_key) == [None, None]
+
+
+def test_blob_ciphertext_storage_and_migration(client):
+    """Testa armazenamento em BLOB, codificação na API e migração TEXT -> BLOB"""
+    from models.password import PasswordRepository
+    from shared.ciphertext_codec import decode_ciphertext, encode_ciphertext
+    ciphertext = 'dk2:' + 'A' * 60
+    assert decode_ciphertext(encode_ciphertext(ciphertext)) == ciphertext
+    assert len(encode_ciphertext(ciphertext)) < len(ciphertext)
+    assert decode_ciphertext(encode_ciphertext('enc:x:y')) == 'enc:x:y'
+
+    text_repo = PasswordRepository(password_repo.database_path, ciphertext_storage='text')
+    blob_repo = PasswordRepository(password_repo.database_path, ciphertext_storage='blob')
+    old_id = text_repo.create_password(1, 'old.com', 'alice', ciphertext)
+    new_id = blob_repo.create_password(1, 'new.com', 'alice', ciphertext)
+
+    def storage_types():
+        conn = password_repo.pool.get_connection()
+        return dict(conn.execute('SELECT id, typeof(encrypted_password) FROM passwords').fetchall())
+
+    assert storage_types() == {old_id: 'text', new_id: 'blob'}
+    # Leitura aceita os dois formatos durante a migração
+    assert {p.encrypted_text for p in blob_repo.get_all_passwords(1)} == {ciphertext}
+
+    assert blob_repo.migrate_ciphertext_storage(batch_size=1) == 1
+    assert storage_types() == {old_id: 'blob', new_id: 'blob'}
+    assert blob_repo.migrate_ciphertext_storage() == 0
+
+    # Texto criptografado só aparece na listagem quando solicitado
+    response = client.get('/passwords', headers=AUTH_HEADER)
+    assert 'encrypted_password' not in json.loads(response.data)['passwords'][0]
+    response = client.get('/passwords?include_ciphertext=true', headers=AUTH_HEADER)
+    assert json.loads(response.data)['passwords'][0]['encrypted_password'] == ciphertext
+
+
+def test_list_passwords_keyset_pagination(client, monkeypatch):
+    """Testa paginação por cursor ordenada por (site, username, id)"""
+    from config import Config
+    monkeypatch.setattr(Config, 'PAGE_SIZE_MAX', 3)
+    for site in ('c.com', 'a.com', 'b.com'):
+        for username in ('bob', 'alice'):
+            assert create_entry(client, site=site, username=username).status_code == 201
+
+    seen, cursor = [], None
+    while True:
+        url = '/passwords?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        data = json.loads(client.get(url, headers=AUTH_HEADER).data)
+        assert data['count'] == len(data['passwords']) <= 2
+        seen.extend((p['site'], p['username']) for p in data['passwords'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert seen == sorted((s, u) for s in ('a.com', 'b.com', 'c.com') for u in ('alice', 'bob'))
+
+    # Limite do servidor e parâmetros inválidos
+    data = json.loads(client.get('/passwords?limit=1000', headers=AUTH_HEADER).data)
+    assert data['limit'] == 3 and data['count'] == 3 and data['next_cursor']
+    assert client.get('/passwords?limit=0', headers=AUTH_HEADER).status_code == 400
+    assert client.get('/passwords?cursor=lixo', headers=AUTH_HEADER).status_code == 400
+
+
+def test_search_passwords(client):
+    """Testa busca por substring/prefixo com índice FTS5 sincronizado por triggers"""
+    for site, username in (('github.com', 'alice'), ('mail.google.com', 'alice.work'),
+                           ('gitlab.com', 'bob'), ('bank.com', 'carol_git')):
+        assert create_entry(client, site=site, username=username).status_code == 201
+    password_repo.create_password(2, 'github.com', 'intruder', 'enc')
+
+    def search(query, **params):
+        params['q'] = query
+        query_string = '&'.join(f'{k}={v}' for k, v in params.items())
+        response = client.get(f'/passwords/search?{query_string}', headers=AUTH_HEADER)
+        return json.loads(response.data)
+
+    # Substring em site e username; prefixo do site primeiro; só do usuário
+    data = search('git')
+    assert {p['site'] for p in data['passwords'][:2]} == {'github.com', 'gitlab.com'}
+    assert {p['username'] for p in data['passwords']} == {'alice', 'bob', 'carol_git'}
+    assert [p['site'] for p in search('GOOGLE')['passwords']] == ['mail.google.com']
+    assert [p['username'] for p in search('ali')['passwords']] == ['alice', 'alice.work']
+    # Consultas curtas usam prefixo
+    assert [p['site'] for p in search('ba')['passwords']] == ['bank.com']
+
+    # Paginação ranqueada
+    first = search('git', limit=2)
+    second = search('git', limit=2, cursor=first['next_cursor'])
+    assert first['count'] == 2 and second['count'] == 1 and second['next_cursor'] is None
+
+    # Triggers acompanham atualização e remoção
+    entry_id = first['passwords'][0]['id']
+    client.put(f'/passwords/{entry_id}',
+               data=json.dumps({'site': 'example.org', 'username': 'alice', 'password': 'x'}),
+               content_type='application/json', headers=AUTH_HEADER)
+    assert 'example.org' in [p['site'] for p in search('example')['passwords']]
+    client.delete(f'/passwords/{entry_id}', headers=AUTH_HEADER)
+    assert search('example')['count'] == 0
+
+    assert client.get('/passwords/search', headers=AUTH_HEADER).status_code == 400
+
+
+def test_vault_version_etag(client, monkeypatch):
+    """Testa ETag por versão do cofre e 304 sem acessar senhas nem criptografia"""
+    password_id = json.loads(create_entry(client).data)['id']
+    version = password_repo.get_vault_version(1)
+    assert version >= 1
+
+    response = client.get('/passwords', headers=AUTH_HEADER)
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and etag.startswith(f'W/"1.{version}.')
+    detail = client.get(f'/passwords/{password_id}', headers=AUTH_HEADER)
+    detail_etag = detail.headers['ETag']
+    assert detail_etag == f'W/"1.{version}"'
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError('não deveria ser chamado')
+
+    with monkeypatch.context() as patched:
+        patched.setattr(password_repo, 'get_passwords_page', forbidden)
+        patched.setattr(password_routes.password_repo, 'get_passwords_page', forbidden)
+        patched.setattr(password_routes.encryption_client, 'decrypt', forbidden)
+        conditional = dict(AUTH_HEADER, **{'If-None-Match': etag})
+        assert client.get('/passwords', headers=conditional).status_code == 304
+        detail_conditional = dict(AUTH_HEADER, **{'If-None-Match': detail_etag})
+        assert client.get(f'/passwords/{password_id}', headers=detail_conditional).status_code == 304
+        # O ETag é do cofre: uma senha inexistente continua sendo 404
+        assert client.get(f'/passwords/{password_id + 1000}',
+                          headers=detail_conditional).status_code == 404
+
+    # Cada página e cada formato tem o seu ETag
+    create_entry(client, site='zeta.com')
+    first_page = client.get('/passwords?limit=1', headers=AUTH_HEADER)
+    cursor = json.loads(first_page.data)['next_cursor']
+    conditional = dict(AUTH_HEADER, **{'If-None-Match': first_page.headers['ETag']})
+    assert client.get('/passwords?limit=1', headers=conditional).status_code == 304
+    assert client.get(f'/passwords?limit=1&cursor={cursor}', headers=conditional).status_code == 200
+    assert client.get('/passwords?limit=2', headers=conditional).status_code == 200
+    assert client.get('/passwords?limit=1&include_ciphertext=true',
+                      headers=conditional).status_code == 200
+    streamed = client.get('/passwords?stream=1', headers=AUTH_HEADER)
+    streamed.get_data()
+    assert streamed.headers['Vary'] == 'Accept'
+    ndjson = dict(AUTH_HEADER, **{'If-None-Match': streamed.headers['ETag'],
+                                  'Accept': 'application/x-ndjson'})
+    response = client.get('/passwords?stream=1', headers=ndjson)
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    response.get_data()
+    assert 'Vary' not in first_page.headers
+    version = password_repo.get_vault_version(1)
+
+    # Toda escrita incrementa a versão e invalida o ETag
+    client.put(f'/passwords/{password_id}',
+               data=json.dumps({'site': 'example.com', 'username': 'alice', 'password': 'novo'}),
+               content_type='application/json', headers=AUTH_HEADER)
+    assert password_repo.get_vault_version(1) == version + 1
+    client.delete(f'/passwords/{password_id}', headers=AUTH_HEADER)
+    assert password_repo.get_vault_version(1) == version + 2
+    response = client.get('/passwords', headers=dict(AUTH_HEADER, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+
+
+def test_import_passwords_streaming(client, monkeypatch):
+    """Testa importação CSV/NDJSON em lotes com os modos de conflito"""
+    from config import Config
+    batches = []
+
+    def fake_encrypt_many(passwords, data_key=None):
+        batches.append(len(passwords))
+        return [f'enc:{data_key}:{p}' for p in passwords]
+
+    monkeypatch.setattr(password_routes.encryption_client, 'encrypt_many', fake_encrypt_many)
+    monkeypatch.setattr(Config, 'IMPORT_CHUNK_SIZE', 2)
+    assert create_entry(client, site='existing.com', username='alice').status_code == 201
+
+    def import_body(body, content_type, **params):
+        query_string = '&'.join(f'{k}={v}' for k, v in params.items())
+        response = client.post(f'/passwords/import?{query_string}', data=body,
+                               content_type=content_type, headers=AUTH_HEADER)
+        return response.status_code, json.loads(response.data)
+
+    csv_body = ('\ufeffname,url,username,password\n'
+                'GitHub,github.com,alice,"s3,cret"\n'
+                'x,existing.com,alice,novo\n'
+                'x,mail.com,bob,\n'
+                'x,bank.com,carol,pw\n').encode()
+    status, summary = import_body(csv_body, 'text/csv')
+    assert status == 200
+    assert (summary['created'], summary['skipped'], summary['failed']) == (2, 1, 1)
+    assert [row['line'] for row in summary['rows']] == [3, 4]
+    assert batches == [1, 1]  # o existente não é cifrado
+
+    entries = {(p.site, p.username): p.encrypted_text for p in password_repo.get_all_passwords(1)}
+    assert entries[('github.com', 'alice')] == 'enc:wrapped-key:s3,cret'
+    assert entries[('existing.com', 'alice')] == 'enc:wrapped-key:secret123'
+
+    ndjson_body = '\n'.join([
+        json.dumps({'site': 'existing.com', 'username': 'alice', 'password': 'novo'}),
+        'não é json',
+        json.dumps({'site': 'new.com', 'username': 'dave', 'password': 'x'}),
+    ]).encode()
+    status, summary = import_body(ndjson_body, 'application/x-ndjson', on_conflict='overwrite')
+    assert status == 200
+    assert (summary['created'], summary['updated'], summary['failed']) == (1, 1, 1)
+    assert password_repo.get_password_by_id(
+        next(p.id for p in password_repo.get_all_passwords(1) if p.site == 'existing.com'), 1
+    ).encrypted_text == 'enc:wrapped-key:novo'
+
+    status, summary = import_body(ndjson_body, 'application/x-ndjson', on_conflict='fail')
+    assert status == 409 and summary['aborted']
+    status, _ = import_body(b'', 'text/csv', on_conflict='merge')
+    assert status == 400
+
+
+def test_streaming_list_and_export(client, monkeypatch):
+    """Testa listagem em streaming (JSON/NDJSON) e exportação com senhas em lotes"""
+    from config import Config
+    monkeypatch.setattr(Config, 'STREAM_BATCH_SIZE', 2)
+    decrypt_batches = []
+
+    def fake_decrypt_many(encrypted_passwords, data_key=None):
+        decrypt_batches.append(len(encrypted_passwords))
+        return [e.split(':', 2)[2] for e in encrypted_passwords]
+
+    monkeypatch.setattr(password_routes.encryption_client, 'decrypt_many', fake_decrypt_many)
+    for site in ('c.com', 'a.com', 'b.com'):
+        create_entry(client, site=site, password=f'pw-{site}')
+
+    response = client.get('/passwords?stream=1', headers=AUTH_HEADER)
+    assert response.is_streamed and response.headers['ETag']
+    data = json.loads(response.get_data())
+    assert data['count'] == 3
+    assert [p['site'] for p in data['passwords']] == ['a.com', 'b.com', 'c.com']
+
+    response = client.get('/passwords?stream=1&format=ndjson', headers=AUTH_HEADER)
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [p['site'] for p in lines] == ['a.com', 'b.com', 'c.com']
+
+    response = client.get('/passwords/export?decrypt=true', headers=AUTH_HEADER)
+    assert response.headers['Cache-Control'] == 'no-store'
+    exported = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(e['site'], e['password']) for e in exported] == [
+        ('a.com', 'pw-a.com'), ('b.com', 'pw-b.com'), ('c.com', 'pw-c.com')
+    ]
+    assert decrypt_batches == [2, 1]
+
+    response = client.get('/passwords/export', headers=AUTH_HEADER)
+    exported = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert 'password' not in exported[0] and exported[0]['encrypted_password']
+
+
+def test_patch_password(client, monkeypatch):
+    """Testa atualização parcial: renomear não chama a criptografia"""
+    password_id = json.loads(create_entry(client).data)['id']
+    create_entry(client, site='other.com')
+    encrypt_calls = []
+    original_encrypt = password_routes.encryption_client.encrypt
+
+    def counting_encrypt(password, data_key=None):
+        encrypt_calls.append(password)
+        return original_encrypt(password, data_key)
+
+    monkeypatch.setattr(password_routes.encryption_client, 'encrypt', counting_encrypt)
+
+    def patch(entry_id, body):
+        return client.patch(f'/passwords/{entry_id}', data=json.dumps(body),
+                            content_type='application/json', headers=AUTH_HEADER)
+
+    assert patch(password_id, {'site': 'renamed.com'}).status_code == 200
+    assert encrypt_calls == []
+    data = json.loads(client.get(f'/passwords/{password_id}', headers=AUTH_HEADER).data)
+    assert (data['site'], data['username'], data['password']) == ('renamed.com', 'alice', 'secret123')
+
+    assert patch(password_id, {'password': 'nova'}).status_code == 200
+    assert encrypt_calls == ['nova']
+    data = json.loads(client.get(f'/passwords/{password_id}', headers=AUTH_HEADER).data)
+    assert (data['site'], data['password']) == ('renamed.com', 'nova')
+
+    assert patch(password_id, {'site': 'other.com'}).status_code == 400
+    assert patch(password_id, {'site': ''}).status_code == 400
+    assert patch(password_id, {'notes': 'x'}).status_code == 400
+    assert patch(99999, {'site': 'x.com'}).status_code == 404
+
+
+def test_reveal_passwords_batch(client, monkeypatch):
+    """Testa revelação em lote: uma consulta, um lote de decriptação"""
+    from config import Config
+    decrypt_batches = []
+
+    def fake_decrypt_many(encrypted_passwords, data_key=None):
+        decrypt_batches.append(len(encrypted_passwords))
+        return [e.split(':', 2)[2] for e in encrypted_passwords]
+
+    monkeypatch.setattr(password_routes.encryption_client, 'decrypt_many', fake_decrypt_many)
+    monkeypatch.setattr(Config, 'REVEAL_MAX_BATCH', 3)
+    ids = [json.loads(create_entry(client, site=f's{i}.com', password=f'pw{i}').data)['id']
+           for i in range(3)]
+    foreign_id = password_repo.create_password(2, 'x.com', 'mallory', 'enc:k:segredo')
+
+    def reveal(body):
+        return client.post('/passwords/reveal', data=json.dumps(body),
+                           content_type='application/json', headers=AUTH_HEADER)
+
+    response = reveal({'ids': [ids[2], ids[0], foreign_id, ids[2]]})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [(p['id'], p['password']) for p in data['passwords']] == [(ids[2], 'pw2'), (ids[0], 'pw0')]
+    assert data['not_found'] == [foreign_id]
+    assert decrypt_batches == [2]
+
+    assert reveal({'ids': ids + [foreign_id]}).status_code == 413
+    assert reveal({'ids': []}).status_code == 400
+    assert reveal({'ids': ['1']}).status_code == 400
+
+
+def test_async_app_routes(monkeypatch):
+    """Testa o modo ASGI: CRUD, ETag, revelação e exportação com clientes assíncronos simulados"""
+    pytest.importorskip('quart')
+    import asyncio
+    import jwt
+    import async_app
+    from routes import async_password_routes as routes
+
+    secret = 'k' * 32
+    token = jwt.encode({'user_id': 1}, secret, algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+
+    async def fake_verify_remote(token):
+        try:
+            return dict(jwt.decode(token, secret, algorithms=['HS256']), valid=True), True
+        except jwt.InvalidTokenError:
+            return None, True
+
+    encrypted = []
+
+    async def fake_encrypt(password, data_key=None):
+        encrypted.append(password)
+        return f'enc:{data_key}:{password}'
+
+    async def fake_decrypt_many(encrypted_passwords, data_key=None):
+        return [e.split(':', 2)[2] for e in encrypted_passwords]
+
+    async def fake_decrypt(encrypted_password, data_key=None):
+        return (await fake_decrypt_many([encrypted_password], data_key))[0]
+
+    async def fake_generate_data_key():
+        return 'wrapped-key'
+
+    monkeypatch.setattr(routes.auth_client, '_verify_remote', fake_verify_remote)
+    monkeypatch.setattr(routes.encryption_client, 'encrypt', fake_encrypt)
+    monkeypatch.setattr(routes.encryption_client, 'decrypt', fake_decrypt)
+    monkeypatch.setattr(routes.encryption_client, 'decrypt_many', fake_decrypt_many)
+    monkeypatch.setattr(routes.encryption_client, 'generate_data_key', fake_generate_data_key)
+    from shared.rate_limit import MemoryBucketStore, RateLimitPolicy
+    monkeypatch.setattr(routes.rate_limiter, 'policies',
+                        {'async_password.reveal_passwords': [RateLimitPolicy('user', 2, 60)]})
+    monkeypatch.setattr(routes.rate_limiter, 'store', MemoryBucketStore())
+
+    init_db()
+    conn = password_repo.pool.get_connection()
+    conn.execute('DELETE FROM passwords')
+    conn.execute('DELETE FROM user_keys')
+    conn.commit()
+    foreign_id = password_repo.create_password(2, 'x.com', 'mallory', 'enc:k:segredo')
+
+    async def scenario():
+        client = async_app.app.test_client()
+        response = await client.post('/passwords', headers=headers,
+                                     json={'site': 'a.com', 'username': 'ana', 'password': 'pw1'})
+        assert response.status_code == 201
+        password_id = (await response.get_json())['id']
+        assert password_repo.get_user_data_key(1) == 'wrapped-key'
+
+        response = await client.get(f'/passwords/{password_id}', headers=headers)
+        assert (await response.get_json())['password'] == 'pw1'
+        etag = response.headers['ETag']
+        response = await client.get(f'/passwords/{password_id}',
+                                    headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 304
+        response = await client.get(f'/passwords/{foreign_id}', headers=headers)
+        assert response.status_code == 404
+
+        response = await client.patch(f'/passwords/{password_id}', headers=headers,
+                                      json={'password': 'pw2'})
+        assert response.status_code == 200
+        response = await client.post('/passwords/reveal', headers=headers,
+                                     json={'ids': [password_id, foreign_id]})
+        data = await response.get_json()
+        assert [p['password'] for p in data['passwords']] == ['pw2']
+        assert data['not_found'] == [foreign_id]
+        response = await client.post('/passwords/reveal', headers=headers, json={'ids': [password_id]})
+        assert response.status_code == 200
+        response = await client.post('/passwords/reveal', headers=headers, json={'ids': [password_id]})
+        assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+
+        # Token forjado em nome do usuário 1: nada é enviado ao /encrypt
+        forged = jwt.encode({'user_id': 1}, 'x' * 32, algorithm='HS256')
+        calls = len(encrypted)
+        response = await client.post('/passwords', headers={'Authorization': f'Bearer {forged}'},
+                                     json={'site': 'b.com', 'username': 'ana', 'password': 'pw3'})
+        assert response.status_code == 401
+        assert len(encrypted) == calls
+
+        response = await client.get('/passwords', headers=headers)
+        assert [p['site'] for p in (await response.get_json())['passwords']] == ['a.com']
+        conditional = dict(headers, **{'If-None-Match': response.headers['ETag']})
+        response = await client.get('/passwords', headers=conditional)
+        assert response.status_code == 304
+        response = await client.get('/passwords?limit=1', headers=conditional)
+        assert response.status_code == 200
+        response = await client.get('/passwords?stream=1', headers=conditional)
+        assert response.status_code == 200 and response.headers['Vary'] == 'Accept'
+        await response.get_data()
+        response = await client.get('/passwords/export?decrypt=true', headers=headers)
+        assert json.loads(await response.get_data(as_text=True))['password'] == 'pw2'
+
+        response = await client.get('/passwords', headers={'Authorization': 'Bearer forged'})
+        assert response.status_code == 401
+        response = await client.delete(f'/passwords/{password_id}', headers=headers)
+        assert response.status_code == 200
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_per_user_shared_store(client, tmp_path, monkeypatch):
+    """Testa limite por usuário com buckets compartilhados entre réplicas"""
+    from shared.rate_limit import RateLimitPolicy, SQLiteBucketStore
+    from shared.sqlite_pool import SQLiteConnectionPool
+    policies = {'password.reveal_passwords': [RateLimitPolicy('user', 2, 60)]}
+    database = str(tmp_path / 'rate_limits.db')
+    monkeypatch.setattr(password_routes.rate_limiter, 'policies', policies)
+    monkeypatch.setattr(password_routes.rate_limiter, 'store',
+                        SQLiteBucketStore(SQLiteConnectionPool(database)))
+    monkeypatch.setattr(password_routes.encryption_client, 'decrypt_many', lambda items, data_key=None: [])
+
+    def reveal():
+        return client.post('/passwords/reveal', data=json.dumps({'ids': [1]}),
+                           content_type='application/json', headers=AUTH_HEADER)
+
+    assert reveal().status_code == 200
+    assert reveal().status_code == 200
+    response = reveal()
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 30
+    # Rotas sem política não são afetadas
+    assert client.get('/passwords', headers=AUTH_HEADER).status_code == 200
+
+    # Outra réplica com o mesmo arquivo enxerga o bucket esgotado
+    replica_store = SQLiteBucketStore(SQLiteConnectionPool(database))
+    allowed, retry_after, _ = replica_store.consume('password.reveal_passwords:0:user:1', 2 / 60, 2)
+    assert not allowed and retry_after > 0
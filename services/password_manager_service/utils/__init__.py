@@ -2,7 +2,13 @@
 Utils do Password Manager Service
 """
 from .auth_client import AuthClient
-from .encryption_client import EncryptionClient
+from .encryption_client import EncryptionClient, create_encryption_client
+from .embedded_encryption import EmbeddedEncryptionClient
+from .token_verifier import LocalTokenVerifier
+from .reencryption import ReencryptionJob
+from .async_clients import AsyncAuthClient, AsyncEncryptionClient, create_async_encryption_client
 
-__all__ = ['AuthClient', 'EncryptionClient']
+__all__ = ['AuthClient', 'EncryptionClient', 'create_encryption_client',
+           'EmbeddedEncryptionClient', 'LocalTokenVerifier', 'ReencryptionJob',
+           'AsyncAuthClient', 'AsyncEncryptionClient', 'create_async_encryption_client']
 
@@ -0,0 +1,255 @@
+"""
+Clientes assíncronos do Auth Service e do Encryption Service (modo ASGI)
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import jwt
+
+from config import Config
+from utils.async_transport import AsyncTransport, get_async_transport, httpx
+from utils.auth_client import AuthClient
+from utils.encryption_client import create_encryption_client
+
+T = TypeVar('T')
+
+# Erros de rede do httpx (nenhum se o pacote não estiver instalado)
+_HTTP_ERRORS = (httpx.HTTPError,) if httpx is not None else ()
+
+
+def _discard(task: Optional['asyncio.Future']):
+    """Cancela uma tarefa especulativa cujo resultado não será usado"""
+    if task is None:
+        return
+    task.cancel()
+    # Evita o aviso de exceção nunca recuperada se a tarefa já tiver falhado
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class AsyncAuthClient:
+    """
+    Verificação de tokens sem bloquear o event loop
+
+    Usa o mesmo cache (e o mesmo verificador local EdDSA) do ``AuthClient``
+    síncrono; só a chamada ao endpoint /verify passa a ser assíncrona.
+    """
+
+    def __init__(self, auth_client: Optional[AuthClient] = None,
+                 transport: Optional[AsyncTransport] = None):
+        self.sync_client = auth_client or AuthClient()
+        self.auth_service_url = self.sync_client.auth_service_url
+        self.transport = transport or get_async_transport()
+
+    async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verifica um token JWT (mesmas regras de cache de ``AuthClient``)
+
+        Args:
+            token: Token JWT a ser verificado
+
+        Returns:
+            Dicionário com dados do usuário se válido, None caso contrário
+        """
+        hit, user_data = self.sync_client._cache_lookup(token)
+        if hit:
+            return user_data
+
+        if self.sync_client.verifies_in_process(token):
+            # Pode buscar o JWKS ou consultar o banco: roda fora do event loop
+            user_data, definitive = await asyncio.to_thread(self.sync_client._verify_uncached, token)
+        else:
+            user_data, definitive = await self._verify_remote(token)
+        self.sync_client._cache_store(token, user_data, definitive)
+        return user_data
+
+    async def _verify_remote(self, token: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Verifica o token com o endpoint /verify do Auth Service"""
+        try:
+            response = await self.transport.post(
+                f'{self.auth_service_url}/verify',
+                json={'token': token}
+            )
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('valid'):
+                    return data, True
+            return None, response.status_code in (401, 404)
+        except _HTTP_ERRORS:
+            return None, False
+
+    @staticmethod
+    def claimed_user_id(token: str) -> Optional[int]:
+        """ID do usuário declarado no token, ainda sem verificar a assinatura"""
+        try:
+            user_id = jwt.decode(token, options={'verify_signature': False}).get('user_id')
+        except jwt.InvalidTokenError:
+            return None
+        return user_id if isinstance(user_id, int) else None
+
+    async def verify_with(self, token: str,
+                          work: Callable[[int], Awaitable[T]]) -> Tuple[Optional[int], Optional[T]]:
+        """
+        Verifica o token enquanto ``work`` já executa para o usuário do token
+
+        ``work`` recebe o ``user_id`` declarado no token e roda em paralelo
+        com a verificação. Se o token for inválido o resultado é descartado;
+        se o usuário verificado for outro, ``work`` é repetido para ele. Por
+        isso ``work`` não pode ter efeitos colaterais e deve se limitar a
+        leituras locais: o ``user_id`` ainda não foi verificado, então chamadas
+        a outros serviços (ex.: /encrypt) feitas aqui poderiam ser disparadas
+        em nome de qualquer usuário por tokens forjados. Escritas e chamadas
+        remotas só acontecem depois desta chamada.
+
+        Args:
+            token: Token JWT
+            work: Corrotina a executar para o usuário
+
+        Returns:
+            Tupla (user_id, resultado de work); (None, None) se o token for inválido
+        """
+        claimed = None
+        if not self.sync_client._cache_lookup(token)[0]:
+            claimed = self.claimed_user_id(token)
+        task = asyncio.ensure_future(work(claimed)) if claimed is not None else None
+        try:
+            user_data = await self.verify_token(token)
+        except BaseException:
+            _discard(task)
+            raise
+
+        if not user_data:
+            _discard(task)
+            return None, None
+        user_id = user_data['user_id']
+        if task is None or user_id != claimed:
+            _discard(task)
+            return user_id, await work(user_id)
+        return user_id, await task
+
+    def invalidate_token(self, token: str) -> bool:
+        """Remove um token do cache (logout, revogação)"""
+        return self.sync_client.invalidate_token(token)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Retorna estatísticas do cache de tokens"""
+        return self.sync_client.cache_stats()
+
+
+class AsyncEncryptionClient:
+    """Cliente assíncrono para criptografia/descriptografia com o Encryption Service"""
+
+    def __init__(self, encryption_service_url: str = None,
+                 transport: Optional[AsyncTransport] = None):
+        self.encryption_service_url = encryption_service_url or Config.ENCRYPTION_SERVICE_URL
+        self.transport = transport or get_async_transport()
+
+    @staticmethod
+    def _with_data_key(payload: Dict[str, Any], data_key: Optional[str]) -> Dict[str, Any]:
+        """Inclui a chave de dados embrulhada no corpo, quando houver"""
+        if data_key:
+            payload['data_key'] = data_key
+        return payload
+
+    async def _post(self, endpoint: str, payload: Optional[Dict[str, Any]],
+                    expected_status: int = 200) -> Optional[Dict[str, Any]]:
+        """Envia um POST e retorna o corpo JSON, ou None em caso de erro"""
+        try:
+            response = await self.transport.post(
+                f'{self.encryption_service_url}/{endpoint}', json=payload
+            )
+            if response.status_code == expected_status:
+                return response.json()
+        except _HTTP_ERRORS + (ValueError,):
+            pass
+        return None
+
+    async def generate_data_key(self) -> Optional[str]:
+        """Gera uma chave de dados embrulhada para um novo usuário"""
+        data = await self._post('keys/generate', None, expected_status=201)
+        return data.get('data_key') if data else None
+
+    async def encrypt(self, password: str, data_key: Optional[str] = None) -> Optional[str]:
+        """Criptografa uma senha (None em caso de erro)"""
+        data = await self._post('encrypt', self._with_data_key({'password': password}, data_key))
+        return data.get('encrypted_password') if data else None
+
+    async def decrypt(self, encrypted_password: str,
+                      data_key: Optional[str] = None) -> Optional[str]:
+        """Descriptografa uma senha (None em caso de erro)"""
+        data = await self._post(
+            'decrypt',
+            self._with_data_key({'encrypted_password': encrypted_password}, data_key)
+        )
+        return data.get('password') if data else None
+
+    async def _post_batch(self, endpoint: str, field: str, result_field: str,
+                          items: List[str], data_key: Optional[str]) -> List[Optional[str]]:
+        """Envia os lotes de até ENCRYPTION_BATCH_SIZE itens ao mesmo tempo"""
+        batch_size = max(1, Config.ENCRYPTION_BATCH_SIZE)
+        chunks = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+        responses = await asyncio.gather(*(
+            self._post(endpoint, self._with_data_key({field: chunk}, data_key))
+            for chunk in chunks
+        ))
+        results: List[Optional[str]] = []
+        for chunk, data in zip(chunks, responses):
+            try:
+                results.extend(item.get(result_field) for item in data['results'])
+            except (TypeError, KeyError):
+                results.extend([None] * len(chunk))
+        return results
+
+    async def encrypt_many(self, passwords: List[str],
+                           data_key: Optional[str] = None) -> List[Optional[str]]:
+        """Criptografa várias senhas (lista posicional, None nos itens com erro)"""
+        return await self._post_batch('encrypt/batch', 'passwords', 'encrypted_password',
+                                      passwords, data_key)
+
+    async def decrypt_many(self, encrypted_passwords: List[str],
+                           data_key: Optional[str] = None) -> List[Optional[str]]:
+        """Descriptografa várias senhas (lista posicional, None nos itens com erro)"""
+        return await self._post_batch('decrypt/batch', 'encrypted_passwords', 'password',
+                                      encrypted_passwords, data_key)
+
+
+class ThreadedEncryptionClient:
+    """
+    Interface assíncrona sobre um cliente de criptografia síncrono
+
+    Usado com o backend embutido: a criptografia roda em processo e consome
+    CPU, então cada chamada vai para uma thread em vez de ocupar o event loop.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def generate_data_key(self) -> Optional[str]:
+        return await asyncio.to_thread(self.client.generate_data_key)
+
+    async def encrypt(self, password: str, data_key: Optional[str] = None) -> Optional[str]:
+        return await asyncio.to_thread(self.client.encrypt, password, data_key)
+
+    async def decrypt(self, encrypted_password: str,
+                      data_key: Optional[str] = None) -> Optional[str]:
+        return await asyncio.to_thread(self.client.decrypt, encrypted_password, data_key)
+
+    async def encrypt_many(self, passwords: List[str],
+                           data_key: Optional[str] = None) -> List[Optional[str]]:
+        return await asyncio.to_thread(self.client.encrypt_many, passwords, data_key)
+
+    async def decrypt_many(self, encrypted_passwords: List[str],
+                           data_key: Optional[str] = None) -> List[Optional[str]]:
+        return await asyncio.to_thread(self.client.decrypt_many, encrypted_passwords, data_key)
+
+
+def create_async_encryption_client():
+    """
+    Cria o cliente de criptografia assíncrono conforme Config.ENCRYPTION_BACKEND
+
+    Returns:
+        ThreadedEncryptionClient sobre o backend em processo nos modos
+        'embedded' e 'inprocess', AsyncEncryptionClient (HTTP) caso contrário
+    """
+    if Config.ENCRYPTION_BACKEND in ('embedded', 'inprocess'):
+        return ThreadedEncryptionClient(create_encryption_client())
+    return AsyncEncryptionClient()
@@ -0,0 +1,94 @@
+"""
+Transporte HTTP assíncrono (httpx) para o modo ASGI do Password Manager Service
+"""
+from typing import Any, Dict, Optional
+
+from config import Config
+
+try:
+    import httpx
+except ImportError:  # dependência opcional, só exigida pelo modo assíncrono
+    httpx = None
+
+
+class AsyncTransport:
+    """
+    Cliente httpx compartilhado, com conexões keep-alive por destino
+
+    O cliente é criado no primeiro uso, dentro do event loop que atende as
+    requisições, e fechado com ``aclose`` ao encerrar o servidor. Milhares de
+    chamadas em andamento dividem as ``max_connections`` conexões sem ocupar
+    uma thread cada.
+    """
+
+    def __init__(self, max_connections: int = 100, connect_timeout: float = 2.0,
+                 read_timeout: float = 5.0, max_idle_seconds: float = 30.0):
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_idle_seconds = max_idle_seconds
+        self._client: Optional['httpx.AsyncClient'] = None
+        self._requests = 0
+
+    @property
+    def client(self) -> 'httpx.AsyncClient':
+        """Cliente httpx, criado sob demanda"""
+        if self._client is None:
+            if httpx is None:
+                raise RuntimeError('O modo assíncrono requer o pacote httpx (pip install httpx)')
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.max_idle_seconds
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            )
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> 'httpx.Response':
+        """
+        Executa uma requisição HTTP reutilizando conexões do pool
+
+        Args:
+            method: Método HTTP
+            url: URL completa
+            **kwargs: Argumentos aceitos por ``httpx.AsyncClient.request``
+
+        Returns:
+            Resposta HTTP
+        """
+        self._requests += 1
+        return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> 'httpx.Response':
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> 'httpx.Response':
+        return await self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do transporte"""
+        return {'requests': self._requests, 'open': self._client is not None}
+
+    async def aclose(self):
+        """Fecha as conexões (o próximo uso cria um cliente novo)"""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+
+_transport: Optional[AsyncTransport] = None
+
+
+def get_async_transport() -> AsyncTransport:
+    """Obtém o transporte assíncrono configurado para este serviço"""
+    global _transport
+    if _transport is None:
+        _transport = AsyncTransport(
+            max_connections=Config.ASYNC_HTTP_MAX_CONNECTIONS,
+            connect_timeout=Config.HTTP_CONNECT_TIMEOUT,
+            read_timeout=Config.HTTP_READ_TIMEOUT,
+            max_idle_seconds=Config.HTTP_MAX_IDLE_SECONDS
+        )
+    return _transport
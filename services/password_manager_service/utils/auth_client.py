@@ -1,49 +1,174 @@
 """
 Cliente para comunicação com o Auth Service
 """
+import hashlib
+import time
+import jwt
 import requests
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, Optional, Tuple
 from config import Config
+from shared import inprocess
+from shared.http_transport import HTTPTransport
+from shared.ttl_cache import TTLCache
+from utils.token_verifier import LocalTokenVerifier
+from utils.transport import get_service_transport
+
+# Marcador de entrada negativa (token sabidamente inválido) no cache
+_INVALID = object()
 
 
 class AuthClient:
     """Cliente para verificação de tokens com o Auth Service"""
-    
-    def __init__(self, auth_service_url: str = None):
+
+    def __init__(self, auth_service_url: str = None, verify_mode: str = None,
+                 cache: Optional[TTLCache] = None, transport: Optional[HTTPTransport] = None):
         self.auth_service_url = auth_service_url or Config.AUTH_SERVICE_URL
-    
+        self.transport = transport or get_service_transport()
+        self.verify_mode = verify_mode or Config.AUTH_VERIFY_MODE
+        self.local_verifier: Optional[LocalTokenVerifier] = None
+        # Modo monolito: a verificação do Auth Service é chamada diretamente
+        self.inprocess_verify: Optional[Callable[[str], Tuple[Optional[Dict[str, Any]], int]]] = None
+        if self.verify_mode == 'inprocess':
+            self.inprocess_verify = inprocess.resolve(inprocess.AUTH_VERIFY)
+        elif self.verify_mode == 'local':
+            self.local_verifier = LocalTokenVerifier(
+                Config.AUTH_JWKS_URL,
+                min_refresh_interval=Config.AUTH_JWKS_MIN_REFRESH_SECONDS,
+                fetch_jwks=self._fetch_jwks
+            )
+        self.cache = cache or TTLCache(
+            max_size=Config.AUTH_CACHE_MAX_ENTRIES,
+            default_ttl=Config.AUTH_CACHE_TTL_SECONDS
+        )
+        self.negative_ttl = Config.AUTH_CACHE_NEGATIVE_TTL_SECONDS
+
+    @staticmethod
+    def _cache_key(token: str) -> bytes:
+        """Chave do cache: hash do token, para não manter tokens em memória"""
+        return hashlib.sha256(token.encode()).digest()
+
+    def _positive_ttl(self, token: str) -> float:
+        """TTL de uma entrada válida: o menor entre o TTL configurado e o exp do token"""
+        ttl = self.cache.default_ttl
+        try:
+            claims = jwt.decode(token, options={'verify_signature': False})
+        except jwt.InvalidTokenError:
+            return ttl
+        if 'exp' in claims:
+            ttl = min(ttl, float(claims['exp']) - time.time())
+        return ttl
+
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
-        Verifica um token JWT com o Auth Service
-        
+        Verifica um token JWT
+
+        Resultados ficam em cache: tokens válidos até o menor entre o TTL
+        configurado (poucos segundos) e o ``exp`` do token, tokens inválidos
+        por um tempo curto. O TTL é a janela em que um token revogado no Auth
+        Service ainda é aceito por este processo.
+        No modo local, tokens EdDSA são verificados em processo com as chaves
+        públicas do Auth Service; os demais seguem para o endpoint /verify.
+
         Args:
             token: Token JWT a ser verificado
-            
+
         Returns:
             Dicionário com dados do usuário se válido, None caso contrário
         """
+        hit, user_data = self._cache_lookup(token)
+        if hit:
+            return user_data
+
+        user_data, definitive = self._verify_uncached(token)
+        self._cache_store(token, user_data, definitive)
+        return user_data
+
+    def _cache_lookup(self, token: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Consulta o cache; retorna (encontrado, dados_do_usuário)"""
+        cached = self.cache.get(self._cache_key(token))
+        if cached is _INVALID:
+            return True, None
+        if cached is not None:
+            return True, cached
+        return False, None
+
+    def _cache_store(self, token: str, user_data: Optional[Dict[str, Any]], definitive: bool):
+        """Guarda o resultado de uma verificação (negativos só se definitivos)"""
+        key = self._cache_key(token)
+        if user_data:
+            self.cache.set(key, user_data, ttl=self._positive_ttl(token))
+        elif definitive:
+            self.cache.set(key, _INVALID, ttl=self.negative_ttl)
+
+    def _verify_uncached(self, token: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Verifica o token sem consultar o cache
+
+        Returns:
+            Tupla (dados_do_usuário, resultado_definitivo). Falhas de rede não
+            são definitivas e portanto não geram entrada negativa.
+        """
+        if self.inprocess_verify is not None:
+            user_data, status = self.inprocess_verify(token)
+            return user_data, status in (401, 404)
+        if self.local_verifier is not None and self.local_verifier.handles(token):
+            return self.local_verifier.verify(token), True
+        return self._verify_remote(token)
+
+    def verifies_in_process(self, token: str) -> bool:
+        """Indica se o token é verificado sem chamar o Auth Service por HTTP"""
+        if self.inprocess_verify is not None:
+            return True
+        return self.local_verifier is not None and self.local_verifier.handles(token)
+
+    def _fetch_jwks(self, url: str) -> Dict[str, Any]:
+        """Busca o JWKS do Auth Service pelo transporte compartilhado"""
+        response = self.transport.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def _verify_remote(self, token: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Verifica o token com o endpoint /verify do Auth Service"""
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.auth_service_url}/verify',
-                json={'token': token},
-                timeout=5
+                json={'token': token}
             )
-            
+
             if response.status_code == 200:
                 data = response.json()
                 if data.get('valid'):
-                    return data
-            return None
+                    return data, True
+            return None, response.status_code in (401, 404)
         except requests.exceptions.RequestException:
-            return None
-    
+            return None, False
+
+    def invalidate_token(self, token: str) -> bool:
+        """
+        Remove um token do cache (logout, revogação)
+
+        Vale só para este processo: os demais workers e réplicas descartam o
+        token quando a entrada expira (AUTH_CACHE_TTL_SECONDS).
+
+        Args:
+            token: Token JWT a ser invalidado
+
+        Returns:
+            True se o token estava em cache
+        """
+        return self.cache.invalidate(self._cache_key(token))
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Retorna estatísticas do cache de tokens"""
+        return self.cache.stats()
+
     def get_user_id(self, token: str) -> Optional[int]:
         """
         Obtém o ID do usuário a partir do token
-        
+
         Args:
             token: Token JWT
-            
+
         Returns:
             ID do usuário ou None se inválido
         """
@@ -51,4 +176,3 @@ class AuthClient:
         if user_data:
             return user_data.get('user_id')
         return None
-
@@ -0,0 +1,79 @@
+"""
+Backend de criptografia embutido: usa o EncryptionService no próprio processo
+"""
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any, List, Optional
+
+# Módulo de criptografia do Encryption Service (carregado pelo caminho do
+# arquivo, pois os pacotes utils/ e config dos dois serviços têm o mesmo nome)
+ENCRYPTION_MODULE_PATH = (
+    Path(__file__).resolve().parent.parent.parent / 'encryption_service' / 'utils' / 'encryption.py'
+)
+_MODULE_NAME = 'fortress_embedded_encryption'
+
+
+def load_encryption_module() -> ModuleType:
+    """Carrega (uma única vez) o módulo utils/encryption.py do Encryption Service"""
+    module = sys.modules.get(_MODULE_NAME)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(_MODULE_NAME, ENCRYPTION_MODULE_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[_MODULE_NAME] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+class EmbeddedEncryptionClient:
+    """
+    Cliente de criptografia que chama o EncryptionService diretamente
+
+    Oferece a mesma interface do EncryptionClient (HTTP), sem serializar os
+    segredos em JSON nem atravessar a rede. Indicado quando os dois serviços
+    rodam no mesmo host e compartilham o arquivo de chave.
+    """
+
+    def __init__(self, key_path: str = None, service: Any = None):
+        if service is None:
+            module = load_encryption_module()
+            service = module.EncryptionService(key_path)
+        self.service = service
+
+    def generate_data_key(self) -> Optional[str]:
+        """Gera uma chave de dados embrulhada para um novo usuário"""
+        return self.service.generate_data_key()
+
+    def encrypt(self, password: str, data_key: Optional[str] = None) -> Optional[str]:
+        """Criptografa uma senha (None em caso de erro)"""
+        try:
+            return self.service.encrypt(password, data_key)
+        except ValueError:
+            return None
+
+    def decrypt(self, encrypted_password: str, data_key: Optional[str] = None) -> Optional[str]:
+        """Descriptografa uma senha (None em caso de erro)"""
+        try:
+            return self.service.decrypt(encrypted_password, data_key)
+        except ValueError:
+            return None
+
+    def encrypt_many(self, passwords: List[str],
+                     data_key: Optional[str] = None) -> List[Optional[str]]:
+        """Criptografa várias senhas (None nos itens com erro)"""
+        return [value for value, _ in self.service.encrypt_many(passwords, data_key)]
+
+    def decrypt_many(self, encrypted_passwords: List[str],
+                     data_key: Optional[str] = None) -> List[Optional[str]]:
+        """Descriptografa várias senhas (None nos itens com erro)"""
+        return [value for value, _ in self.service.decrypt_many(encrypted_passwords, data_key)]
+
+    def reencrypt_many(self, encrypted_passwords: List[str],
+                       data_key: Optional[str] = None) -> List[Optional[str]]:
+        """Re-criptografa várias senhas (None se já atual ou com erro)"""
+        return [value for value, _ in self.service.reencrypt_many(encrypted_passwords, data_key)]
+
+    def rewrap_data_keys(self, data_keys: List[str]) -> List[Optional[str]]:
+        """Embrulha novamente chaves de dados (None se já atual ou com erro)"""
+        return [value for value, _ in self.service.rewrap_data_keys(data_keys)]
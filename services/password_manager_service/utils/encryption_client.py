@@ -2,31 +2,58 @@
 Cliente para comunicação com o Encryption Service
 """
 import requests
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from config import Config
+from shared import inprocess
+from shared.http_transport import HTTPTransport
+from utils.transport import get_service_transport
+from utils.embedded_encryption import EmbeddedEncryptionClient
 
 
 class EncryptionClient:
     """Cliente para criptografia/descriptografia com o Encryption Service"""
     
-    def __init__(self, encryption_service_url: str = None):
+    def __init__(self, encryption_service_url: str = None, transport: Optional[HTTPTransport] = None):
         self.encryption_service_url = encryption_service_url or Config.ENCRYPTION_SERVICE_URL
+        self.transport = transport or get_service_transport()
     
-    def encrypt(self, password: str) -> Optional[str]:
+    @staticmethod
+    def _with_data_key(payload: Dict[str, Any], data_key: Optional[str]) -> Dict[str, Any]:
+        """Inclui a chave de dados embrulhada no corpo, quando houver"""
+        if data_key:
+            payload['data_key'] = data_key
+        return payload
+    
+    def generate_data_key(self) -> Optional[str]:
+        """
+        Gera uma chave de dados embrulhada para um novo usuário
+        
+        Returns:
+            Chave de dados embrulhada ou None em caso de erro
+        """
+        try:
+            response = self.transport.post(f'{self.encryption_service_url}/keys/generate')
+            if response.status_code == 201:
+                return response.json().get('data_key')
+            return None
+        except requests.exceptions.RequestException:
+            return None
+    
+    def encrypt(self, password: str, data_key: Optional[str] = None) -> Optional[str]:
         """
         Criptografa uma senha
         
         Args:
             password: Senha em texto plano
+            data_key: Chave de dados embrulhada do usuário (opcional)
             
         Returns:
             Senha criptografada ou None em caso de erro
         """
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.encryption_service_url}/encrypt',
-                json={'password': password},
-                timeout=5
+                json=self._with_data_key({'password': password}, data_key)
             )
             
             if response.status_code == 200:
@@ -36,21 +63,21 @@ class EncryptionClient:
         except requests.exceptions.RequestException:
             return None
     
-    def decrypt(self, encrypted_password: str) -> Optional[str]:
+    def decrypt(self, encrypted_password: str, data_key: Optional[str] = None) -> Optional[str]:
         """
         Descriptografa uma senha
         
         Args:
             encrypted_password: Senha criptografada
+            data_key: Chave de dados embrulhada do usuário (opcional)
             
         Returns:
             Senha descriptografada ou None em caso de erro
         """
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.encryption_service_url}/decrypt',
-                json={'encrypted_password': encrypted_password},
-                timeout=5
+                json=self._with_data_key({'encrypted_password': encrypted_password}, data_key)
             )
             
             if response.status_code == 200:
@@ -59,4 +86,96 @@ class EncryptionClient:
             return None
         except requests.exceptions.RequestException:
             return None
+    
+    def _post_batch(self, endpoint: str, field: str, result_field: str,
+                    items: List[str], data_key: Optional[str]) -> List[Optional[str]]:
+        """Envia itens em lotes de até ENCRYPTION_BATCH_SIZE e junta os resultados"""
+        results: List[Optional[str]] = []
+        batch_size = max(1, Config.ENCRYPTION_BATCH_SIZE)
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            try:
+                response = self.transport.post(
+                    f'{self.encryption_service_url}/{endpoint}',
+                    json=self._with_data_key({field: chunk}, data_key)
+                )
+                if response.status_code == 200:
+                    results.extend(item.get(result_field) for item in response.json()['results'])
+                    continue
+            except (requests.exceptions.RequestException, ValueError, KeyError):
+                pass
+            results.extend([None] * len(chunk))
+        return results
+    
+    def encrypt_many(self, passwords: List[str],
+                     data_key: Optional[str] = None) -> List[Optional[str]]:
+        """
+        Criptografa várias senhas com uma requisição por lote
+        
+        Args:
+            passwords: Senhas em texto plano
+            data_key: Chave de dados embrulhada do usuário (opcional)
+            
+        Returns:
+            Lista posicional de senhas criptografadas (None nos itens com erro)
+        """
+        return self._post_batch('encrypt/batch', 'passwords', 'encrypted_password',
+                                passwords, data_key)
+    
+    def decrypt_many(self, encrypted_passwords: List[str],
+                     data_key: Optional[str] = None) -> List[Optional[str]]:
+        """
+        Descriptografa várias senhas com uma requisição por lote
+        
+        Args:
+            encrypted_passwords: Senhas criptografadas
+            data_key: Chave de dados embrulhada do usuário (opcional)
+            
+        Returns:
+            Lista posicional de senhas descriptografadas (None nos itens com erro)
+        """
+        return self._post_batch('decrypt/batch', 'encrypted_passwords', 'password',
+                                encrypted_passwords, data_key)
 
+    
+    def reencrypt_many(self, encrypted_passwords: List[str],
+                       data_key: Optional[str] = None) -> List[Optional[str]]:
+        """
+        Re-criptografa várias senhas para a chave atual (rotação de chaves)
+        
+        Args:
+            encrypted_passwords: Senhas criptografadas
+            data_key: Chave de dados embrulhada do usuário (opcional)
+            
+        Returns:
+            Lista posicional com o novo texto, ou None se já atual ou com erro
+        """
+        return self._post_batch('reencrypt/batch', 'encrypted_passwords', 'encrypted_password',
+                                encrypted_passwords, data_key)
+    
+    def rewrap_data_keys(self, data_keys: List[str]) -> List[Optional[str]]:
+        """
+        Embrulha novamente chaves de dados com a chave mestra primária
+        
+        Args:
+            data_keys: Chaves de dados embrulhadas
+            
+        Returns:
+            Lista posicional com a nova chave, ou None se já atual ou com erro
+        """
+        return self._post_batch('keys/rewrap', 'data_keys', 'data_key', data_keys, None)
+
+
+def create_encryption_client():
+    """
+    Cria o cliente de criptografia conforme Config.ENCRYPTION_BACKEND
+    
+    Returns:
+        EmbeddedEncryptionClient nos modos 'embedded' e 'inprocess' (sobre o
+        EncryptionService do monolito), EncryptionClient (HTTP) caso contrário
+    """
+    if Config.ENCRYPTION_BACKEND == 'inprocess':
+        return EmbeddedEncryptionClient(service=inprocess.resolve(inprocess.ENCRYPTION_SERVICE))
+    if Config.ENCRYPTION_BACKEND == 'embedded':
+        return EmbeddedEncryptionClient(Config.EMBEDDED_ENCRYPTION_KEY_PATH)
+    return EncryptionClient()
@@ -0,0 +1,222 @@
+"""
+Importação em massa de senhas a partir de CSV ou NDJSON (em streaming)
+"""
+import csv
+import json
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+CONFLICT_MODES = ('skip', 'overwrite', 'fail')
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Nomes de coluna aceitos, incluindo os de exportações de outros gerenciadores
+_FIELD_ALIASES = {
+    'site': ('site', 'url', 'login_uri', 'name'),
+    'username': ('username', 'login_username', 'login', 'user', 'email'),
+    'password': ('password', 'login_password'),
+}
+
+# Uma linha maior que isso não é uma entrada de senha; evita ler sem limite
+MAX_LINE_BYTES = 64 * 1024
+
+
+class ImportFormatError(ValueError):
+    """Corpo da importação ilegível (a importação é interrompida)"""
+
+
+def _iter_lines(stream: BinaryIO) -> Iterator[str]:
+    """Lê o corpo linha a linha, com tamanho de linha limitado"""
+    first = True
+    while True:
+        line = stream.readline(MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_LINE_BYTES:
+            raise ImportFormatError(f'Linha excede {MAX_LINE_BYTES} bytes')
+        try:
+            text = line.decode('utf-8')
+        except UnicodeDecodeError:
+            raise ImportFormatError('O arquivo deve estar em UTF-8')
+        if first:
+            text = text.lstrip('\ufeff')
+            first = False
+        yield text
+
+
+def _normalize(record: Dict[str, Any]) -> Dict[str, str]:
+    """Mapeia as colunas do registro para site, username e password"""
+    fields = {str(key).strip().lower(): value for key, value in record.items() if key is not None}
+    entry = {}
+    for field, aliases in _FIELD_ALIASES.items():
+        value = next((fields[alias] for alias in aliases if fields.get(alias)), '')
+        entry[field] = value if isinstance(value, str) else str(value)
+    entry['site'] = entry['site'].strip()
+    entry['username'] = entry['username'].strip()
+    return entry
+
+
+def iter_import_rows(stream: BinaryIO,
+                     import_format: str) -> Iterator[Tuple[int, Optional[Dict[str, str]], Optional[str]]]:
+    """
+    Interpreta o corpo da importação de forma incremental
+
+    Args:
+        stream: Corpo da requisição (binário)
+        import_format: 'csv' (com cabeçalho) ou 'ndjson' (um objeto JSON por linha)
+
+    Yields:
+        Tuplas (linha, entrada, erro). Registros inválidos trazem o erro e não
+        interrompem a importação.
+
+    Raises:
+        ImportFormatError: Se o corpo não puder ser lido
+    """
+    lines = _iter_lines(stream)
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            for record in reader:
+                yield (reader.line_num, *_validate(_normalize(record)))
+        except csv.Error as e:
+            raise ImportFormatError(f'CSV inválido na linha {reader.line_num}: {e}')
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'JSON inválido'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Cada linha deve ser um objeto JSON'
+            continue
+        yield (line_number, *_validate(_normalize(record)))
+
+
+def _validate(entry: Dict[str, str]) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    if not entry['site'] or not entry['username'] or not entry['password']:
+        return None, 'Campos "site", "username" e "password" são obrigatórios'
+    return entry, None
+
+
+class ImportSummary:
+    """
+    Resultado da importação
+
+    Os contadores cobrem todas as linhas; o detalhe por linha é guardado só
+    para linhas que não foram criadas e até ``max_reported`` itens, para que a
+    memória não cresça com o tamanho do arquivo.
+    """
+
+    def __init__(self, max_reported: int = 1000):
+        self.max_reported = max_reported
+        self.counts = {'created': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+        self.rows: List[Dict[str, Any]] = []
+        self.truncated = False
+        self.aborted = False
+
+    def record(self, line: int, status: str, error: Optional[str] = None):
+        self.counts[status] += 1
+        if status == 'created':
+            return
+        if len(self.rows) >= self.max_reported:
+            self.truncated = True
+            return
+        row = {'line': line, 'status': status}
+        if error:
+            row['error'] = error
+        self.rows.append(row)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.counts, total=sum(self.counts.values()), rows=self.rows,
+                    truncated=self.truncated, aborted=self.aborted)
+
+
+class PasswordImporter:
+    """
+    Importa senhas em lotes: cifra cada lote de uma vez e grava com inserts
+    multi-linha em uma transação por lote
+
+    Conflitos (site e username já existentes) seguem ``on_conflict``:
+    ``skip`` ignora a linha, ``overwrite`` substitui a senha e ``fail``
+    interrompe a importação no primeiro conflito (lotes anteriores já gravados).
+    """
+
+    def __init__(self, repository, encryption_client, user_id: int, data_key: Optional[str],
+                 on_conflict: str = 'skip', chunk_size: int = 500, max_reported: int = 1000):
+        self.repository = repository
+        self.encryption_client = encryption_client
+        self.user_id = user_id
+        self.data_key = data_key
+        self.on_conflict = on_conflict
+        self.chunk_size = chunk_size
+        self.summary = ImportSummary(max_reported)
+
+    def run(self, rows: Iterator[Tuple[int, Optional[Dict[str, str]], Optional[str]]]) -> ImportSummary:
+        """Processa as linhas, lote a lote, e retorna o resumo"""
+        chunk: Dict[Tuple[str, str], Tuple[int, Dict[str, str]]] = {}
+        for line, entry, error in rows:
+            if error:
+                self.summary.record(line, 'failed', error)
+                continue
+            key = (entry['site'], entry['username'])
+            if key in chunk:
+                # Repetida no mesmo lote: a última vence no overwrite
+                earlier_line = chunk[key][0]
+                if self.on_conflict == 'overwrite':
+                    self.summary.record(earlier_line, 'skipped', 'Substituída por linha posterior')
+                    del chunk[key]
+                else:
+                    if not self._conflict(line):
+                        return self.summary
+                    continue
+            chunk[key] = (line, entry)
+            if len(chunk) >= self.chunk_size:
+                if not self._flush(chunk):
+                    return self.summary
+                chunk = {}
+        if chunk:
+            self._flush(chunk)
+        return self.summary
+
+    def _conflict(self, line: int) -> bool:
+        """Registra um conflito; retorna False se a importação deve parar"""
+        if self.on_conflict == 'fail':
+            self.summary.record(line, 'failed', 'Já existe uma senha para este site e username')
+            self.summary.aborted = True
+            return False
+        self.summary.record(line, 'skipped', 'Já existe uma senha para este site e username')
+        return True
+
+    def _flush(self, chunk: Dict[Tuple[str, str], Tuple[int, Dict[str, str]]]) -> bool:
+        """Cifra e grava um lote; retorna False se a importação deve parar"""
+        pending = dict(chunk)
+        if self.on_conflict != 'overwrite':
+            # Não cifra o que já existe
+            for key in self.repository.find_existing_entries(self.user_id, list(pending)):
+                line, _ = pending.pop(key)
+                if not self._conflict(line):
+                    return False
+
+        keys = list(pending)
+        encrypted = self.encryption_client.encrypt_many(
+            [pending[key][1]['password'] for key in keys], self.data_key
+        )
+        entries = []
+        for key, ciphertext in zip(keys, encrypted):
+            if ciphertext:
+                entries.append((key[0], key[1], ciphertext))
+            else:
+                self.summary.record(pending[key][0], 'failed', 'Erro ao criptografar senha')
+
+        results = self.repository.import_passwords(
+            self.user_id, entries, overwrite=self.on_conflict == 'overwrite'
+        )
+        for (site, username, _), status in zip(entries, results):
+            line = pending[(site, username)][0]
+            if status == 'skipped' and not self._conflict(line):
+                return False
+            if status != 'skipped':
+                self.summary.record(line, status)
+        return True
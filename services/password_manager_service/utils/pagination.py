@@ -0,0 +1,105 @@
+"""
+Paginação: cursores opacos (keyset ou posição) e limite de itens por página
+"""
+import base64
+import binascii
+import hashlib
+import json
+from typing import Optional, Tuple
+
+# Posição na ordenação (site, username, id) da listagem de senhas
+Cursor = Tuple[str, str, int]
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _decode(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, list):
+        raise ValueError('Cursor inválido')
+    return values
+
+
+def encode_cursor(site: str, username: str, password_id: int) -> str:
+    """Gera o cursor opaco que aponta para depois do item informado"""
+    return _encode([site, username, password_id])
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Decodifica um cursor gerado por ``encode_cursor``
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    values = _decode(cursor)
+    if len(values) != 3:
+        raise ValueError('Cursor inválido')
+    site, username, password_id = values
+    if not (isinstance(site, str) and isinstance(username, str) and isinstance(password_id, int)):
+        raise ValueError('Cursor inválido')
+    return site, username, password_id
+
+
+def encode_offset_cursor(offset: int) -> str:
+    """Gera o cursor opaco de resultados ranqueados (posição na lista)"""
+    return _encode([offset])
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    """
+    Decodifica um cursor gerado por ``encode_offset_cursor``
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    values = _decode(cursor)
+    if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+        raise ValueError('Cursor inválido')
+    return values[0]
+
+
+def parse_limit(value: Optional[str], default: int, maximum: int) -> int:
+    """
+    Interpreta o parâmetro ``limit``, limitado ao máximo do servidor
+
+    Raises:
+        ValueError: Se o valor não for um inteiro positivo
+    """
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('Parâmetro "limit" deve ser um inteiro')
+    if limit < 1:
+        raise ValueError('Parâmetro "limit" deve ser positivo')
+    return min(limit, maximum)
+
+
+def list_etag(vault_etag: str, media_type: str, include_ciphertext: bool,
+              limit: Optional[int] = None, after: Optional[Cursor] = None) -> str:
+    """
+    ETag de uma representação da listagem
+
+    A versão do cofre vale para todas as páginas e formatos; o hash dos
+    parâmetros normalizados (página, limite, texto criptografado, formato
+    negociado) distingue cada representação, para que o ETag de uma página
+    nunca valide outra. Sem ``limit`` a representação é a do streaming.
+
+    Args:
+        vault_etag: ETag do cofre (``<user_id>.<versão>``)
+        media_type: Tipo de mídia da resposta
+        include_ciphertext: Se a resposta inclui o texto criptografado
+        limit: Itens por página (None no streaming)
+        after: Posição decodificada do cursor (None na primeira página)
+    """
+    representation = [media_type, include_ciphertext, limit, list(after) if after else None]
+    digest = hashlib.sha256(json.dumps(representation, separators=(',', ':')).encode())
+    return f'{vault_etag}.{digest.hexdigest()[:16]}'
@@ -0,0 +1,139 @@
+"""
+Re-criptografia em segundo plano após rotação da chave mestra
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+
+class ReencryptionJob:
+    """
+    Job retomável que leva o cofre para a chave atual sem travar o tráfego
+
+    Executa em duas fases, ambas em lotes ordenados por chave (keyset) com
+    checkpoint gravado na mesma transação de cada lote:
+
+    1. ``keys``: re-embrulha as chaves de dados dos usuários com a chave
+       mestra primária (barato: uma chave por usuário);
+    2. ``passwords``: re-criptografa as senhas que ainda não estão na chave
+       atual do usuário (textos legados ou de chaves mestras antigas).
+
+    O ritmo é limitado a ``rows_per_second`` linhas por segundo. Se o processo
+    for interrompido, a próxima execução continua do último checkpoint.
+    """
+
+    def __init__(self, repository, encryption_client, rows_per_second: float = 200.0,
+                 batch_size: int = 100, name: str = 'reencrypt',
+                 sleep: Callable[[float], None] = time.sleep):
+        self.repository = repository
+        self.encryption_client = encryption_client
+        self.rows_per_second = rows_per_second
+        self.batch_size = batch_size
+        self.name = name
+        self._sleep = sleep
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {
+            'keys_scanned': 0, 'keys_rewrapped': 0,
+            'rows_scanned': 0, 'rows_reencrypted': 0
+        }
+
+    @property
+    def keys_checkpoint(self) -> str:
+        return f'{self.name}:keys'
+
+    @property
+    def passwords_checkpoint(self) -> str:
+        return f'{self.name}:passwords'
+
+    def reset(self):
+        """Reinicia os checkpoints (usar ao iniciar uma nova rotação)"""
+        self.repository.reset_checkpoint(self.keys_checkpoint)
+        self.repository.reset_checkpoint(self.passwords_checkpoint)
+
+    def _throttle(self, rows: int, started_at: float):
+        """Dorme o necessário para respeitar o limite de linhas por segundo"""
+        if self.rows_per_second <= 0:
+            return
+        remaining = rows / self.rows_per_second - (time.monotonic() - started_at)
+        if remaining > 0:
+            self._sleep(remaining)
+
+    def _rewrap_keys_batch(self) -> bool:
+        """Processa um lote de chaves de dados; retorna False ao terminar"""
+        started_at = time.monotonic()
+        after = self.repository.get_checkpoint(self.keys_checkpoint)
+        rows = self.repository.get_data_key_batch(after, self.batch_size)
+        if not rows:
+            return False
+
+        rewrapped = self.encryption_client.rewrap_data_keys([key for _, key in rows])
+        updates = [(user_id, old, new) for (user_id, old), new in zip(rows, rewrapped) if new]
+        self.stats['keys_scanned'] += len(rows)
+        self.stats['keys_rewrapped'] += self.repository.apply_data_key_rewrap(
+            updates, self.keys_checkpoint, rows[-1][0]
+        )
+        self._throttle(len(rows), started_at)
+        return True
+
+    def _reencrypt_passwords_batch(self) -> bool:
+        """Processa um lote de senhas; retorna False ao terminar"""
+        started_at = time.monotonic()
+        after = self.repository.get_checkpoint(self.passwords_checkpoint)
+        rows = self.repository.get_ciphertext_batch(after, self.batch_size)
+        if not rows:
+            return False
+
+        # Agrupa por usuário: cada grupo usa a chave de dados do seu dono
+        by_user = defaultdict(list)
+        for password_id, user_id, ciphertext in rows:
+            by_user[user_id].append((password_id, ciphertext))
+
+        updates = []
+        for user_id, entries in by_user.items():
+            data_key = self.repository.get_user_data_key(user_id)
+            reencrypted = self.encryption_client.reencrypt_many(
+                [ciphertext for _, ciphertext in entries], data_key
+            )
+            updates.extend(
+                (password_id, old, new)
+                for (password_id, old), new in zip(entries, reencrypted) if new
+            )
+
+        self.stats['rows_scanned'] += len(rows)
+        self.stats['rows_reencrypted'] += self.repository.apply_reencryption(
+            updates, self.passwords_checkpoint, rows[-1][0]
+        )
+        self._throttle(len(rows), started_at)
+        return True
+
+    def run(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Executa o job até o fim (ou até ``max_batches`` lotes / ``stop()``)
+
+        Returns:
+            Estatísticas acumuladas e se o job terminou
+        """
+        batches = 0
+        for phase in (self._rewrap_keys_batch, self._reencrypt_passwords_batch):
+            while True:
+                if self._stop.is_set() or (max_batches is not None and batches >= max_batches):
+                    return dict(self.stats, finished=False)
+                if not phase():
+                    break
+                batches += 1
+        return dict(self.stats, finished=True)
+
+    def start(self) -> threading.Thread:
+        """Executa o job em uma thread de segundo plano"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=f'{self.name}-job', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Interrompe o job após o lote atual (o checkpoint já está salvo)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
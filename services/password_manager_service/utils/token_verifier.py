@@ -0,0 +1,104 @@
+"""
+Verificação local de tokens JWT assinados pelo Auth Service (EdDSA + JWKS)
+"""
+import threading
+import time
+import jwt
+import requests
+from typing import Optional, Dict, Any, Callable
+
+
+class LocalTokenVerifier:
+    """
+    Verifica tokens em processo usando as chaves públicas do Auth Service
+
+    As chaves são buscadas no endpoint JWKS e mantidas em memória por key id.
+    Uma nova busca só acontece quando chega um token com kid desconhecido, e no
+    máximo uma vez a cada ``min_refresh_interval`` segundos, para que tokens
+    forjados com kids aleatórios não gerem uma requisição cada.
+
+    Revogações (/logout) não são vistas localmente: um token revogado continua
+    aceito aqui até expirar (ACCESS_TOKEN_EXPIRATION_MINUTES no Auth Service).
+    """
+
+    def __init__(self, jwks_url: str, min_refresh_interval: float = 30.0,
+                 fetch_jwks: Optional[Callable[[str], Dict[str, Any]]] = None):
+        self.jwks_url = jwks_url
+        self.min_refresh_interval = min_refresh_interval
+        self._fetch_jwks = fetch_jwks or self._fetch_jwks_http
+        self._keys: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+
+    @staticmethod
+    def _fetch_jwks_http(url: str) -> Dict[str, Any]:
+        """Busca o JWKS via HTTP"""
+        response = requests.get(url, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def _refresh(self) -> None:
+        """Recarrega o conjunto de chaves, respeitando o intervalo mínimo"""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_refresh and now - self._last_refresh < self.min_refresh_interval:
+                return
+            self._last_refresh = now
+            try:
+                jwks = self._fetch_jwks(self.jwks_url)
+            except (requests.exceptions.RequestException, ValueError):
+                return
+
+            keys = {}
+            for jwk in jwks.get('keys', []):
+                try:
+                    keys[jwk['kid']] = jwt.PyJWK(jwk).key
+                except (KeyError, jwt.PyJWKError):
+                    continue
+            self._keys = keys
+
+    def get_key(self, kid: str) -> Optional[Any]:
+        """Obtém a chave pública pelo kid, recarregando o JWKS se for desconhecido"""
+        key = self._keys.get(kid)
+        if key is None:
+            self._refresh()
+            key = self._keys.get(kid)
+        return key
+
+    @staticmethod
+    def handles(token: str) -> bool:
+        """Indica se o token é assinado com EdDSA (verificável localmente)"""
+        try:
+            return jwt.get_unverified_header(token).get('alg') == 'EdDSA'
+        except jwt.InvalidTokenError:
+            return False
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verifica um token localmente
+
+        Args:
+            token: Token JWT a ser verificado
+
+        Returns:
+            Dicionário no mesmo formato de /verify se válido, None caso contrário
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+            if header.get('alg') != 'EdDSA' or not header.get('kid'):
+                return None
+            key = self.get_key(header['kid'])
+            if key is None:
+                return None
+            payload = jwt.decode(token, key, algorithms=['EdDSA'])
+        except jwt.InvalidTokenError:
+            return None
+
+        # Refresh tokens só valem no Auth Service (/refresh)
+        if 'user_id' not in payload or payload.get('typ', 'access') != 'access':
+            return None
+        data = {'valid': True, 'user_id': payload['user_id']}
+        for claim in ('username', 'email'):
+            if claim in payload:
+                data[claim] = payload[claim]
+        return data
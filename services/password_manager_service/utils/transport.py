@@ -0,0 +1,16 @@
+"""
+Transporte HTTP compartilhado pelos clientes do Password Manager Service
+"""
+from config import Config
+from shared.http_transport import HTTPTransport, get_transport
+
+
+def get_service_transport() -> HTTPTransport:
+    """Obtém o transporte HTTP keep-alive configurado para este serviço"""
+    return get_transport(
+        'password_manager_service',
+        pool_size=Config.HTTP_POOL_SIZE,
+        connect_timeout=Config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=Config.HTTP_READ_TIMEOUT,
+        max_idle_seconds=Config.HTTP_MAX_IDLE_SECONDS
+    )
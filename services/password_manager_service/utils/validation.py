@@ -0,0 +1,57 @@
+"""
+Validação dos corpos de requisição, comum às rotas síncronas e assíncronas
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+ENTRY_FIELDS = ('site', 'username', 'password')
+
+
+def parse_entry_fields(data: Any, partial: bool = False) -> Tuple[Dict[str, str], Optional[str]]:
+    """
+    Valida os campos de uma entrada (criação, PUT ou PATCH)
+
+    Args:
+        data: Corpo JSON da requisição
+        partial: Aceita qualquer subconjunto dos campos (PATCH)
+
+    Returns:
+        Tupla (campos, erro). ``site`` e ``username`` vêm sem espaços nas pontas.
+    """
+    if not data or not isinstance(data, dict):
+        return {}, 'Dados não fornecidos'
+
+    fields = {}
+    for field in ENTRY_FIELDS:
+        if partial and field not in data:
+            continue
+        value = data.get(field, '')
+        if not isinstance(value, str):
+            return {}, f'Campo "{field}" deve ser texto'
+        value = value if field == 'password' else value.strip()
+        if not value:
+            if partial:
+                return {}, f'Campo "{field}" não pode ser vazio'
+            return {}, f'Campo "{field}" é obrigatório'
+        fields[field] = value
+
+    if not fields:
+        return {}, 'Informe "site", "username" e/ou "password"'
+    return fields, None
+
+
+def parse_password_ids(data: Any, max_batch: int) -> Tuple[List[int], Optional[str], int]:
+    """
+    Valida a lista de IDs de POST /passwords/reveal
+
+    Returns:
+        Tupla (ids sem repetição e na ordem pedida, erro, status HTTP do erro)
+    """
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        return [], 'Campo "ids" deve ser uma lista não vazia', 400
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return [], 'Campo "ids" deve conter apenas inteiros', 400
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > max_batch:
+        return [], f'Lote excede o máximo de {max_batch} senhas', 413
+    return ids, None, 200
@@ -0,0 +1,16 @@
+"""
+Componentes compartilhados entre os serviços
+"""
+from .sqlite_pool import SQLiteConnectionPool, get_pool
+from .group_commit import GroupCommitWriter, WriterUnavailable, get_writer
+from .ttl_cache import TTLCache
+from .http_transport import HTTPTransport, get_transport
+from .ciphertext_codec import encode_ciphertext, decode_ciphertext
+from .key_files import create_exclusive, write_atomic
+from .rate_limit import RateLimiter, RateLimitPolicy, build_policies, get_bucket_store
+from . import inprocess
+
+__all__ = ['SQLiteConnectionPool', 'get_pool', 'GroupCommitWriter', 'WriterUnavailable', 'get_writer',
+           'TTLCache', 'HTTPTransport', 'get_transport', 'encode_ciphertext', 'decode_ciphertext',
+           'create_exclusive', 'write_atomic',
+           'RateLimiter', 'RateLimitPolicy', 'build_policies', 'get_bucket_store', 'inprocess']
@@ -0,0 +1,103 @@
+"""
+Codec binário dos textos criptografados (armazenamento em BLOB)
+
+Os textos produzidos pelo Encryption Service são base64 com um prefixo de
+versão (ver encryption_service/utils/encryption.py). No banco eles são
+guardados como bytes crus: um byte de formato, o key id (quando houver) e o
+conteúdo já decodificado, cerca de 25% menor que o texto. A conversão para
+texto só acontece na fronteira da API.
+"""
+import base64
+import binascii
+from typing import Union
+
+# Bytes de formato: (prefixo textual, tem key id, base64 com padding)
+_TEXT = 0x00
+_FORMATS = {
+    0x01: ('dk:', False, True),    # v1 Fernet, chave de dados
+    0x02: ('dk2:', False, False),  # v2 AES-GCM, chave de dados
+    0x03: ('k:', True, True),      # v1 Fernet, chave mestra
+    0x04: ('k2:', True, False),    # v2 AES-GCM, chave mestra
+}
+# Fernet legado, sem prefixo (anterior aos key ids)
+_LEGACY_FERNET = 0x05
+_LEGACY_FERNET_MARKER = 'gAAAAA'
+_KEY_ID_SIZE = 4
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _b64encode(data: bytes, padded: bool) -> str:
+    encoded = base64.urlsafe_b64encode(data).decode()
+    return encoded if padded else encoded.rstrip('=')
+
+
+def _pack(ciphertext: str) -> bytes:
+    """Converte o texto para o formato binário (sem verificação)"""
+    for tag, (prefix, has_key_id, _) in _FORMATS.items():
+        if ciphertext.startswith(prefix):
+            body = ciphertext[len(prefix):]
+            key_id = b''
+            if has_key_id:
+                key_id_hex, _, body = body.partition(':')
+                key_id = bytes.fromhex(key_id_hex)
+                if len(key_id) != _KEY_ID_SIZE:
+                    raise ValueError('key id inválido')
+            return bytes([tag]) + key_id + _b64decode(body)
+    if ciphertext.startswith(_LEGACY_FERNET_MARKER):
+        return bytes([_LEGACY_FERNET]) + _b64decode(ciphertext)
+    raise ValueError('formato desconhecido')
+
+
+def encode_ciphertext(ciphertext: str) -> bytes:
+    """
+    Converte um texto criptografado para o formato de armazenamento binário
+
+    Textos em formato desconhecido (ou cuja conversão não seria exata) são
+    guardados como UTF-8 com o byte de formato 0x00, então a volta é sempre
+    idêntica ao original.
+
+    Args:
+        ciphertext: Texto criptografado (base64 com prefixo de versão)
+
+    Returns:
+        Bytes para a coluna BLOB
+    """
+    try:
+        packed = _pack(ciphertext)
+        if decode_ciphertext(packed) == ciphertext:
+            return packed
+    except (ValueError, binascii.Error):
+        pass
+    return bytes([_TEXT]) + ciphertext.encode()
+
+
+def decode_ciphertext(value: Union[str, bytes, memoryview]) -> str:
+    """
+    Converte o valor armazenado de volta para o texto criptografado
+
+    Valores TEXT (bancos ainda não migrados) são devolvidos sem alteração.
+
+    Args:
+        value: Valor lido da coluna encrypted_password
+
+    Returns:
+        Texto criptografado (base64 com prefixo de versão)
+    """
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    tag, body = value[0], value[1:]
+    if tag == _TEXT:
+        return body.decode()
+    if tag == _LEGACY_FERNET:
+        return _b64encode(body, padded=True)
+    if tag not in _FORMATS:
+        raise ValueError(f'Formato de texto criptografado desconhecido: {tag}')
+    prefix, has_key_id, padded = _FORMATS[tag]
+    if has_key_id:
+        key_id, body = body[:_KEY_ID_SIZE], body[_KEY_ID_SIZE:]
+        prefix = f'{prefix}{key_id.hex()}:'
+    return prefix + _b64encode(body, padded)
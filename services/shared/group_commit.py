@@ -0,0 +1,185 @@
+"""
+Escritor SQLite com group commit
+"""
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .sqlite_pool import SQLiteConnectionPool, get_pool
+
+WriteOperation = Callable[[sqlite3.Connection], Any]
+
+
+class WriterUnavailable(Exception):
+    """A escrita não foi confirmada a tempo (escritor sobrecarregado ou sem acesso ao banco)"""
+
+
+class GroupCommitWriter:
+    """
+    Thread escritora única que agrupa escritas concorrentes em uma transação
+
+    Requisições diferentes enviam operações com ``submit``; a thread escritora
+    junta o que chegar em uma janela curta (até ``max_batch_size`` operações),
+    executa tudo em um único ``BEGIN IMMEDIATE ... COMMIT`` e paga um único fsync
+    pelo lote. Cada operação roda dentro de um SAVEPOINT próprio, então a falha
+    de uma (ex.: violação de UNIQUE) não desfaz as demais e é relançada apenas
+    para quem a enviou.
+    """
+
+    def __init__(self, pool: SQLiteConnectionPool, max_batch_size: int = 64,
+                 max_delay_ms: float = 2.0, submit_timeout: float = 10.0):
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_delay_ms = max_delay_ms
+        self.submit_timeout = submit_timeout
+
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._batches = 0
+        self._operations = 0
+        self._largest_batch = 0
+
+    def _ensure_started(self) -> queue.Queue:
+        """Inicia a thread escritora (novamente, após fork ou se ela terminou)"""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,),
+                    name='group-commit-writer', daemon=True
+                )
+                self._thread.start()
+            return self._queue
+
+    def submit(self, operation: WriteOperation) -> Any:
+        """
+        Envia uma operação de escrita e aguarda o commit do lote
+
+        Args:
+            operation: Função que recebe a conexão e executa a escrita
+
+        Returns:
+            Valor retornado pela operação, após o commit
+
+        Raises:
+            WriterUnavailable: A operação não começou em ``submit_timeout``
+                segundos e foi descartada (nada foi gravado)
+        """
+        future: Future = Future()
+        self._ensure_started().put((operation, future))
+        try:
+            return future.result(timeout=self.submit_timeout)
+        except FutureTimeoutError:
+            # Ainda na fila: descartada, o cliente pode repetir com segurança
+            if future.cancel():
+                raise WriterUnavailable('Escrita não confirmada a tempo')
+        # Já em execução no lote: o resultado real (commit ou erro) é o que vale
+        return future.result()
+
+    def _run(self, pending: queue.Queue):
+        """Laço da thread escritora"""
+        conn: Optional[sqlite3.Connection] = None
+        delay = self.max_delay_ms / 1000
+        while True:
+            batch = [pending.get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(pending.get(timeout=delay))
+                except queue.Empty:
+                    break
+            # Descarta operações cujo solicitante já desistiu (timeout)
+            batch = [(operation, future) for operation, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                if conn is None:
+                    conn = self.pool.connect()
+                    conn.isolation_level = None
+                self._commit_batch(conn, batch)
+            except Exception as e:
+                # Banco inacessível ou conexão em estado inválido: o lote falha,
+                # a conexão é descartada e a thread segue atendendo a fila
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    conn = None
+
+    def _commit_batch(self, conn: sqlite3.Connection,
+                      batch: List[Tuple[WriteOperation, Future]]):
+        """Executa um lote de operações em uma única transação"""
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                conn.execute('SAVEPOINT op')
+                try:
+                    result = operation(conn)
+                    conn.execute('RELEASE op')
+                    results.append((future, result, None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO op')
+                    conn.execute('RELEASE op')
+                    results.append((future, None, e))
+            conn.execute('COMMIT')
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            # Se o ROLLBACK também falhar, _run descarta a conexão
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._operations += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna estatísticas de group commit"""
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'operations': self._operations,
+                'largest_batch': self._largest_batch
+            }
+
+
+# Escritores compartilhados por caminho de banco
+_writers: Dict[str, GroupCommitWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(database_path: str, max_batch_size: int = 64,
+               max_delay_ms: float = 2.0, submit_timeout: float = 10.0,
+               **pool_options) -> GroupCommitWriter:
+    """Obtém o escritor associado ao banco (um por caminho de arquivo)"""
+    key = os.path.abspath(database_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = GroupCommitWriter(
+                get_pool(database_path, **pool_options),
+                max_batch_size=max_batch_size,
+                max_delay_ms=max_delay_ms,
+                submit_timeout=submit_timeout
+            )
+            _writers[key] = writer
+        return writer
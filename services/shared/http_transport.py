@@ -0,0 +1,132 @@
+"""
+Transporte HTTP compartilhado com conexões keep-alive reutilizáveis
+"""
+import threading
+import time
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPTransport:
+    """
+    Sessão HTTP com pool de conexões keep-alive por host de destino
+
+    Substitui as chamadas a ``requests.post/get`` (uma conexão TCP nova por
+    chamada) por uma ``requests.Session`` compartilhada. Conexões ociosas por
+    mais de ``max_idle_seconds`` são descartadas antes do próximo uso, evitando
+    reutilizar sockets que o servidor já fechou por keep-alive timeout.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 2.0,
+                 read_timeout: float = 5.0, max_idle_seconds: float = 30.0):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_idle_seconds = max_idle_seconds
+
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                    max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+
+        self._lock = threading.Lock()
+        self._last_used: Dict[Tuple[str, str, int], float] = {}
+        self._requests = 0
+        self._idle_resets = 0
+
+    @staticmethod
+    def _host_key(url: str) -> Tuple[str, str, int]:
+        """Identifica o host de destino (esquema, host, porta)"""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        return parts.scheme, (parts.hostname or '').lower(), port
+
+    def _drop_idle_pool(self, host_key: Tuple[str, str, int]):
+        """Fecha as conexões de um host que ficou ocioso além do limite"""
+        pools = self._adapter.poolmanager.pools
+        for pool_key in list(pools.keys()):
+            if (pool_key.key_scheme, pool_key.key_host, pool_key.key_port) == host_key:
+                del pools[pool_key]
+        self._idle_resets += 1
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Executa uma requisição HTTP reutilizando conexões do pool
+
+        Args:
+            method: Método HTTP
+            url: URL completa
+            **kwargs: Argumentos aceitos por ``requests.Session.request``
+
+        Returns:
+            Resposta HTTP
+        """
+        host_key = self._host_key(url)
+        now = time.monotonic()
+        with self._lock:
+            last_used = self._last_used.get(host_key)
+            if last_used is not None and now - last_used > self.max_idle_seconds:
+                self._drop_idle_pool(host_key)
+            self._last_used[host_key] = now
+            self._requests += 1
+
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do transporte e dos pools por host"""
+        hosts = {}
+        for pool_key in list(self._adapter.poolmanager.pools.keys()):
+            pool = self._adapter.poolmanager.pools.get(pool_key)
+            if pool is None:
+                continue
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            hosts[f'{pool_key.key_scheme}://{pool_key.key_host}:{pool_key.key_port}'] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': idle
+            }
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'idle_resets': self._idle_resets,
+                'hosts': hosts
+            }
+
+    def close(self):
+        """Fecha todas as conexões"""
+        self.session.close()
+
+
+# Transportes compartilhados por nome de serviço
+_transports: Dict[str, HTTPTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(name: str = 'default', **options) -> HTTPTransport:
+    """Obtém o transporte compartilhado pelo nome (um por serviço)"""
+    with _transports_lock:
+        transport = _transports.get(name)
+        if transport is None:
+            transport = HTTPTransport(**options)
+            _transports[name] = transport
+        return transport
@@ -0,0 +1,44 @@
+"""
+Registro de implementações em processo (modo monolito)
+
+No modo monolito (services/monolith_app.py) os serviços rodam no mesmo
+processo. Cada serviço carregado publica aqui o que os outros chamariam por
+HTTP, e os clientes configurados com o backend 'inprocess' resolvem essas
+entradas no lugar de abrir uma requisição.
+"""
+import threading
+from typing import Any, Dict
+
+# Nomes publicados pelo monolito
+AUTH_VERIFY = 'auth.verify'
+ENCRYPTION_SERVICE = 'encryption.service'
+
+_registry: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, implementation: Any):
+    """Publica uma implementação em processo"""
+    with _lock:
+        _registry[name] = implementation
+
+
+def resolve(name: str) -> Any:
+    """
+    Obtém uma implementação publicada
+
+    Raises:
+        LookupError: Se nada foi publicado com esse nome (o serviço não está
+            carregado neste processo)
+    """
+    with _lock:
+        if name not in _registry:
+            raise LookupError(f'"{name}" não está disponível em processo; '
+                              f'use o modo monolito ou o backend HTTP')
+        return _registry[name]
+
+
+def unregister(name: str):
+    """Remove uma implementação publicada"""
+    with _lock:
+        _registry.pop(name, None)
@@ -0,0 +1,85 @@
+"""
+Gravação segura de arquivos de chaves
+
+Vários processos (workers do gunicorn, réplicas) podem abrir o mesmo arquivo
+de chaves ao mesmo tempo. As funções daqui garantem que nenhum deles leia um
+arquivo pela metade e que, na criação, todos acabem com a mesma chave.
+"""
+import os
+import tempfile
+
+
+def _write_temp(path: str, content: bytes) -> str:
+    """Grava o conteúdo em disco (fsync) em um temporário no diretório de ``path``"""
+    directory = os.path.dirname(os.path.abspath(path))
+    # mkstemp cria o arquivo com permissão 0600
+    fd, temp_path = tempfile.mkstemp(prefix='.key-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _fsync_directory(path: str):
+    """Persiste a entrada do diretório (não suportado em todos os sistemas)"""
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def write_atomic(path: str, content: bytes):
+    """
+    Substitui o arquivo de forma atômica
+
+    Uma queda no meio da escrita deixa o arquivo antigo intacto, nunca um
+    arquivo truncado.
+
+    Args:
+        path: Arquivo de destino
+        content: Novo conteúdo
+    """
+    temp_path = _write_temp(path, content)
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    _fsync_directory(path)
+
+
+def create_exclusive(path: str, content: bytes) -> bool:
+    """
+    Cria o arquivo somente se ele ainda não existir
+
+    O conteúdo completo é gravado antes de o arquivo aparecer no caminho
+    final (``os.link`` falha se o destino existir), então processos
+    concorrentes nunca veem um arquivo parcial e só um deles vence.
+
+    Args:
+        path: Arquivo a criar
+        content: Conteúdo do arquivo
+
+    Returns:
+        True se este processo criou o arquivo, False se outro já o tinha criado
+    """
+    temp_path = _write_temp(path, content)
+    try:
+        os.link(temp_path, path)
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(temp_path)
+    _fsync_directory(path)
+    return True
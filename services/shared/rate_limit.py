@@ -0,0 +1,399 @@
+"""
+Limite de taxa por token bucket para os blueprints Flask dos serviços
+"""
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from flask import jsonify, request
+
+from .sqlite_pool import SQLiteConnectionPool, get_pool
+
+# (permitido, segundos até haver tokens suficientes, tokens restantes)
+ConsumeResult = Tuple[bool, float, float]
+
+
+class RateLimitPolicy(NamedTuple):
+    """Limite de ``limit`` requisições a cada ``period`` segundos por chave"""
+    key: str
+    limit: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens repostos por segundo"""
+        return self.limit / self.period
+
+    @classmethod
+    def parse(cls, key: str, spec: str) -> 'RateLimitPolicy':
+        """
+        Cria a política a partir de '<requisições>/<segundos>' (ex.: '10/60')
+
+        Args:
+            key: Tipo de chave ('ip', 'token', 'username', 'username_ip' ou um
+                registrado pelo serviço)
+            spec: Limite no formato '<requisições>/<segundos>'
+
+        Returns:
+            Política correspondente
+        """
+        limit, _, period = spec.partition('/')
+        return cls(key, int(limit), float(period or 1))
+
+
+class MemoryBucketStore:
+    """
+    Buckets em memória, divididos em shards com lock próprio
+
+    Requisições de chaves diferentes raramente disputam o mesmo lock. Quando
+    um shard passa de ``max_keys_per_shard`` os buckets já cheios (ociosos)
+    são descartados: recriá-los produz o mesmo resultado.
+    """
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000):
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards: List[Tuple[threading.Lock, Dict[str, Tuple[float, float, float, float]]]] = [
+            (threading.Lock(), {}) for _ in range(max(1, shards))
+        ]
+
+    def _shard(self, key: str):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def consume(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> ConsumeResult:
+        """
+        Retira ``cost`` tokens do bucket da chave, se houver
+
+        Args:
+            key: Chave do bucket
+            rate: Tokens repostos por segundo
+            capacity: Tamanho do bucket (rajada máxima)
+            cost: Tokens consumidos pela requisição
+
+        Returns:
+            Tupla (permitido, segundos até poder tentar novamente, tokens restantes)
+        """
+        now = time.monotonic()
+        lock, buckets = self._shard(key)
+        with lock:
+            tokens, updated, _, _ = buckets.get(key, (capacity, now, rate, capacity))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            if key not in buckets and len(buckets) >= self.max_keys_per_shard:
+                self._evict_full(buckets, now)
+            buckets[key] = (tokens, now, rate, capacity)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate, tokens
+
+    def refund(self, key: str, rate: float, capacity: float, cost: float = 1.0):
+        """Devolve ``cost`` tokens retirados por ``consume`` (limitado à capacidade)"""
+        now = time.monotonic()
+        lock, buckets = self._shard(key)
+        with lock:
+            if key not in buckets:
+                return
+            tokens, updated, _, _ = buckets[key]
+            tokens = min(capacity, tokens + (now - updated) * rate + cost)
+            buckets[key] = (tokens, now, rate, capacity)
+
+    @staticmethod
+    def _evict_full(buckets: Dict[str, Tuple[float, float, float, float]], now: float):
+        """Remove buckets que já teriam se reabastecido por completo"""
+        for key, (tokens, updated, rate, capacity) in list(buckets.items()):
+            if tokens + (now - updated) * rate >= capacity:
+                del buckets[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Quantidade de buckets em memória"""
+        return {'backend': 'memory', 'buckets': sum(len(buckets) for _, buckets in self._shards)}
+
+
+class SQLiteBucketStore:
+    """
+    Buckets em um arquivo SQLite compartilhado por várias réplicas do host
+
+    Cada consumo é uma transação ``BEGIN IMMEDIATE``, então processos
+    diferentes enxergam o mesmo saldo. Usa o relógio de parede, comum a todos
+    os processos. Buckets ociosos há mais de ``max_idle_seconds`` são
+    removidos periodicamente.
+    """
+
+    def __init__(self, pool: SQLiteConnectionPool, max_idle_seconds: float = 3600,
+                 cleanup_every: int = 1000):
+        self.pool = pool
+        self.max_idle_seconds = max_idle_seconds
+        self.cleanup_every = cleanup_every
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._initialized = False
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = self.pool.get_connection()
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS rate_buckets (
+                            key TEXT PRIMARY KEY,
+                            tokens REAL NOT NULL,
+                            updated REAL NOT NULL
+                        ) WITHOUT ROWID
+                    ''')
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def consume(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> ConsumeResult:
+        """Mesma semântica de ``MemoryBucketStore.consume``"""
+        conn = self._get_connection()
+        now = time.time()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens, now)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._maybe_cleanup(conn, now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate, tokens
+
+    def refund(self, key: str, rate: float, capacity: float, cost: float = 1.0):
+        """Mesma semântica de ``MemoryBucketStore.refund``"""
+        conn = self._get_connection()
+        now = time.time()
+        try:
+            conn.execute(
+                'UPDATE rate_buckets SET tokens = MIN(?, tokens + MAX(0, ? - updated) * ? + ?), '
+                'updated = ? WHERE key = ?',
+                (capacity, now, rate, cost, now, key)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _maybe_cleanup(self, conn: sqlite3.Connection, now: float):
+        """Remove buckets ociosos a cada ``cleanup_every`` consumos"""
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.cleanup_every:
+                return
+        conn.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - self.max_idle_seconds,))
+        conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Quantidade de buckets no banco"""
+        count = self._get_connection().execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0]
+        return {'backend': 'sqlite', 'buckets': count}
+
+
+# Stores compartilhados por configuração (os limitadores do mesmo processo dividem o estado)
+_stores: Dict[Tuple[str, str], object] = {}
+_stores_lock = threading.Lock()
+
+
+def get_bucket_store(backend: str = 'memory', database_path: str = ''):
+    """
+    Obtém o store de buckets do processo
+
+    Args:
+        backend: 'memory' (padrão, por processo) ou 'sqlite' (compartilhado
+            pelas réplicas que usam o mesmo arquivo)
+        database_path: Arquivo do backend 'sqlite'
+
+    Returns:
+        MemoryBucketStore ou SQLiteBucketStore
+    """
+    key = (backend, database_path if backend == 'sqlite' else '')
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == 'sqlite':
+                store = SQLiteBucketStore(get_pool(database_path))
+            elif backend == 'memory':
+                store = MemoryBucketStore()
+            else:
+                raise ValueError(f'Backend de limite de taxa desconhecido: {backend}')
+            _stores[key] = store
+        return store
+
+
+def _bearer_token() -> Optional[str]:
+    """Token do header Authorization ou do campo 'token' do corpo JSON"""
+    parts = request.headers.get('Authorization', '').split(' ')
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        return parts[1]
+    data = request.get_json(silent=True)
+    token = data.get('token') if isinstance(data, dict) else None
+    return token if isinstance(token, str) and token else None
+
+
+def client_ip() -> Optional[str]:
+    """Endereço do cliente"""
+    return request.remote_addr
+
+
+def token_hash() -> Optional[str]:
+    """Hash do token do cliente (o token em si não fica em memória nem no banco)"""
+    token = _bearer_token()
+    return hashlib.sha256(token.encode()).hexdigest()[:32] if token else None
+
+
+def body_username() -> Optional[str]:
+    """Username informado no corpo JSON (ex.: tentativas de login por conta)"""
+    data = request.get_json(silent=True)
+    username = data.get('username') if isinstance(data, dict) else None
+    return username.strip().lower() if isinstance(username, str) and username.strip() else None
+
+
+def body_username_ip() -> Optional[str]:
+    """
+    Username do corpo JSON combinado com o IP do cliente
+
+    Limita as tentativas contra uma conta sem permitir que um terceiro, de
+    outro endereço, bloqueie o login do dono da conta.
+    """
+    username = body_username()
+    return f'{username}@{client_ip() or "unknown"}' if username else None
+
+
+def too_many_requests_message(seconds: int) -> str:
+    """Mensagem das respostas 429"""
+    return f'Muitas requisições. Tente novamente em {seconds} segundos'
+
+
+KeyFunction = Callable[[], Optional[str]]
+
+
+class RateLimiter:
+    """
+    Aplica políticas de token bucket por endpoint
+
+    ``policies`` associa o nome do endpoint ('auth.login') às políticas que
+    valem para ele; todas precisam ter tokens para a requisição passar, e uma
+    requisição recusada não gasta tokens de nenhuma delas. A chave de cada
+    política vem de uma função registrada ('ip', 'token', 'username',
+    'username_ip' ou outras adicionadas pelo serviço); se ela não identificar
+    o cliente, o IP é usado. Requisições recusadas recebem 429 com Retry-After.
+    """
+
+    def __init__(self, policies: Dict[str, Sequence[RateLimitPolicy]], store=None,
+                 enabled: bool = True):
+        self.policies = {endpoint: list(rules) for endpoint, rules in policies.items()}
+        self.store = store or get_bucket_store()
+        self.enabled = enabled
+        self.key_functions: Dict[str, KeyFunction] = {
+            'ip': client_ip,
+            'token': token_hash,
+            'username': body_username,
+            'username_ip': body_username_ip,
+        }
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._rejected = 0
+
+    def key_function(self, name: str):
+        """Decorator que registra um tipo de chave adicional"""
+        def register(function: KeyFunction) -> KeyFunction:
+            self.key_functions[name] = function
+            return function
+        return register
+
+    def init_blueprint(self, blueprint):
+        """Verifica o limite antes de cada requisição do blueprint"""
+        blueprint.before_request(self.check)
+
+    def rules_for(self, endpoint: Optional[str]) -> List[RateLimitPolicy]:
+        """Políticas em vigor para o endpoint (nenhuma se o limitador estiver desligado)"""
+        return self.policies.get(endpoint, []) if self.enabled and endpoint else []
+
+    def consume(self, endpoint: str, identities: Dict[str, Optional[str]], ip: Optional[str]) -> int:
+        """
+        Consome os buckets do endpoint com as identidades já resolvidas
+
+        Usado diretamente por servidores que não são Flask (ex.: as rotas
+        Quart, cujas funções de chave são assíncronas).
+
+        Args:
+            endpoint: Nome do endpoint
+            identities: Identidade do cliente por tipo de chave
+            ip: Endereço do cliente, usado quando a identidade não é conhecida
+
+        Returns:
+            0 se a requisição pode seguir, ou segundos para o Retry-After
+        """
+        retry_after = 0.0
+        consumed = []
+        for index, policy in enumerate(self.rules_for(endpoint)):
+            identity = identities.get(policy.key)
+            kind = policy.key if identity else 'ip'
+            identity = identity or ip or 'unknown'
+            key = f'{endpoint}:{index}:{kind}:{identity}'
+            allowed, wait, _ = self.store.consume(key, policy.rate, policy.limit)
+            if allowed:
+                consumed.append((key, policy))
+            else:
+                retry_after = max(retry_after, wait)
+        # Recusada: devolve os tokens das políticas que tinham deixado passar
+        if retry_after:
+            for key, policy in consumed:
+                self.store.refund(key, policy.rate, policy.limit)
+
+        with self._lock:
+            if retry_after:
+                self._rejected += 1
+            else:
+                self._allowed += 1
+        return max(1, math.ceil(retry_after)) if retry_after else 0
+
+    def check(self):
+        """
+        Hook before_request: consome os buckets do endpoint atual
+
+        Returns:
+            None para seguir com a requisição, ou resposta 429
+        """
+        rules = self.rules_for(request.endpoint)
+        if not rules:
+            return None
+
+        identities = {policy.key: self.key_functions[policy.key]() for policy in rules}
+        seconds = self.consume(request.endpoint, identities, client_ip())
+        if not seconds:
+            return None
+
+        response = jsonify({'error': too_many_requests_message(seconds)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(seconds)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        """Requisições permitidas e recusadas por este limitador"""
+        with self._lock:
+            return {'allowed': self._allowed, 'rejected': self._rejected, **self.store.stats()}
+
+
+def build_policies(specs: Dict[str, Sequence[Tuple[str, str]]]) -> Dict[str, List[RateLimitPolicy]]:
+    """
+    Converte a configuração {endpoint: [(chave, '<requisições>/<segundos>'), ...]}
+
+    Especificações vazias desativam a política correspondente.
+    """
+    return {
+        endpoint: [RateLimitPolicy.parse(key, spec) for key, spec in rules if spec]
+        for endpoint, rules in specs.items()
+    }
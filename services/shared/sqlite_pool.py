@@ -0,0 +1,190 @@
+"""
+Pool de conexões SQLite por thread com pragmas ajustados
+"""
+import os
+import sqlite3
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+
+class _Lease:
+    """Conexão em uso por uma thread; liberada quando a thread termina"""
+    __slots__ = ('generation', 'conn', '__weakref__')
+
+    def __init__(self, generation: int, conn: sqlite3.Connection):
+        self.generation = generation
+        self.conn = conn
+
+
+class SQLiteConnectionPool:
+    """
+    Mantém uma conexão SQLite "quente" por thread de trabalho
+
+    Cada thread reutiliza sua própria conexão entre requisições, evitando o custo
+    de abrir o arquivo e reler o schema a cada chamada. As conexões são abertas
+    com WAL, synchronous=NORMAL, busy_timeout e mmap_size configuráveis, e o
+    cache de prepared statements do módulo sqlite3 é dimensionado por
+    ``cached_statements``.
+
+    A conexão fica presa à thread apenas enquanto ela existir: quando a thread
+    termina (servidores que criam uma thread por requisição) a conexão volta
+    para uma lista de ociosas e é reaproveitada pela próxima thread. No máximo
+    ``max_connections`` conexões ficam abertas (em uso + ociosas); acima disso
+    a thread espera até ``busy_timeout_ms`` por uma liberação.
+    """
+
+    def __init__(self, database_path: str, busy_timeout_ms: int = 5000,
+                 mmap_size: int = 0, cached_statements: int = 128,
+                 journal_mode: str = 'WAL', synchronous: str = 'NORMAL',
+                 max_connections: int = 64):
+        self.database_path = database_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.max_connections = max_connections
+
+        self._local = threading.local()
+        # Reentrante: a liberação roda em finalizadores, que podem disparar
+        # em qualquer ponto da thread que já segura o lock
+        self._lock = threading.RLock()
+        self._released = threading.Condition(self._lock)
+        self._open = 0
+        self._idle: List[sqlite3.Connection] = []
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+
+    def connect(self) -> sqlite3.Connection:
+        """Abre uma nova conexão, fora do pool, com os pragmas configurados"""
+        conn = sqlite3.connect(
+            self.database_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        if self.mmap_size:
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual, reaproveitando uma ociosa ou abrindo outra"""
+        lease: Optional[_Lease] = getattr(self._local, 'lease', None)
+        if lease is not None and lease.generation == self._generation:
+            with self._lock:
+                self._hits += 1
+            return lease.conn
+
+        conn = self._acquire()
+        lease = _Lease(self._generation, conn)
+        weakref.finalize(lease, self._release, lease.generation, conn)
+        self._local.lease = lease
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Obtém uma conexão ociosa ou abre uma nova, respeitando o limite"""
+        with self._released:
+            if not self._idle and self._open >= self.max_connections:
+                ready = self._released.wait_for(
+                    lambda: self._idle or self._open < self.max_connections,
+                    timeout=self.busy_timeout_ms / 1000
+                )
+                if not ready:
+                    raise sqlite3.OperationalError('Pool de conexões SQLite esgotado')
+            if self._idle:
+                self._hits += 1
+                return self._idle.pop()
+            self._open += 1
+            self._misses += 1
+        try:
+            return self.connect()
+        except Exception:
+            with self._released:
+                self._open -= 1
+                self._released.notify()
+            raise
+
+    def _release(self, generation: int, conn: sqlite3.Connection):
+        """Devolve a conexão de uma thread encerrada (ou a fecha, se o pool foi reiniciado)"""
+        reuse = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            reuse = True
+        except sqlite3.Error:
+            pass
+        with self._released:
+            if reuse and generation == self._generation:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+                self._close(conn)
+            self._released.notify()
+
+    @staticmethod
+    def _close(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """
+        Fecha as conexões ociosas e invalida as em uso (ex.: antes de recriar o banco)
+
+        As conexões ainda presas a threads são fechadas quando elas terminam ou
+        pedem uma nova conexão.
+        """
+        with self._released:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._generation += 1
+            self._released.notify_all()
+        for conn in idle:
+            self._close(conn)
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            # A conexão da própria thread é fechada já (remoção do arquivo)
+            self._close(lease.conn)
+
+    def remove_database(self):
+        """Fecha o pool e remove o arquivo do banco junto com os arquivos WAL"""
+        self.close_all()
+        for suffix in ('', '-wal', '-shm'):
+            path = self.database_path + suffix
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna estatísticas de uso do pool"""
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'open_connections': self._open,
+                'idle_connections': len(self._idle)
+            }
+
+
+# Pools compartilhados por caminho de banco
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_path: str, **options) -> SQLiteConnectionPool:
+    """Obtém o pool associado ao banco (um por caminho de arquivo)"""
+    key = os.path.abspath(database_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLiteConnectionPool(database_path, **options)
+            _pools[key] = pool
+        return pool